@@ -1,6 +1,8 @@
 """This is the base class for all custom agent components"""
 
+import hashlib
 import json
+import threading
 import traceback
 
 import os
@@ -10,6 +12,8 @@ from solace_ai_connector.common.message import Message
 from solace_ai_connector.common.utils import ensure_slash_on_end
 
 from ..services.llm_service.components.llm_service_component_base import LLMServiceComponentBase
+from ..common.action_executor import ActionExecutor
+from ..common.broker_response_router import BrokerResponseRouter
 from ..common.action_list import ActionList
 from ..common.action_response import ActionResponse, ErrorInfo
 from ..common.constants import ORCHESTRATOR_COMPONENT_NAME
@@ -37,6 +41,18 @@ agent_info = {
             "description": "The interval in seconds for agent registration",
             "default": 30,
         },
+        {
+            "name": "full_registration_interval",
+            "required": False,
+            "description": "The number of registration intervals between full registrations. In between, and while the agent is unchanged, only a heartbeat with the digest of the registration is sent. An orchestrator that does not know the digest, for example after a restart, requests the full registration on the register/request/agent/<agent_name> topic, which the agent flow must subscribe to. Without that subscription, the agent stays unregistered until its next full registration",
+            "default": 10,
+        },
+        {
+            "name": "action_executor_threads",
+            "required": False,
+            "description": "The number of threads running the actions of the agent concurrently, each action limited by its max_concurrency. The responses are published as the actions complete, and the LLM and other broker requests of the actions are sent concurrently. With 0, actions run one at a time on the component thread",
+            "default": 0,
+        },
     ],
     "input_schema": {
         "type": "object",
@@ -50,6 +66,12 @@ agent_info = {
 }
 
 
+def get_registration_digest(agent_summary: dict) -> str:
+    """Get a digest of the content of an agent registration."""
+    content = json.dumps(agent_summary, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
 class BaseAgentComponent(LLMServiceComponentBase, ABC):
 
     @classmethod
@@ -62,6 +84,22 @@ class BaseAgentComponent(LLMServiceComponentBase, ABC):
         self.kwargs = kwargs
         self.action_config = kwargs.get("action_config", {})
         self.registration_interval = int(self.get_config("registration_interval", 30))
+        self.full_registration_interval = max(
+            1, int(self.get_config("full_registration_interval", 10))
+        )
+        self.registration_count = 0
+        self.registration_digest = None
+
+        action_executor_threads = int(self.get_config("action_executor_threads", 0) or 0)
+        self.action_executor = (
+            ActionExecutor(
+                action_executor_threads,
+                name=f"{self.info.get('agent_name', 'agent')}-actions",
+                on_discard=self._discard_action_request,
+            )
+            if action_executor_threads > 0
+            else None
+        )
 
         self.llm_service_topic = self.get_config("llm_service_topic")
         if self.llm_service_topic:
@@ -203,6 +241,89 @@ class BaseAgentComponent(LLMServiceComponentBase, ABC):
 
     def invoke(self, message, data):
         """Invoke the component"""
+        if self.is_registration_request(message):
+            return {"payload": self.get_full_registration_message(), "topic": self.get_registration_topic()}
+        if self.action_executor:
+            # The response is sent when the action completes, and the message is acknowledged then
+            action_name = data.get("action_name")
+            action = self.action_list.get_action(action_name) if action_name else None
+            self.action_executor.submit(
+                action_name or "unknown",
+                action.max_concurrency if action else None,
+                self._run_action_request,
+                message,
+                data,
+            )
+            return None
+        return self._process_action_request(message, data)
+
+    def _discard_action_request(self, message, data):
+        """Reject an action request that did not run before the agent stopped."""
+        self.handle_negative_acknowledgements(
+            message, RuntimeError(f"The agent stopped before running the action {data.get('action_name')}")
+        )
+
+    def _run_action_request(self, message, data):
+        self.current_message = message
+        self.current_request_data = data
+        try:
+            result = self._process_action_request(message, data)
+            self.process_post_invoke(result, message)
+        except Exception as e:
+            self.handle_negative_acknowledgements(message, e)
+            raise
+        finally:
+            self.current_message = None
+            self.current_request_data = None
+
+    # The message being processed is kept per thread, since the actions can
+    # run on the threads of the action executor
+    def _get_request_context(self):
+        context = self.__dict__.get("_request_context")
+        if context is None:
+            context = self.__dict__.setdefault("_request_context", threading.local())
+        return context
+
+    @property
+    def current_message(self):
+        return getattr(self._get_request_context(), "message", None)
+
+    @current_message.setter
+    def current_message(self, message):
+        self._get_request_context().message = message
+
+    @property
+    def current_request_data(self):
+        return getattr(self._get_request_context(), "request_data", None)
+
+    @current_request_data.setter
+    def current_request_data(self, request_data):
+        self._get_request_context().request_data = request_data
+
+    def _get_request_response_controller(self):
+        app = self.get_app()
+        if app and app.request_response_controller:
+            return app.request_response_controller
+        return getattr(self, "_component_rrc", None)
+
+    def do_broker_request_response(self, message, stream=False, streaming_complete_expression=None):
+        controller = self._get_request_response_controller() if self.action_executor else None
+        if not controller:
+            return super().do_broker_request_response(message, stream, streaming_complete_expression)
+        # The responses of the component share one queue, they are routed to
+        # the concurrent actions that wait for them
+        responses = BrokerResponseRouter.for_controller(controller).request(
+            message, stream, streaming_complete_expression
+        )
+        if stream:
+            return responses
+        try:
+            response, _ = next(responses)
+        finally:
+            responses.close()
+        return response
+
+    def _process_action_request(self, message, data):
         action_name = data.get("action_name")
         file_service = FileService()
 
@@ -236,10 +357,58 @@ class BaseAgentComponent(LLMServiceComponentBase, ABC):
         response_topic = f"{os.getenv('SOLACE_AGENT_MESH_NAMESPACE')}solace-agent-mesh/v1/actionResponse/agent/{self.info['agent_name']}/{action_name}"
         return {"payload": action_response_dict, "topic": response_topic}
 
+    def get_action_metrics(self):
+        """
+        Get the queue-wait and execution times of each action when the actions run concurrently.
+        """
+        if self.action_executor:
+            return self.action_executor.get_metrics()
+        return None
+
+    def stop_component(self):
+        if self.action_executor:
+            self.action_executor.shutdown()
+        super().stop_component()
+
+    def get_registration_topic(self):
+        return f"{os.getenv('SOLACE_AGENT_MESH_NAMESPACE')}solace-agent-mesh/v1/register/agent/{self.info['agent_name']}"
+
+    def is_registration_request(self, message) -> bool:
+        """Whether the message is an orchestrator request for the full registration of the agent."""
+        topic = message.get_topic() if message else None
+        return bool(topic) and topic.endswith(
+            f"solace-agent-mesh/v1/register/request/agent/{self.info['agent_name']}"
+        )
+
+    def get_full_registration_message(self):
+        """Get the full registration of the agent, with its digest."""
+        agent_summary = self.get_agent_summary()
+        self.registration_digest = get_registration_digest(agent_summary)
+        return {**agent_summary, "digest": self.registration_digest}
+
+    def get_registration_message(self):
+        """
+        Get the full registration of the agent, or a heartbeat with only its
+        name and digest when it did not change since the last full one.
+        Full registrations are still sent every full_registration_interval
+        registrations, for the orchestrators that can not request them.
+        """
+        agent_summary = self.get_agent_summary()
+        digest = get_registration_digest(agent_summary)
+        send_full = (
+            digest != self.registration_digest
+            or self.registration_count % self.full_registration_interval == 0
+        )
+        self.registration_digest = digest
+        self.registration_count += 1
+        if send_full:
+            return {**agent_summary, "digest": digest}
+        return {"agent_name": agent_summary["agent_name"], "digest": digest}
+
     def handle_timer_event(self, timer_data):
         """Handle the timer event for agent registration."""
-        registration_message = self.get_agent_summary()
-        registration_topic = f"{os.getenv('SOLACE_AGENT_MESH_NAMESPACE')}solace-agent-mesh/v1/register/agent/{self.info['agent_name']}"
+        registration_message = self.get_registration_message()
+        registration_topic = self.get_registration_topic()
 
         message = Message(
             topic=registration_topic,
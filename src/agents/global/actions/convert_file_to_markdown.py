@@ -1,8 +1,6 @@
 """Action description"""
 
 from solace_ai_connector.common.log import log
-from markitdown import MarkItDown
-from markitdown import UnsupportedFormatException
 import json
 import os
 import mimetypes
@@ -75,6 +73,9 @@ class ConvertFileToMarkdown(Action):
         raise ValueError(f"Unable to determine file format for path: {file_path}")
 
     def do_action(self, files, session_id) -> ActionResponse:
+        # markitdown is slow to import, the agent loads it on first use
+        from markitdown import MarkItDown, UnsupportedFormatException
+
         markitdown_client = MarkItDown()
         file_service = FileService()
 
@@ -11,9 +11,6 @@ from io import BytesIO
 from packaging.version import parse
 from solace_ai_connector.common.log import log
 
-import plotly.graph_objects as go
-import plotly.io as pio
-
 from ....common.action import Action
 from ....common.action_response import ActionResponse
 from ....services.file_service import FileService
@@ -128,6 +125,10 @@ class PlotlyGraph(Action):
 
         files = []
         try:
+            # plotly and kaleido are slow to import, the agent loads them on first use
+            import plotly.graph_objects as go
+            import plotly.io as pio
+
             fig = go.Figure(obj)
             byte_io = BytesIO()
             pio.write_image(fig, byte_io)
@@ -2,14 +2,12 @@
 
 from solace_ai_connector.common.log import log
 import random
-import requests
 import base64
 
-from litellm import image_generation
-
 from ....common.action import Action
 from ....common.action_response import ActionResponse
 from ....services.file_service import FileService
+from ....services.http_service import HttpService
 
 
 class ImageCreation(Action):
@@ -34,7 +32,7 @@ class ImageCreation(Action):
     def _get_image_content(self, image_data):
         """Helper function to extract image content from response data"""
         if 'url' in image_data and image_data['url'] is not None:
-            return requests.get(image_data['url'], timeout=10).content
+            return HttpService().get(image_data['url'], timeout=10, use_cache=False).content
         elif 'b64_json' in image_data and image_data['b64_json'] is not None:
             return base64.b64decode(image_data['b64_json'])
         else:
@@ -45,6 +43,8 @@ class ImageCreation(Action):
         if not prompt:
             return ActionResponse(message="Image description is required")
         try:
+            from litellm import image_generation
+
             response = image_generation(
                 model=self.get_config("image_gen_model") or None,
                 api_base=self.get_config("image_gen_endpoint") or None,
@@ -3,7 +3,6 @@
 from solace_ai_connector.common.log import log
 import re
 import random
-import requests
 from io import BytesIO
 
 
@@ -11,6 +10,7 @@ from ....common.action import Action
 from ....common.action_response import ActionResponse
 from ....services.file_service import FS_PROTOCOL, FileService
 from ....services.file_service.file_utils import starts_with_fs_url
+from ....services.http_service import HttpService
 
 
 class DescribeImage(Action):
@@ -54,7 +54,7 @@ class DescribeImage(Action):
         if not starts_with_fs_url(url):
             # Download the image and upload to the file service
             file_service = FileService()
-            byte_buffer = BytesIO(requests.get(image_url).content)
+            byte_buffer = BytesIO(HttpService().get(image_url).content)
             metadata = file_service.upload_from_buffer(
                 byte_buffer.read(),
                 str(random.randint(100000, 999999)) + "_image.png",
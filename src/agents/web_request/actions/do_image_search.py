@@ -1,13 +1,13 @@
 """Web Search action"""
 
 from solace_ai_connector.common.log import log
-import requests
 from duckduckgo_search import DDGS
 
 
 from ....common.action import Action
 from ....common.action_response import ActionResponse
 from ....services.file_service import FileService
+from ....services.http_service import HttpService
 
 
 class DoImageSearch(Action):
@@ -69,7 +69,7 @@ class DoImageSearch(Action):
         image_metas = []
         for result in results:
             try:
-                received_image = requests.get(result.get("image"), timeout=10).content
+                received_image = HttpService().get(result.get("image"), timeout=10).content
                 log.debug(f"Received image: {result.get('image')}")
                 image_metas.append(
                     file_service.upload_from_buffer(
@@ -1,13 +1,16 @@
 """Web Request action"""
 
 from solace_ai_connector.common.log import log
-import requests
-from bs4 import BeautifulSoup
-import html2text
 
 
 from ....common.action import Action
 from ....common.action_response import ActionResponse
+from ....services.http_service import HttpService
+from ..html_content import (
+    DEFAULT_MAX_PAGE_TOKENS,
+    extract_content,
+    truncate_to_token_budget,
+)
 
 
 class DoWebRequest(Action):
@@ -96,19 +99,18 @@ class DoWebRequest(Action):
 
         # Fetch the content from the URL
         try:
-            response = requests.get(url, timeout=30)
+            response = HttpService().get(url)
             response.raise_for_status()
         except Exception as e:
             return ActionResponse(message=f"Failed to fetch content from URL: {e}")
 
-        # Use beautiful soup to extract the text content from the HTML
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        # Convert the HTML content to Markdown using html2text
-        h = html2text.HTML2Text()
-        h.ignore_links = False  # Ensure that links are preserved
-        h.ignore_images = False  # Ignore images
-        content = h.handle(str(soup))
+        # Extract the main content of HTML pages as Markdown, parsing them once
+        content = extract_content(
+            response.content, response.headers.get("content-type"), base_url=response.url
+        )
+        content = truncate_to_token_budget(
+            content, int(self.get_config("max_page_tokens", DEFAULT_MAX_PAGE_TOKENS))
+        )
 
         # If a prompt is provided, send the content to an LLM model
         if prompt:
@@ -0,0 +1,191 @@
+"""Web Requests action, to fetch and process several URLs at once"""
+
+import ast
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urldefrag, urlparse
+
+from solace_ai_connector.common.log import log
+
+
+from ....common.action import Action
+from ....common.action_response import ActionResponse
+from ....services.http_service import HttpService
+from ..html_content import (
+    allocate_token_budget,
+    deduplicate_pages,
+    estimate_tokens,
+    extract_content,
+    truncate_to_token_budget,
+)
+
+DEFAULT_MAX_URLS = 10
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_PER_HOST = 2
+DEFAULT_MAX_TOKENS = 32000
+
+
+def parse_urls(urls) -> list:
+    """
+    Get the distinct URLs, without fragments, from a list or from a JSON list,
+    Python list literal or whitespace separated string. Commas are only
+    separators when they end a URL, since they are valid in URL queries.
+    """
+    if isinstance(urls, str):
+        for parse in (json.loads, ast.literal_eval):
+            try:
+                urls = parse(urls)
+                break
+            except (ValueError, SyntaxError):
+                pass
+        else:
+            urls = [url.rstrip(",") for url in urls.split()]
+        if not isinstance(urls, (list, tuple)):
+            urls = [urls]
+    distinct_urls = []
+    for url in urls or []:
+        url = urldefrag(str(url).strip())[0]
+        if url and url not in distinct_urls:
+            distinct_urls.append(url)
+    return distinct_urls
+
+
+class DoWebRequests(Action):
+
+    def __init__(self, **kwargs):
+        super().__init__(
+            {
+                "name": "do_web_requests",
+                "prompt_directive": "Fetch the content of several URLs at once and process it all according to a single LLM prompt. Use this instead of several do_web_request actions when more than one page is needed, for example to follow the relevant links of a page or to compare sources.",
+                "params": [
+                    {
+                        "name": "urls",
+                        "desc": 'List of URLs to fetch, as a JSON list. For example: ["https://example.com/a", "https://example.com/b"]',
+                        "type": "array",
+                    },
+                    {
+                        "name": "llm_prompt",
+                        "desc": "Text prompt to direct the LLM on how to process the content of all the pages together. If this parameter is not provided, the content of the pages will be returned as is.",
+                        "type": "string",
+                    },
+                ],
+                "required_scopes": ["web_request:do_web_requests:read"],
+                # Each invocation already fetches its URLs concurrently
+                "max_concurrency": 2,
+            },
+            **kwargs,
+        )
+
+    def get_system_prompt(self):
+        return """
+        The assistant is a professional web researcher. It will take the pages and request below and
+        will diligently extract the requested information from these pages, combining what they say
+        and noting where they disagree. It will say which page each piece of information comes from,
+        using the URL of the page. When the pages do not have the information requested, the assistant
+        will indicate it and provide the links from the pages that might have it.
+
+        The assistant will respond in markdown format.
+        """
+
+    def get_user_prompt(self, pages, prompt):
+        page_blocks = "\n".join(
+            f"<page url=\"{url}\">\n{content}\n</page>" for url, content in pages
+        )
+        return f"""
+        <research_request>
+        {prompt}
+        </research_request>
+        <pages_content_markdown>
+        {page_blocks}
+        </pages_content_markdown>
+        """
+
+    def fetch_pages(self, urls: list) -> list:
+        """
+        Fetch the URLs concurrently, at most max_per_host at once per host.
+        Returns the content, or the exception, of each URL in order.
+        """
+        max_per_host = int(self.get_config("web_requests_max_per_host", DEFAULT_MAX_PER_HOST))
+        max_concurrency = int(self.get_config("web_requests_max_concurrency", DEFAULT_MAX_CONCURRENCY))
+        host_semaphores = {
+            host: threading.BoundedSemaphore(max_per_host)
+            for host in {urlparse(url).netloc for url in urls}
+        }
+        http_service = HttpService()
+
+        def fetch(url):
+            try:
+                with host_semaphores[urlparse(url).netloc]:
+                    response = http_service.get(url)
+                response.raise_for_status()
+                return extract_content(
+                    response.content, response.headers.get("content-type"), base_url=response.url
+                )
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(
+            max(1, min(max_concurrency, len(urls))), thread_name_prefix="web-requests"
+        ) as executor:
+            return list(executor.map(fetch, urls))
+
+    def invoke(self, params, meta={}) -> ActionResponse:
+        urls = parse_urls(params.get("urls"))
+        prompt = params.get("llm_prompt")
+
+        if not urls:
+            return ActionResponse(message="At least one URL is required")
+        max_urls = int(self.get_config("web_requests_max_urls", DEFAULT_MAX_URLS))
+        skipped_urls = urls[max_urls:]
+        urls = urls[:max_urls]
+
+        results = self.fetch_pages(urls)
+        fetched = [(url, result) for url, result in zip(urls, results) if isinstance(result, str)]
+        notes = [
+            f"Failed to fetch content from {url}: {result}"
+            for url, result in zip(urls, results)
+            if not isinstance(result, str)
+        ]
+        if skipped_urls:
+            notes.append(f"Only the first {max_urls} URLs were fetched, skipped: {', '.join(skipped_urls)}")
+        if not fetched:
+            return ActionResponse(message="\n".join(notes))
+
+        # Drop the content shared between pages, then share the token budget between them
+        contents = deduplicate_pages([content for _, content in fetched])
+        budgets = allocate_token_budget(
+            [estimate_tokens(content) for content in contents],
+            int(self.get_config("web_requests_max_tokens", DEFAULT_MAX_TOKENS)),
+        )
+        pages = []
+        for (url, _), content, budget in zip(fetched, contents, budgets):
+            if not content:
+                content = "(No content other than the content of the previous pages)"
+            elif not budget:
+                content = "(Not included, the token budget is used by the other pages)"
+            else:
+                content = truncate_to_token_budget(content, budget)
+            pages.append((url, content))
+
+        if prompt:
+            messages = [
+                {"role": "system", "content": self.get_system_prompt()},
+                {"role": "user", "content": self.get_user_prompt(pages, prompt)},
+            ]
+            agent = self.get_agent()
+            try:
+                response = agent.do_llm_service_request(messages=messages)
+                content = response.get("content")
+            except TimeoutError as e:
+                log.error("LLM request timed out: %s", str(e))
+                return ActionResponse(message="LLM request timed out")
+            except Exception as e:
+                log.error("Failed to process content with LLM: %s", str(e))
+                return ActionResponse(message="Failed to process content with LLM")
+        else:
+            content = "\n\n".join(f"# {url}\n\n{page_content}" for url, page_content in pages)
+
+        if notes:
+            content = f"{content}\n\n" + "\n".join(notes)
+        return ActionResponse(message=content)
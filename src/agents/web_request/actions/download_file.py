@@ -2,12 +2,12 @@
 
 from solace_ai_connector.common.log import log
 import requests
-from io import BytesIO
 
 
 from ....common.action import Action
 from ....common.action_response import ActionResponse
 from ....services.file_service import FileService, FS_PROTOCOL
+from ....services.http_service import HttpService
 
 
 class DownloadFile(Action):
@@ -43,24 +43,17 @@ class DownloadFile(Action):
 
         headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:128.0) Gecko/20100101 Firefox/128.0"}
 
-        # Fetch the file from the URL and write it in chunks
+        # Stream the file from the URL to the file service, a failed download stores nothing
         files = []
         try:
-            with requests.get(url, headers=headers, stream=True, timeout=30) as file_response:
-                file_response.raise_for_status()
-                byte_io = BytesIO()
-                for chunk in file_response.iter_content(chunk_size=8192):
-                    if chunk:  # Filter out keep-alive new chunks
-                        byte_io.write(chunk)
-                byte_io.seek(0)
-                file_service = FileService()
-                meta = file_service.upload_from_buffer(
-                    byte_io.read(),
-                    local_file_name,
-                    meta.get("session_id"),
-                    data_source="Web Request Agent - Download File Action",
-                )
-                files.append(meta)
+            file_service = FileService()
+            with file_service.open_write(
+                local_file_name,
+                meta.get("session_id"),
+                data_source="Web Request Agent - Download File Action",
+            ) as writer:
+                HttpService().download(url, writer, headers=headers)
+            files.append(writer.metadata)
         except requests.exceptions.HTTPError as e:
             return ActionResponse(message=f"Failed to fetch file from URL: {e}")
         except Exception as e:
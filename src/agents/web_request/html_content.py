@@ -0,0 +1,152 @@
+"""
+Extraction of the main content of web pages as markdown.
+
+The page is parsed once with BeautifulSoup. Scripts, styles, navigation,
+sidebars and the headers and footers of the page are removed from the tree,
+and when the page marks its main content with a main or article element, only
+that content is kept. The result is converted to markdown with html2text, and
+can then be cut to a token budget before it is given to an LLM.
+"""
+
+import re
+
+import html2text
+from bs4 import BeautifulSoup
+
+DEFAULT_MAX_PAGE_TOKENS = 16000
+CHARS_PER_TOKEN = 4
+
+# The content of these elements is dropped
+SKIPPED_TAGS = [
+    "head", "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "aside", "button", "select", "textarea", "dialog",
+]
+SKIPPED_ROLES = ["navigation", "banner", "contentinfo", "complementary"]
+# Page headers and footers are dropped, but not those of an article
+LAYOUT_TAGS = ["header", "footer"]
+MAIN_TAGS = ["main", "article"]
+# A main content shorter than this is not trusted, the whole page is kept
+MIN_MAIN_CONTENT_CHARS = 200
+# Shorter blocks, such as headings and list items, are not deduplicated across pages
+MIN_DUPLICATE_BLOCK_CHARS = 80
+
+_WHITESPACE_REGEX = re.compile(r"\s+")
+_CHARSET_REGEX = re.compile(r"charset=[\"']?([\w-]+)", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def get_charset(content_type: str = None):
+    match = _CHARSET_REGEX.search(content_type or "")
+    return match.group(1) if match else None
+
+
+def extract_content(content: bytes, content_type: str = None, base_url: str = None) -> str:
+    """
+    Get the content of a response as text, with HTML pages converted to markdown.
+    """
+    charset = get_charset(content_type)
+    if not content_type or "html" in content_type:
+        return html_to_markdown(content, base_url=base_url, encoding=charset)
+    try:
+        return content.decode(charset or "utf-8", errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+
+def _remove_boilerplate(soup: BeautifulSoup):
+    for element in soup.find_all(SKIPPED_TAGS) + soup.find_all(attrs={"role": SKIPPED_ROLES}):
+        element.decompose()
+    for element in soup.find_all(LAYOUT_TAGS):
+        if not element.find_parent(MAIN_TAGS):
+            element.decompose()
+
+
+def _get_main_content(soup: BeautifulSoup) -> list:
+    """
+    The outermost main, or else article, elements, if they have enough text.
+    """
+    for selector in ({"name": "main"}, {"attrs": {"role": "main"}}, {"name": "article"}):
+        elements = [
+            element
+            for element in soup.find_all(**selector)
+            if not element.find_parent(MAIN_TAGS)
+        ]
+        if elements:
+            text_length = sum(len(element.get_text(strip=True)) for element in elements)
+            return elements if text_length >= MIN_MAIN_CONTENT_CHARS else []
+    return []
+
+
+def html_to_markdown(html, base_url: str = None, encoding: str = None) -> str:
+    """
+    Convert the main content of a page, as text or bytes, to markdown.
+    Relative links are resolved against base_url.
+    """
+    if isinstance(html, bytes):
+        soup = BeautifulSoup(html, "html.parser", from_encoding=encoding)
+    else:
+        soup = BeautifulSoup(html, "html.parser")
+    _remove_boilerplate(soup)
+    main_content = _get_main_content(soup)
+
+    converter = html2text.HTML2Text(baseurl=base_url or "")
+    converter.ignore_links = False
+    converter.ignore_images = False
+    # Lines are not wrapped, which would only add tokens
+    converter.body_width = 0
+    html = "".join(str(element) for element in main_content) if main_content else str(soup)
+    return converter.handle(html).strip()
+
+
+def truncate_to_token_budget(markdown: str, max_tokens: int) -> str:
+    """
+    Cut the markdown to about max_tokens tokens, at a block boundary when possible.
+    """
+    if not max_tokens or estimate_tokens(markdown) <= max_tokens:
+        return markdown
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    cut = markdown.rfind("\n\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = markdown.rfind("\n", 0, max_chars)
+    if cut < max_chars // 2:
+        cut = max_chars
+    return markdown[:cut].rstrip() + f"\n\n[The page was truncated to about {max_tokens} tokens]"
+
+
+def deduplicate_pages(pages: list) -> list:
+    """
+    Remove from each page the blocks that an earlier page already has, such as
+    the boilerplate shared by the pages of a site. Short blocks are kept.
+    Returns the remaining content of each page, in order.
+    """
+    seen_blocks = set()
+    contents = []
+    for page in pages:
+        blocks = []
+        for block in page.split("\n\n"):
+            key = _WHITESPACE_REGEX.sub(" ", block).strip().lower()
+            if len(key) >= MIN_DUPLICATE_BLOCK_CHARS:
+                if key in seen_blocks:
+                    continue
+                seen_blocks.add(key)
+            blocks.append(block)
+        contents.append("\n\n".join(blocks).strip())
+    return contents
+
+
+def allocate_token_budget(sizes: list, max_tokens: int) -> list:
+    """
+    Split max_tokens between contents of the given sizes, in tokens. The budget
+    a short content does not use goes to the longer ones.
+    """
+    budgets = [0] * len(sizes)
+    remaining = max_tokens
+    order = sorted(range(len(sizes)), key=lambda index: sizes[index])
+    for position, index in enumerate(order):
+        share = remaining // (len(sizes) - position)
+        budgets[index] = min(sizes[index], share)
+        remaining -= budgets[index]
+    return budgets
@@ -8,6 +8,7 @@ from ..base_agent_component import (
 )
 
 from .actions.do_web_request import DoWebRequest
+from .actions.do_web_requests import DoWebRequests
 from .actions.download_file import DownloadFile
 from .actions.do_image_search import DoImageSearch
 from .actions.do_news_search import DoNewsSearch
@@ -16,6 +17,40 @@ from .actions.do_suggestion_search import DoSuggestionSearch
 info = copy.deepcopy(agent_info)
 info["agent_name"] = "web_request"
 info["class_name"] = "WebRequestAgentComponent"
+info["config_parameters"].extend(
+    [
+        {
+            "name": "max_page_tokens",
+            "required": False,
+            "description": "The maximum size, in estimated tokens, of the content of a fetched page. Longer pages are truncated",
+            "default": 16000,
+        },
+        {
+            "name": "web_requests_max_urls",
+            "required": False,
+            "description": "The maximum number of URLs fetched by a do_web_requests action",
+            "default": 10,
+        },
+        {
+            "name": "web_requests_max_concurrency",
+            "required": False,
+            "description": "The maximum number of URLs of a do_web_requests action fetched at once",
+            "default": 8,
+        },
+        {
+            "name": "web_requests_max_per_host",
+            "required": False,
+            "description": "The maximum number of URLs of a do_web_requests action fetched at once from the same host",
+            "default": 2,
+        },
+        {
+            "name": "web_requests_max_tokens",
+            "required": False,
+            "description": "The maximum size, in estimated tokens, of the content of all the pages of a do_web_requests action, shared between the pages",
+            "default": 32000,
+        },
+    ]
+)
 info["description"] = (
     "Web request agent that is able to download and retrieve info from urls. ",
     "It can also search the web for news, images and suggestion results with the DuckDuckGo search engine.",
@@ -26,6 +61,7 @@ class WebRequestAgentComponent(BaseAgentComponent):
     info = info
     actions = [
         DoWebRequest,
+        DoWebRequests,
         DownloadFile,
         DoImageSearch,
         DoNewsSearch,
@@ -16,6 +16,7 @@ class Action(ABC):
         self._disabled = attributes.get("disabled", False)
         self._examples = attributes.get("examples", [])
         self._required_scopes = attributes.get("required_scopes", [])
+        self._max_concurrency = attributes.get("max_concurrency")
         self._config_fn = config_fn
         self.agent = agent
         self.kwargs = kwargs
@@ -36,6 +37,11 @@ class Action(ABC):
     def required_scopes(self):
         return self._required_scopes
 
+    @property
+    def max_concurrency(self):
+        """The maximum number of invocations running at once when the agent runs actions concurrently"""
+        return self._max_concurrency
+
     def set_agent(self, agent):
         self.agent = agent
 
@@ -0,0 +1,163 @@
+"""
+A bounded thread pool that runs the actions of an agent concurrently.
+
+Each action can limit how many of its invocations run at once. Invocations over
+the limit wait in a queue of their action instead of holding a pool thread, so
+a slow action cannot starve the others. The time spent waiting and running is
+kept per action. The invocations that have not started when the executor shuts
+down are handed to on_discard, for example to reject their messages.
+"""
+
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from solace_ai_connector.common.log import log
+
+
+class ActionMetrics:
+    """
+    The queue-wait and execution times of the invocations of an action.
+    """
+
+    def __init__(self):
+        self.invocations = 0
+        self.failures = 0
+        self.running = 0
+        self.queued = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+        self.total_execution_time = 0.0
+        self.max_execution_time = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "invocations": self.invocations,
+            "failures": self.failures,
+            "running": self.running,
+            "queued": self.queued,
+            "average_queue_wait": self.total_queue_wait / self.invocations if self.invocations else 0.0,
+            "max_queue_wait": self.max_queue_wait,
+            "average_execution_time": self.total_execution_time / self.invocations if self.invocations else 0.0,
+            "max_execution_time": self.max_execution_time,
+        }
+
+
+class ActionExecutor:
+    """
+    Runs functions on max_workers threads, at most max_concurrency at once per action name.
+    """
+
+    def __init__(self, max_workers: int, name: str = "action-executor", on_discard=None):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = collections.defaultdict(collections.deque)
+        self._metrics = collections.defaultdict(ActionMetrics)
+        self._on_discard = on_discard
+        self._stopped = False
+
+    def submit(self, action_name: str, max_concurrency, function, *args):
+        """
+        Run function(*args) once a thread is free and fewer than
+        max_concurrency invocations of the action are running.
+        An exception raised by function is logged and counted as a failure.
+        """
+        task = (function, args, time.monotonic())
+        with self._lock:
+            if self._stopped:
+                stopped = True
+            else:
+                stopped = False
+                metrics = self._metrics[action_name]
+                if max_concurrency and metrics.running >= max_concurrency:
+                    metrics.queued += 1
+                    self._pending[action_name].append((task, max_concurrency))
+                    return
+                metrics.running += 1
+        if stopped:
+            self._discard([task])
+            return
+        self._start(action_name, max_concurrency, task)
+
+    def get_metrics(self) -> dict:
+        """
+        Get the invocation counts and the queue-wait and execution times, in seconds, by action name.
+        """
+        with self._lock:
+            return {name: metrics.as_dict() for name, metrics in self._metrics.items()}
+
+    def shutdown(self, wait: bool = False):
+        """
+        Stop the executor. The running invocations complete, the others are discarded.
+        """
+        with self._lock:
+            self._stopped = True
+            discarded = [task for pending in self._pending.values() for task, _ in pending]
+            self._pending.clear()
+            for metrics in self._metrics.values():
+                metrics.queued = 0
+        self._discard(discarded)
+        # The invocations already submitted to the pool discard themselves
+        self._executor.shutdown(wait=wait)
+
+    def _discard(self, tasks: list):
+        if not self._on_discard:
+            return
+        for _, args, _ in tasks:
+            try:
+                self._on_discard(*args)
+            except Exception as e:
+                log.error("Error discarding an action invocation: %s", e, exc_info=True)
+
+    def _start(self, action_name: str, max_concurrency, task):
+        try:
+            self._executor.submit(self._run, action_name, max_concurrency, task)
+        except RuntimeError:
+            # The pool shut down in the meantime
+            with self._lock:
+                self._metrics[action_name].running -= 1
+            self._discard([task])
+
+    def _run(self, action_name: str, max_concurrency, task):
+        if self._stopped:
+            with self._lock:
+                self._metrics[action_name].running -= 1
+            self._discard([task])
+            return
+        function, args, submit_time = task
+        start_time = time.monotonic()
+        failed = False
+        try:
+            function(*args)
+        except Exception as e:
+            failed = True
+            log.error("Error running action %s: %s", action_name, e, exc_info=True)
+        end_time = time.monotonic()
+
+        queue_wait = start_time - submit_time
+        execution_time = end_time - start_time
+        next_task = None
+        with self._lock:
+            metrics = self._metrics[action_name]
+            metrics.invocations += 1
+            metrics.failures += failed
+            metrics.total_queue_wait += queue_wait
+            metrics.max_queue_wait = max(metrics.max_queue_wait, queue_wait)
+            metrics.total_execution_time += execution_time
+            metrics.max_execution_time = max(metrics.max_execution_time, execution_time)
+            pending = self._pending[action_name]
+            if pending:
+                # Hand the slot of this invocation to the next queued one
+                next_task, max_concurrency = pending.popleft()
+                metrics.queued -= 1
+            else:
+                metrics.running -= 1
+        log.debug(
+            "Action %s waited %.3fs and ran in %.3fs",
+            action_name,
+            queue_wait,
+            execution_time,
+        )
+        if next_task:
+            self._start(action_name, max_concurrency, next_task)
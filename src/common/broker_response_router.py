@@ -0,0 +1,94 @@
+"""
+Concurrent broker requests over the request/response controller of a component.
+
+The controller of solace-ai-connector puts all the responses of its flow in one
+queue, so a component can only wait for one response at a time. The router tags
+each request with an ID in its user properties, which the services copy to
+their responses with the reply metadata, and hands each response to the queue
+of its request.
+"""
+
+import queue
+import threading
+import uuid
+
+from solace_ai_connector.common.event import EventType
+from solace_ai_connector.common.log import log
+
+REQUEST_ID_KEY = "__solace_agent_mesh_broker_request_id__"
+
+_routers_lock = threading.Lock()
+
+
+class BrokerResponseRouter:
+    """
+    Routes the responses of a request/response controller to the requests waiting for them.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        self._lock = threading.Lock()
+        self._queues = {}
+        # Responses without a request ID, read by callers of the controller itself
+        self._unrouted = queue.Queue()
+        self.get = self._unrouted.get
+        # The controller puts its responses in its response queue
+        controller.response_queue = self
+
+    @classmethod
+    def for_controller(cls, controller) -> "BrokerResponseRouter":
+        """
+        Get the router of a controller, shared by the components that use it.
+        """
+        with _routers_lock:
+            router = getattr(controller, "_broker_response_router", None)
+            if router is None:
+                router = cls(controller)
+                controller._broker_response_router = router
+            return router
+
+    def put(self, event):
+        request_id = None
+        if event.event_type == EventType.MESSAGE:
+            request_id = (event.data.get_user_properties() or {}).get(REQUEST_ID_KEY)
+        with self._lock:
+            response_queue = self._queues.get(request_id)
+            if request_id is None and len(self._queues) == 1:
+                # The service did not copy the user properties, only one request can match
+                response_queue = next(iter(self._queues.values()))
+        if response_queue is not None:
+            response_queue.put(event)
+        elif request_id is None:
+            self._unrouted.put(event)
+        else:
+            log.warning("Dropping a broker response for request %s, which is no longer waiting", request_id)
+
+    def request(self, message, stream=False, streaming_complete_expression=None):
+        """
+        Send a request and yield its responses, as (message, whether it is the last one).
+        Each response resets the timeout of the controller.
+        """
+        request_id = str(uuid.uuid4())
+        user_properties = dict(message.get_user_properties() or {})
+        user_properties[REQUEST_ID_KEY] = request_id
+        message.set_user_properties(user_properties)
+        response_queue = queue.Queue()
+        with self._lock:
+            self._queues[request_id] = response_queue
+        try:
+            self.controller.send_message(message, stream, streaming_complete_expression)
+            while True:
+                try:
+                    event = response_queue.get(timeout=self.controller.request_expiry_s)
+                except queue.Empty:
+                    raise TimeoutError("Timeout waiting for response") from None
+                if event.event_type != EventType.MESSAGE:
+                    continue
+                response = event.data
+                last = not stream or bool(response.get_data(streaming_complete_expression))
+                yield response, last
+                if last:
+                    return
+        finally:
+            with self._lock:
+                del self._queues[request_id]
@@ -0,0 +1,51 @@
+"""
+Registry of provider classes that are imported on first use.
+
+Backends such as S3 (boto3) or LLM clients (litellm) are slow to import, so the
+services register their providers by module path and only import the one whose
+type is selected in the configuration.
+"""
+
+import importlib
+import threading
+
+
+class LazyRegistry:
+    """
+    A read-only mapping of provider types to classes, given as "module:ClassName"
+    paths (relative to package if they start with a dot).
+    """
+
+    def __init__(self, providers: dict, package: str = None):
+        self._providers = dict(providers)
+        self._package = package
+        self._classes = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, provider_type) -> bool:
+        return provider_type in self._providers
+
+    def __iter__(self):
+        return iter(self._providers)
+
+    def __len__(self) -> int:
+        return len(self._providers)
+
+    def __getitem__(self, provider_type):
+        if provider_type not in self._providers:
+            raise KeyError(provider_type)
+        with self._lock:
+            if provider_type not in self._classes:
+                module_path, class_name = self._providers[provider_type].split(":")
+                module = importlib.import_module(module_path, package=self._package)
+                self._classes[provider_type] = getattr(module, class_name)
+            return self._classes[provider_type]
+
+    def keys(self) -> list:
+        return list(self._providers)
+
+    def is_loaded(self, provider_type) -> bool:
+        """
+        Whether the module of the provider has been imported.
+        """
+        return provider_type in self._classes
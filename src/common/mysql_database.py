@@ -1,6 +1,7 @@
 """Manage a MySQL database connection."""
 
 import mysql.connector
+from solace_ai_connector.common.log import log
 
 class MySQLDatabase:
     def __init__(self, host: str, user: str, password: str, database: str):
@@ -25,7 +26,7 @@ class MySQLDatabase:
             return self.connection.cursor(**kwargs)
 
     def connect(self):
-        return mysql.connector.connect(
+        self.connection = mysql.connector.connect(
             host=self.host,
             port=self.port,
             user=self.user,
@@ -38,3 +39,18 @@ class MySQLDatabase:
 
     def close(self):
         self.connection.close()
+
+    def execute(self, query, params=None):
+        sanity = 3
+        while True:
+            try:
+                cursor = self.cursor(dictionary=True)
+                cursor.execute(query, params)
+                break
+            except Exception as e:
+                log.error("Database error: %s", e)
+                sanity -= 1
+                if sanity == 0:
+                    raise e
+
+        return cursor
@@ -0,0 +1,90 @@
+"""Thread-safe pool of database connections shared by SQL-backed services."""
+
+import queue
+import threading
+from contextlib import contextmanager
+
+from solace_ai_connector.common.log import log
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_POOL_TIMEOUT = 30
+
+
+class SQLConnectionPool:
+    """
+    A bounded pool of database wrapper instances (e.g. PostgreSQLDatabase).
+
+    Each wrapper holds one connection. A wrapper is only ever used by one thread
+    at a time, and is discarded if an error is raised while it is checked out.
+    """
+
+    def __init__(self, create_database, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT):
+        self._create_database = create_database
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a database wrapper from the pool.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(
+                f"Timed out after {self.timeout} seconds waiting for a database connection."
+            )
+        try:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                db = self._create_database()
+
+            try:
+                yield db
+            except Exception:
+                self._discard(db)
+                db = None
+                raise
+            finally:
+                if db is not None:
+                    self._idle.put(db)
+        finally:
+            self._slots.release()
+
+    def _discard(self, db):
+        try:
+            db.close()
+        except Exception as e:  # pylint: disable=broad-except
+            log.debug("Error closing pooled database connection: %s", e)
+
+    def close(self):
+        """
+        Close all idle connections.
+        """
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(key, create_database, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT) -> SQLConnectionPool:
+    """
+    Get the process-wide connection pool for the given key, creating it if needed.
+
+    :param key: A hashable identifier of the database (e.g. type, host, user and database name).
+    :param create_database: A callable that returns a new database wrapper.
+    :param pool_size: The maximum number of connections in the pool.
+    :param timeout: Seconds to wait for a free connection.
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SQLConnectionPool(create_database, pool_size, timeout)
+            _pools[key] = pool
+        return pool
@@ -0,0 +1,49 @@
+"""Manage a SQLite database connection."""
+
+import sqlite3
+from solace_ai_connector.common.log import log
+
+
+class SQLiteDatabase:
+    def __init__(self, host: str = None, user: str = None, password: str = None, database: str = ":memory:"):
+        # host, user and password are accepted for interface compatibility with the other databases
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database or ":memory:"
+        self.connection = None
+
+    def cursor(self, **kwargs):
+        if self.connection is None:
+            self.connect()
+        try:
+            return self.connection.cursor(**kwargs)
+        except sqlite3.ProgrammingError:
+            self.connect()
+            return self.connection.cursor(**kwargs)
+
+    def connect(self):
+        # Connections are handed between threads by the connection pool, one thread at a time
+        self.connection = sqlite3.connect(
+            self.database, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+
+    def execute(self, query, params=None):
+        sanity = 3
+        while True:
+            try:
+                cursor = self.cursor()
+                cursor.execute(query, params or ())
+                break
+            except Exception as e:
+                log.error("Database error: %s", e)
+                sanity -= 1
+                if sanity == 0:
+                    raise e
+
+        return cursor
@@ -1,11 +1,11 @@
 from typing import Dict, Any
-import base64
 import json
 from uuid import uuid4
 
 from solace_ai_connector.common.message import Message
 from solace_ai_connector.common.log import log
 from ...services.file_service import FileService
+from ...services.file_service.file_utils import iter_base64_decoded
 from ...common.constants import DEFAULT_IDENTITY_KEY_FIELD, HISTORY_USER_ROLE
 from .gateway_base import GatewayBase
 
@@ -180,31 +180,16 @@ class GatewayInput(GatewayBase):
             attached_files = []
             if len(files) > 0:
                 file_service = FileService()
-                for file in files:
-                    content = file["content"]
-                    if type(content) == str:
-                        try:
-                            byte_buffer = base64.b64decode(content)
-                        except Exception as e:
-                            byte_buffer = content.encode("utf-8")
-                    elif type(content) == bytes:
-                        byte_buffer = content
-                    else:
-                        log.error(
-                            "Invalid content type for file %s: %s",
-                            file["name"],
-                            type(content),
-                        )
-                        continue
-
-                    file_metadata = file_service.upload_from_buffer(
-                        byte_buffer,
-                        file["name"],
-                        session_id,
-                        file_size=file["size"],
-                        data_source=f"User provided file - {self.gateway_id} Gateway",
-                    )
-                    attached_files.append(file_metadata)
+                # Upload the files concurrently, a failed upload does not affect the others
+                results = file_service.map_concurrently(
+                    lambda file: self._upload_file(file_service, file, session_id), files
+                )
+                for file, result in zip(files, results):
+                    if isinstance(result, Exception):
+                        log.error("Failed to upload file %s: %s", file.get("name"), result)
+                        errors.append(f"Failed to upload file {file.get('name')}: {result}")
+                    elif result:
+                        attached_files.append(result)
             copied_data["files"] = attached_files
 
             copied_data["history"] = []
@@ -253,6 +238,39 @@ class GatewayInput(GatewayBase):
 
         return copied_data
 
+    def _upload_file(self, file_service: FileService, file: dict, session_id: str):
+        """
+        Store an attached file, decoding base64 content chunk by chunk.
+        Returns the file metadata, or None if the content is invalid.
+        """
+        content = file["content"]
+        if type(content) == str:
+            try:
+                chunks = iter_base64_decoded(content)
+                first_chunk = next(chunks, b"")
+            except Exception as e:
+                chunks, first_chunk = iter(()), content.encode("utf-8")
+        elif type(content) == bytes:
+            chunks, first_chunk = iter(()), content
+        else:
+            log.error(
+                "Invalid content type for file %s: %s",
+                file["name"],
+                type(content),
+            )
+            return None
+
+        with file_service.open_write(
+            file["name"],
+            session_id,
+            file_size=file["size"],
+            data_source=f"User provided file - {self.gateway_id} Gateway",
+        ) as writer:
+            writer.write(first_chunk)
+            for chunk in chunks:
+                writer.write(chunk)
+        return writer.metadata
+
     def demote_interface_properties(
         self, dict_properties: Dict[str, Any], top_level_properties: set
     ):
@@ -1,9 +1,9 @@
-import base64
 from solace_ai_connector.common.message import Message
 from solace_ai_connector.common.log import log
 
 from .gateway_base import GatewayBase
 from ...services.file_service import FileService
+from ...services.file_service.file_utils import encode_base64_chunks, iter_buffer_chunks
 from ...common.utils import files_to_block_text
 from ...common.constants import HISTORY_ASSISTANT_ROLE
 
@@ -166,6 +166,50 @@ class GatewayOutput(GatewayBase):
         except Exception as e:
             log.error(f"Failed to resolve URLs in text: {e}")
 
+    def _download_file(self, file_service: FileService, file: dict, session_id: str):
+        """
+        Get an output file with its base64 encoded content.
+        Returns None if the file has no content.
+        """
+        output_file = {
+            "name": file.get("name"),
+        }
+        # inline file
+        if file.get("data"):
+            data_content = file_service.resolve_all_resolvable_urls(
+                file.get("data"), session_id
+            )
+            output_file["content"] = encode_base64_chunks(iter_buffer_chunks(data_content))
+            output_file["mime_type"] = file.get("mime_type", "text/plain")
+        elif file.get("url"):
+            url = file.get("url")
+            metadata = None
+            _, queries = file_service.get_parsed_url(url)
+            if not queries:
+                # Encode the stored file as it is read, without a full copy
+                output_file["content"] = encode_base64_chunks(
+                    file_service.iter_chunks(url, session_id)
+                )
+            else:
+                resolved_content, _, metadata = file_service.resolve_url(
+                    url, session_id, return_extra=True
+                )
+                output_file["content"] = encode_base64_chunks(
+                    iter_buffer_chunks(resolved_content)
+                )
+
+            # If the file name or mime type is not provided, try to get it from the resolved URL
+            if not output_file.get("name") or not output_file.get("mime_type"):
+                metadata = metadata or file_service.get_metadata(url)
+                output_file["name"] = output_file.get("name") or metadata.get("name")
+                output_file["mime_type"] = output_file.get(
+                    "mime_type"
+                ) or metadata.get("mime_type")
+        else:
+            log.error(f"No file content found for {file.get('name')}")
+            return None
+        return output_file
+
     def invoke(self, message: Message, data) -> Message:
         file_service = FileService()
         user_properties = message.get_user_properties()
@@ -219,50 +263,16 @@ class GatewayOutput(GatewayBase):
                 self.history_instance.clear_history(session_id, keep_depth)
 
         if files:
+            # Download the files concurrently, a failed download does not affect the others
+            results = file_service.map_concurrently(
+                lambda file: self._download_file(file_service, file, session_id), files
+            )
             downloaded_files = []
-            for file in files:
-                output_file = {
-                    "name": file.get("name"),
-                }
-                # inline file
-                if file.get("data"):
-                    data_content = file_service.resolve_all_resolvable_urls(
-                        file.get("data"), session_id
-                    )
-                    inline_data = base64.b64encode(data_content.encode()).decode()
-                    output_file["content"] = inline_data
-                    output_file["mime_type"] = file.get("mime_type", "text/plain")
-                elif file.get("url"):
-                    url = file.get("url")
-                    try:
-                        resolved_content = file_service.resolve_url(url, session_id)
-                        buffer_content = (
-                            resolved_content
-                            if type(resolved_content) == bytes
-                            else resolved_content.encode()
-                        )
-                        output_file["content"] = base64.b64encode(
-                            buffer_content
-                        ).decode("utf-8")
-
-                        # If the file name or mime type is not provided, try to get it from the resolved URL
-                        if not output_file.get("name") or not output_file.get(
-                            "mime_type"
-                        ):
-                            metadata = file_service.get_metadata(url)
-                            output_file["name"] = output_file.get(
-                                "name"
-                            ) or metadata.get("name")
-                            output_file["mime_type"] = output_file.get(
-                                "mime_type"
-                            ) or metadata.get("mime_type")
-                    except Exception as e:
-                        log.error(f"Failed to download file {file.get('name')}: {e}")
-                        continue
-                else:
-                    log.error(f"No file content found for {file.get('name')}")
-                    continue
-                downloaded_files.append(output_file)
+            for file, result in zip(files, results):
+                if isinstance(result, Exception):
+                    log.error(f"Failed to download file {file.get('name')}: {result}")
+                elif result:
+                    downloaded_files.append(result)
 
             data["files"] = downloaded_files
         data["server_input_id"] = server_input_id
@@ -1,5 +1,7 @@
 """This is a custom component that handles registrations from the distributed agents"""
 
+import os
+
 # from solace_ai_connector.common.log import log
 from solace_ai_connector.components.component_base import ComponentBase
 from solace_ai_connector.common.message import Message
@@ -23,6 +25,10 @@ info = {
                 "type": "string",
                 "description": "The name of the agent.",
             },
+            "digest": {
+                "type": "string",
+                "description": "The digest of the registration. A registration with only the agent name and digest is a heartbeat of an unchanged agent.",
+            },
             "description": {
                 "type": "string",
                 "description": "A description of the application.",
@@ -84,11 +90,16 @@ info = {
                 },
             },
         },
-        "required": ["agent_name", "description", "actions"],
+        "required": ["agent_name"],
     },
 }
 
 
+def get_registration_request_topic(agent_name: str) -> str:
+    """The topic on which an agent listens for requests of its full registration."""
+    return f"{os.getenv('SOLACE_AGENT_MESH_NAMESPACE')}solace-agent-mesh/v1/register/request/agent/{agent_name}"
+
+
 class OrchestratorRegister(ComponentBase):
     def __init__(self, **kwargs):
         super().__init__(info, **kwargs)
@@ -101,7 +112,20 @@ class OrchestratorRegister(ComponentBase):
                 self.kv_store_set("orchestrator_state", self.orchestrator_state)
 
     def invoke(self, message: Message, data):
-        """Receive a registration from an agent and store it in the component's state."""
+        """
+        Receive a registration or a heartbeat from an agent and store it in the component's state.
+        A heartbeat with an unknown digest, for example after a restart, is answered with a
+        request for the full registration of the agent.
+        """
         # log.info("Received registration from agent")
         self.orchestrator_state.register_agent(data)
-        return data
+        agent_name = data.get("agent_name")
+        if "actions" in data or not agent_name or self.orchestrator_state.has_agent_digest(
+            agent_name, data.get("digest")
+        ):
+            self.discard_current_message()
+            return None
+        return {
+            "payload": {"agent_name": agent_name},
+            "topic": get_registration_request_topic(agent_name),
+        }
@@ -376,6 +376,10 @@ class OrchestratorStimulusProcessorComponent(LLMRequestComponent):
                 self.discard_current_message()
                 return None
             else:
+                # The stimulus is done, release its orchestrator history
+                stimulus_uuid = user_properties.get("stimulus_uuid")
+                if stimulus_uuid:
+                    self.history.delete_history(stimulus_uuid)
                 return [
                     {
                         "payload": {},
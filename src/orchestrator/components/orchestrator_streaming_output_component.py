@@ -66,6 +66,10 @@ class OrchestratorStreamingOutputComponent(ComponentBase):
         # response complete messages also go through this flow
         # to maintain the order of messages with the streamed responses
         if data.get("response_complete"):
+            # The stimulus is done, release its orchestrator history
+            stimulus_uuid = message.get_user_properties().get("stimulus_uuid")
+            if stimulus_uuid:
+                self.history.delete_history(stimulus_uuid)
             return [data]
 
         user_properties = message.get_user_properties()
@@ -8,6 +8,8 @@ from ..common.time import TEN_MINUTES, THIRTY_MINUTES
 
 ORCHESTRATOR_HISTORY_IDENTIFIER = "orchestrator"
 
+ORCHESTRATOR_HISTORY_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+
 ORCHESTRATOR_HISTORY_CONFIG = {
     "type": "memory",
     "time_to_live": THIRTY_MINUTES,
@@ -16,6 +18,7 @@ ORCHESTRATOR_HISTORY_CONFIG = {
         "max_turns": 30,
         "max_characters": 0,
         "enforce_alternate_message_roles": False,
+        "max_memory_bytes": ORCHESTRATOR_HISTORY_MAX_MEMORY_BYTES,
     },
 }
 
@@ -42,20 +45,43 @@ class OrchestratorState:
         if not hasattr(self, "registered_agents"):
             self.registered_agents = {}
 
-    def register_agent(self, agent):
+    def register_agent(self, agent) -> bool:
+        """
+        Register an agent, or refresh its TTL.
+
+        An agent sends its full registration with the digest of its content
+        and, in between, heartbeats with only its name and digest. The entry
+        is replaced only when the content changed, and a heartbeat with an
+        unknown digest is ignored, the register component then requests the
+        full registration of the agent.
+        Returns whether the registered agents changed.
+        """
         with self._lock:
             agent_name = agent.get("agent_name")
-            agent["state"] = "closed"
+            digest = agent.get("digest")
+            expire_time = datetime.now() + timedelta(
+                milliseconds=self._config.get("agent_ttl_ms")
+            )
+            registered_agent = self.registered_agents.get(agent_name)
+
+            if digest and registered_agent and registered_agent.get("digest") == digest:
+                # Unchanged, only reset its TTL
+                registered_agent["expire_time"] = expire_time
+                return False
 
-            # Always update the agent information
+            if "actions" not in agent:
+                log.debug("Heartbeat with an unknown digest from agent %s", agent_name)
+                return False
+
+            agent["state"] = "closed"
+            agent["expire_time"] = expire_time
             self.registered_agents[agent_name] = agent
+            return True
 
-            # Reset its TTL
-            self.registered_agents[agent_name][
-                "expire_time"
-            ] = datetime.now() + timedelta(
-                milliseconds=self._config.get("agent_ttl_ms")
-            )
+    def has_agent_digest(self, agent_name, digest) -> bool:
+        with self._lock:
+            agent = self.registered_agents.get(agent_name)
+            return bool(agent and digest and agent.get("digest") == digest)
 
     def get_registered_agents(self):
         with self._lock:
@@ -1,32 +1,21 @@
 from abc import ABC, abstractmethod
-import time 
-import threading
 
-from solace_ai_connector.common.log import log
+from .expiry_scheduler import EXPIRY_SCHEDULER
 
 class AutoExpiry(ABC):
-    _expiry_thread = None
+    _expiry_job = None
     expiration_check_interval = None
-    _stop_expiry_thread = None
 
 
     def _start_auto_expiry_thread(self, expiration_check_interval):
-        """Starts a background thread to handle auto-expiry."""
+        """Registers the auto-expiry with the scheduler shared by the services."""
         self.expiration_check_interval = expiration_check_interval
-        self._stop_expiry_thread = threading.Event()
-        self._expiry_thread = threading.Thread(
-            target=self._auto_expiry_task, daemon=True
+        identifier = getattr(self, "identifier", None) or "default"
+        self._expiry_job = EXPIRY_SCHEDULER.add_job(
+            f"{type(self).__name__}:{identifier}",
+            self._delete_expired_items,
+            expiration_check_interval,
         )
-        self._expiry_thread.start()
-
-    def _auto_expiry_task(self):
-        """Background task to check and delete expired items."""
-        while not self._stop_expiry_thread.is_set():
-            try:
-                self._delete_expired_items()
-            except Exception as e:
-                log.error(f"Error during auto-expiry process: {e}")
-            time.sleep(self.expiration_check_interval)
 
     @abstractmethod
     def _delete_expired_items(self):
@@ -34,12 +23,11 @@ class AutoExpiry(ABC):
         raise NotImplementedError
         
     def stop_auto_expiry(self):
-        """Stops the auto-expiry background thread."""
-        if self._stop_expiry_thread:
-            self._stop_expiry_thread.set()
-        if self._expiry_thread and self._expiry_thread.is_alive():
-            self._expiry_thread.join()
+        """Stops the auto-expiry of this service."""
+        if self._expiry_job:
+            EXPIRY_SCHEDULER.remove_job(self._expiry_job)
+            self._expiry_job = None
 
     def __del__(self):
-        """Ensure the expiry thread stops when the service is destroyed."""
+        """Ensure the auto-expiry stops when the service is destroyed."""
         self.stop_auto_expiry()
@@ -0,0 +1,136 @@
+"""
+A single background thread that runs the periodic sweeps of the services.
+
+Each AutoExpiry service registers its sweep as a job instead of starting its own
+thread. Jobs run one at a time, each interval is shortened by a random jitter
+so that the sweeps of services started together spread out, and the run times
+of every job are kept for monitoring.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from solace_ai_connector.common.log import log
+
+DEFAULT_JITTER = 0.1
+
+
+class ExpiryJob:
+    """
+    A periodic job, with the timings of its runs.
+    """
+
+    def __init__(self, name: str, function, interval: float, jitter: float):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.jitter = jitter
+        self.cancelled = False
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    def get_delay(self) -> float:
+        # The jitter only shortens the interval, items never wait longer than it
+        return self.interval * (1 - random.uniform(0, self.jitter))
+
+    def as_dict(self) -> dict:
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_duration": self.last_duration,
+            "max_duration": self.max_duration,
+            "average_duration": self.total_duration / self.runs if self.runs else 0.0,
+        }
+
+
+class ExpiryScheduler:
+    """
+    Runs the registered jobs on one daemon thread, started with the first job.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap = []
+        self._counter = itertools.count()
+        self._jobs = {}
+        self._thread = None
+
+    def add_job(self, name: str, function, interval: float, jitter: float = DEFAULT_JITTER) -> ExpiryJob:
+        """
+        Run function now, then about every interval seconds.
+        A job with the same name is replaced.
+        """
+        job = ExpiryJob(name, function, interval, jitter)
+        with self._condition:
+            previous_job = self._jobs.get(name)
+            if previous_job:
+                previous_job.cancelled = True
+            self._jobs[name] = job
+            heapq.heappush(self._heap, (time.monotonic(), next(self._counter), job))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, daemon=True, name="expiry-scheduler"
+                )
+                self._thread.start()
+            self._condition.notify()
+        return job
+
+    def remove_job(self, job: ExpiryJob):
+        with self._condition:
+            job.cancelled = True
+            if self._jobs.get(job.name) is job:
+                del self._jobs[job.name]
+
+    def get_metrics(self) -> dict:
+        """
+        Get the run count, failure count and run durations, in seconds, of each job by name.
+        """
+        with self._condition:
+            return {name: job.as_dict() for name, job in self._jobs.items()}
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._condition.wait(timeout)
+                _, _, job = heapq.heappop(self._heap)
+            if job.cancelled:
+                continue
+
+            start_time = time.monotonic()
+            try:
+                job.function()
+            except Exception as e:
+                job.failures += 1
+                log.error(f"Error during auto-expiry process of {job.name}: {e}")
+            duration = time.monotonic() - start_time
+            job.runs += 1
+            job.last_duration = duration
+            job.total_duration += duration
+            job.max_duration = max(job.max_duration, duration)
+            if duration > job.interval:
+                log.warning(
+                    "The auto-expiry of %s took %.1fs, longer than its interval of %ss",
+                    job.name,
+                    duration,
+                    job.interval,
+                )
+
+            with self._condition:
+                if not job.cancelled:
+                    heapq.heappush(
+                        self._heap,
+                        (start_time + job.get_delay(), next(self._counter), job),
+                    )
+
+
+# Shared by all the services of the process
+EXPIRY_SCHEDULER = ExpiryScheduler()
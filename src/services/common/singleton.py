@@ -1,17 +1,28 @@
+import threading
+
 from .auto_expiry import AutoExpiry
 
 # Singleton pattern - Ensuring that only one instance of the class is created per given identifier
 class SingletonMeta(type):
     _instances = {}
+    _locks = {}
+    _locks_lock = threading.Lock()
 
     def __call__(cls, *args, **kwargs):
         identifier = kwargs.get("identifier", "default")
-        if cls not in cls._instances:
-            cls._instances[cls] = {}
-        if identifier not in cls._instances[cls]:
-            instance = super().__call__(*args, **kwargs)
-            cls._instances[cls][identifier] = instance
-        return cls._instances[cls][identifier]
+        instances = cls._instances.get(cls, {})
+        if identifier in instances:
+            return instances[identifier]
+
+        # One lock per instance, so concurrent calls construct it once without
+        # waiting for the construction of the other instances
+        with SingletonMeta._locks_lock:
+            lock = SingletonMeta._locks.setdefault((cls, identifier), threading.Lock())
+        with lock:
+            instances = cls._instances.setdefault(cls, {})
+            if identifier not in instances:
+                instances[identifier] = super().__call__(*args, **kwargs)
+            return instances[identifier]
 
 
 class AutoExpirySingletonMeta(SingletonMeta, type(AutoExpiry)):
@@ -2,6 +2,7 @@ from .file_service import FileService, FileServicePermissionError, FS_URL_REGEX
 from .file_utils import Types
 from .file_transformations import LLM_QUERY_OPTIONS, TRANSFORMERS
 from .file_service_constants import FS_PROTOCOL
+from .url_resolver import FileResolutionError
 
 __all__ = [
     "FileService",
@@ -0,0 +1,95 @@
+"""
+Expiration schedule of the files of a file service.
+
+A min-heap of (expiration_timestamp, filename) with the current expiration of
+each file next to it. Changing or removing an expiration leaves the old heap
+entry in place, it is skipped when popped as it no longer matches the file's
+current expiration.
+"""
+
+import heapq
+import threading
+
+
+class ExpirySchedule:
+    """
+    A thread-safe schedule of file expirations.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._expirations = {}
+        self.seeded = False
+
+    def __len__(self) -> int:
+        return len(self._expirations)
+
+    def seed(self, entries, replace: bool = False):
+        """
+        Add the (expiration_timestamp, filename) entries of the files already stored.
+        Files scheduled in the meantime keep their expiration, unless replace is
+        set, when the entries come from a new listing of the storage.
+        """
+        entries = list(entries)
+        with self._lock:
+            for expiration_timestamp, filename in entries:
+                current = self._expirations.get(filename)
+                if current is None or (replace and current != expiration_timestamp):
+                    self._expirations[filename] = expiration_timestamp
+                    self._heap.append((expiration_timestamp, filename))
+            heapq.heapify(self._heap)
+            self._compact()
+            self.seeded = True
+
+    def add(self, filename: str, expiration_timestamp: float):
+        """
+        Schedule a file, or reschedule it if its expiration changed.
+        """
+        with self._lock:
+            if self._expirations.get(filename) == expiration_timestamp:
+                return
+            self._expirations[filename] = expiration_timestamp
+            heapq.heappush(self._heap, (expiration_timestamp, filename))
+            self._compact()
+
+    def remove(self, filename: str):
+        with self._lock:
+            self._expirations.pop(filename, None)
+
+    def get(self, filename: str):
+        """
+        Get the scheduled expiration of a file, or None.
+        """
+        return self._expirations.get(filename)
+
+    def next_expiration(self):
+        """
+        Get the earliest expiration, or None if no file is scheduled.
+        """
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, timestamp: float) -> list:
+        """
+        Unschedule and return the names of the files that expired before the timestamp.
+        """
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] < timestamp:
+                expiration_timestamp, filename = heapq.heappop(self._heap)
+                if self._expirations.get(filename) == expiration_timestamp:
+                    del self._expirations[filename]
+                    due.append(filename)
+        return due
+
+    def _compact(self):
+        # Compact once the stale entries outnumber the scheduled files
+        if len(self._heap) > 2 * len(self._expirations) + 64:
+            self._heap = [(t, name) for name, t in self._expirations.items()]
+            heapq.heapify(self._heap)
+
+    def _drop_stale(self):
+        while self._heap and self._expirations.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
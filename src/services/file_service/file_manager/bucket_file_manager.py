@@ -1,13 +1,44 @@
 import boto3
-import os
 import json
+import threading
+import uuid
+from collections import OrderedDict
 from io import BytesIO
+from typing import BinaryIO, Iterator
 from botocore.exceptions import NoCredentialsError, ClientError
 
+from solace_ai_connector.common.log import log
+
+from .dedup import CONTENT_HASH_KEY, DEFAULT_DEDUPLICATE, DedupStats, HashingSink, hash_content
 from .file_manager_base import FileManagerBase
+from .bucket_metadata_index import BucketMetadataIndex
+from .bucket_multipart_writer import BucketMultipartSink
+from .file_writer import FileWriter
+from ..file_service_constants import DEFAULT_CHUNK_SIZE
+
+LIFECYCLE_RULE_ID = "solace-agent-mesh-file-service-expiry"
+# The lifecycle rule only expires the objects with this tag
+LIFECYCLE_TAG_KEY = "solace-agent-mesh-file-service"
+LIFECYCLE_TAG_VALUE = "file"
+DEFAULT_BLOB_PREFIX = ".amfs_blobs/"
+OBJECT_KEY_CACHE_SIZE = 4096
+# The maximum number of keys of a DeleteObjects request
+DELETE_BATCH_SIZE = 1000
 
 
 class BucketFileManager(FileManagerBase):
+    """
+    Stores files in an S3 compatible bucket.
+
+    With deduplication, each content is stored once under the blob prefix, named
+    by its SHA-256, and every uploaded file adds an empty reference object next
+    to it. The file's metadata points at the blob, which is deleted with its last
+    reference. Uploading content that is already stored only writes the
+    reference and the metadata. A released blob is kept aside until no new
+    reference is found, so that an upload that found it just before it was
+    deleted does not lose its content.
+    """
+
     def __init__(self, config, ttl):
         self.config = config
         self.ttl = ttl
@@ -38,6 +69,150 @@ class BucketFileManager(FileManagerBase):
             else:
                 raise Exception(f"Unexpected error: {e}")
 
+        # With a lifecycle rule, the objects of each file are tagged for it
+        lifecycle_expiration_days = config.get("lifecycle_expiration_days")
+        self.tagging = f"{LIFECYCLE_TAG_KEY}={LIFECYCLE_TAG_VALUE}" if lifecycle_expiration_days else None
+        self.put_args = {"Tagging": self.tagging} if self.tagging else {}
+
+        self.metadata_index = None
+        if config.get("metadata_index", True):
+            self.metadata_index = BucketMetadataIndex(
+                self.bucket,
+                config.get("metadata_index_prefix"),
+                config.get("max_concurrency"),
+                self.tagging,
+            )
+            if self.metadata_index.is_empty():
+                # Files may have been written before the index existed
+                count = self.metadata_index.rebuild()
+                if count:
+                    log.info("Indexed the metadata of %d files in bucket %s", count, self.bucket_name)
+
+        if lifecycle_expiration_days:
+            self._apply_lifecycle_rule(int(lifecycle_expiration_days))
+
+        self.blob_prefix = config.get("blob_prefix", DEFAULT_BLOB_PREFIX)
+        deduplicate = config.get("deduplicate", DEFAULT_DEDUPLICATE)
+        # Files deduplicated before the lifecycle rule was added are still read from their blob
+        self.resolve_blobs = bool(deduplicate)
+        if deduplicate and lifecycle_expiration_days:
+            # The rule would expire the references of a blob without releasing it,
+            # and a tagged blob could expire while newer files still share it
+            log.info("File deduplication is disabled in bucket %s by the lifecycle rule", self.bucket_name)
+            deduplicate = False
+        self.dedup_stats = DedupStats() if deduplicate else None
+        # File names never change blob, so their resolved object keys can be cached
+        self._object_keys = OrderedDict()
+        self._object_keys_lock = threading.Lock()
+
+    def _get_blob_key(self, content_hash: str) -> str:
+        return f"{self.blob_prefix}{content_hash}"
+
+    def _get_reference_prefix(self, content_hash: str) -> str:
+        return f"{self.blob_prefix}refs/{content_hash}/"
+
+    def _add_blob_reference(self, content_hash: str, file_signature: str) -> bool:
+        """
+        Reference the blob from the file. Returns whether the blob is already stored.
+        """
+        client = self.bucket.meta.client
+        # The reference is written first so a concurrent delete keeps the blob
+        client.put_object(
+            Bucket=self.bucket_name,
+            Key=self._get_reference_prefix(content_hash) + file_signature,
+            Body=b"",
+        )
+        try:
+            client.head_object(Bucket=self.bucket_name, Key=self._get_blob_key(content_hash))
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+                raise
+            return False
+
+    def _has_blob_references(self, content_hash: str) -> bool:
+        response = self.bucket.meta.client.list_objects_v2(
+            Bucket=self.bucket_name, Prefix=self._get_reference_prefix(content_hash), MaxKeys=1
+        )
+        return bool(response.get("KeyCount"))
+
+    def _release_blob(self, content_hash: str):
+        """
+        Delete the blob once no file references it anymore.
+
+        A file can reference the blob between the check and the delete, and skip
+        its upload as the blob still exists. The blob is copied aside before it
+        is deleted, and copied back if a reference appeared in the meantime.
+        """
+        if self._has_blob_references(content_hash):
+            return
+        client = self.bucket.meta.client
+        blob_key = self._get_blob_key(content_hash)
+        released_key = f"{self.blob_prefix}released/{content_hash}/{uuid.uuid4()}"
+        try:
+            client.copy({"Bucket": self.bucket_name, "Key": blob_key}, self.bucket_name, released_key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+                raise
+            # Already released by another process
+            return
+        # On failure, the copy is left in place rather than losing the content
+        client.delete_object(Bucket=self.bucket_name, Key=blob_key)
+        if self._has_blob_references(content_hash):
+            log.debug("Blob %s was referenced while it was released, restoring it", content_hash)
+            client.copy({"Bucket": self.bucket_name, "Key": released_key}, self.bucket_name, blob_key)
+        client.delete_object(Bucket=self.bucket_name, Key=released_key)
+
+    def _get_object_key(self, file_name: str) -> str:
+        """
+        Get the key of the object holding the content of a file.
+        """
+        if not self.resolve_blobs:
+            return file_name
+        with self._object_keys_lock:
+            if file_name in self._object_keys:
+                self._object_keys.move_to_end(file_name)
+                return self._object_keys[file_name]
+
+        content_hash = self.get_metadata(file_name).get(CONTENT_HASH_KEY)
+        object_key = self._get_blob_key(content_hash) if content_hash else file_name
+        with self._object_keys_lock:
+            self._object_keys[file_name] = object_key
+            if len(self._object_keys) > OBJECT_KEY_CACHE_SIZE:
+                self._object_keys.popitem(last=False)
+        return object_key
+
+    def _apply_lifecycle_rule(self, days: int):
+        """
+        Add (or update) a bucket lifecycle rule that expires the tagged objects of
+        the files after the given days, keeping the other rules of the bucket.
+        The other objects of the bucket are not tagged. Files are not deduplicated
+        with the rule, which can not release the blobs of the files it expires.
+        """
+        client = self.bucket.meta.client
+        try:
+            rules = client.get_bucket_lifecycle_configuration(Bucket=self.bucket_name)["Rules"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "NoSuchLifecycleConfiguration":
+                raise RuntimeError(f"Failed to read the bucket lifecycle configuration: {str(e)}")
+            rules = []
+
+        rules = [rule for rule in rules if rule.get("ID") != LIFECYCLE_RULE_ID]
+        rules.append(
+            {
+                "ID": LIFECYCLE_RULE_ID,
+                "Filter": {"Tag": {"Key": LIFECYCLE_TAG_KEY, "Value": LIFECYCLE_TAG_VALUE}},
+                "Status": "Enabled",
+                "Expiration": {"Days": days},
+            }
+        )
+        try:
+            client.put_bucket_lifecycle_configuration(
+                Bucket=self.bucket_name, LifecycleConfiguration={"Rules": rules}
+            )
+        except ClientError as e:
+            raise RuntimeError(f"Failed to set the bucket lifecycle configuration: {str(e)}")
+
     def _save_metadata(self, file_signature: str, metadata: dict):
         metadata_key = self._get_metadata_name(file_signature)
         metadata_content = json.dumps(metadata, indent=4)
@@ -47,103 +222,287 @@ class BucketFileManager(FileManagerBase):
                 Key=metadata_key,
                 Body=metadata_content,
                 ContentType="application/json",
+                **self.put_args,
             )
         except (NoCredentialsError, ClientError) as e:
             raise RuntimeError(f"Failed to save metadata to S3: {str(e)}")
 
+    def _index_metadata(self, file_signature: str, metadata: dict):
+        if not self.metadata_index:
+            return
+        try:
+            self.metadata_index.add(file_signature, metadata)
+        except (NoCredentialsError, ClientError) as e:
+            raise RuntimeError(f"Failed to index metadata in S3: {str(e)}")
+
     def upload_from_buffer(self, buffer: bytes, file_name: str, **kwargs) -> dict:
         file_signature = self._generate_file_signature(file_name)
         metadata = self._create_metadata(file_signature, file_name, buffer, kwargs)
 
         try:
-            self.bucket.put_object(
-                Key=file_signature,
-                Body=buffer,
-                ContentType=metadata.get("mime_type") or "application/octet-stream",
-            )
+            object_key = file_signature
+            deduplicated = False
+            stored_metadata = metadata
+            if self.dedup_stats:
+                content_hash = hash_content(buffer)
+                # The hash is internal, it is only kept in the stored metadata
+                stored_metadata = {**metadata, CONTENT_HASH_KEY: content_hash}
+                object_key = self._get_blob_key(content_hash)
+                deduplicated = self._add_blob_reference(content_hash, file_signature)
+                self.dedup_stats.record(len(buffer), deduplicated)
+            if not deduplicated:
+                self.bucket.put_object(
+                    Key=object_key,
+                    Body=buffer,
+                    ContentType=metadata.get("mime_type") or "application/octet-stream",
+                    **self.put_args,
+                )
         except (NoCredentialsError, ClientError) as e:
             raise RuntimeError(f"Failed to upload file to S3: {str(e)}")
 
-        self._save_metadata(file_signature, metadata)
+        self._save_metadata(file_signature, stored_metadata)
+        self._index_metadata(file_signature, metadata)
+        self._schedule_schema_inference(file_signature, metadata)
 
         return metadata
 
-    def upload_from_file(self, file_path: str, **kwargs) -> dict:
-        if not os.path.isfile(file_path):
-            raise FileNotFoundError(f"The file {file_path} does not exist.")
-
-        file_name = os.path.basename(file_path)
+    def open_write(self, file_name: str, **kwargs) -> FileWriter:
         file_signature = self._generate_file_signature(file_name)
         content_type = kwargs.get("mime_type") or self._get_mime_type(file_name) or "application/octet-stream"
+        client = self.bucket.meta.client
+        # Deduplicated content is uploaded to a pending key until its hash is known
+        upload_key = f"{self.blob_prefix}pending/{uuid.uuid4()}" if self.dedup_stats else file_signature
+        sink = BucketMultipartSink(
+            client,
+            self.bucket_name,
+            upload_key,
+            content_type,
+            self.config.get("multipart_part_size"),
+            self.tagging,
+        )
+        hashing_sink = HashingSink(sink)
+        extra_metadata = {}
 
-        try:
-            with open(file_path, "rb") as file_data:
-                self.bucket.put_object(
-                    Key=file_signature,
-                    Body=file_data,
-                    ContentType=content_type,
-                )
-                metadata = self._create_metadata(file_signature, file_name, file_data.read(), kwargs)
-        except (NoCredentialsError, ClientError) as e:
-            raise RuntimeError(f"Failed to upload file to S3: {str(e)}")
+        def store_blob(size: int) -> str:
+            content_hash = hashing_sink.hexdigest()
+            extra_metadata[CONTENT_HASH_KEY] = content_hash
+            blob_key = self._get_blob_key(content_hash)
+            deduplicated = self._add_blob_reference(content_hash, file_signature)
+            if not deduplicated:
+                # Server-side copy, in parts for large objects
+                client.copy({"Bucket": self.bucket_name, "Key": upload_key}, self.bucket_name, blob_key)
+            client.delete_object(Bucket=self.bucket_name, Key=upload_key)
+            self.dedup_stats.record(size, deduplicated)
+            return blob_key
 
-        self._save_metadata(file_signature, metadata)
+        def on_close(writer):
+            try:
+                sink.complete()
+                object_key = store_blob(writer.size) if self.dedup_stats else file_signature
+            except (NoCredentialsError, ClientError) as e:
+                sink.abort()
+                raise RuntimeError(f"Failed to upload file to S3: {str(e)}")
+            metadata = self._create_stream_metadata(
+                file_signature,
+                file_name,
+                writer.size,
+                lambda: self._iter_object_chunks(object_key),
+                kwargs,
+            )
+            self._save_metadata(file_signature, {**metadata, **extra_metadata})
+            self._index_metadata(file_signature, metadata)
+            self._schedule_schema_inference(file_signature, metadata)
+            return metadata
 
-        return metadata
+        return FileWriter(hashing_sink if self.dedup_stats else sink, on_close, lambda writer: sink.abort())
 
-    def download_to_buffer(self, file_name: str) -> bytes:
+    def _download_object(self, key: str) -> bytes:
         try:
             buffer = BytesIO()
-            obj = self.bucket.Object(file_name)
+            obj = self.bucket.Object(key)
             obj.download_fileobj(buffer)
             buffer.seek(0)
             return buffer.read()
         except (NoCredentialsError, ClientError) as e:
             raise RuntimeError(f"Failed to download file from S3: {str(e)}")
 
-    def download_to_file(self, file_name: str, destination_path: str):
-        buffer = self.download_to_buffer(file_name)
+    def download_to_buffer(self, file_name: str) -> bytes:
+        return self._download_object(self._get_object_key(file_name))
+
+    def open_read(self, file_name: str) -> BinaryIO:
+        """
+        Open the object body as a stream, without downloading it first.
+        """
+        return self._open_object(self._get_object_key(file_name))
+
+    def _open_object(self, key: str) -> BinaryIO:
+        try:
+            return self.bucket.Object(key).get()["Body"]
+        except (NoCredentialsError, ClientError) as e:
+            raise RuntimeError(f"Failed to download file from S3: {str(e)}")
+
+    def iter_chunks(self, file_name: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        return self._iter_object_chunks(self._get_object_key(file_name), chunk_size)
 
+    def _iter_object_chunks(self, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        body = self._open_object(key)
         try:
-            with open(destination_path, "wb") as destination_file:
-                destination_file.write(buffer)
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def download_to_file(self, file_name: str, destination_path: str):
+        try:
+            # Managed transfer, downloads large objects in concurrent ranged parts
+            self.bucket.download_file(self._get_object_key(file_name), destination_path)
+        except (NoCredentialsError, ClientError) as e:
+            raise RuntimeError(f"Failed to download file from S3: {str(e)}")
         except IOError as e:
             raise RuntimeError(f"Failed to write file to destination: {str(e)}")
 
     def get_metadata(self, file_name: str) -> dict:
         metadata_key = self._get_metadata_name(file_name)
-        meta_buffer = self.download_to_buffer(metadata_key)
+        meta_buffer = self._download_object(metadata_key)
         return json.loads(meta_buffer)
 
-    def delete_by_name(self, file_name: str):
-        metadata_key = self._get_metadata_name(file_name)
-
+    def _get_file_keys(self, file_name: str):
+        """
+        Get the keys of the objects of a file: the file, its metadata, its blob
+        reference and its index markers. Returns the keys and the content hash.
+        """
+        keys = [file_name, self._get_metadata_name(file_name)]
+        content_hash = None
         try:
-            # the main file
-            file = self.bucket.Object(file_name)
-            # the metadata file
-            meta = self.bucket.Object(metadata_key)
+            metadata = self.get_metadata(file_name)
+            content_hash = metadata.get(CONTENT_HASH_KEY)
+            if content_hash:
+                keys.append(self._get_reference_prefix(content_hash) + file_name)
+            if self.metadata_index:
+                keys.extend(self.metadata_index.get_keys(file_name, metadata))
+        except RuntimeError:
+            # The metadata is already gone, only its markers can be left
+            log.debug("No metadata found for %s while deleting it", file_name)
+
+        with self._object_keys_lock:
+            self._object_keys.pop(file_name, None)
+        return keys, content_hash
 
-            # Delete the files
-            file.delete()
-            meta.delete()
+    def delete_by_name(self, file_name: str):
+        keys, content_hash = self._get_file_keys(file_name)
+        try:
+            # All the objects of the file in one request
+            response = self.bucket.delete_objects(
+                Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+            )
         except (NoCredentialsError, ClientError) as e:
             raise RuntimeError(f"Failed to delete file from S3: {str(e)}")
-        
+        errors = response.get("Errors", [])
+        for error in errors:
+            log.error("Failed to delete object %s from S3: %s", error.get("Key"), error.get("Message"))
+        if errors:
+            raise RuntimeError(f"Failed to delete file from S3: {errors[0].get('Message')}")
+        if content_hash:
+            try:
+                self._release_blob(content_hash)
+            except (NoCredentialsError, ClientError) as e:
+                raise RuntimeError(f"Failed to delete file from S3: {str(e)}")
+
+    def delete_by_names(self, file_names: list) -> dict:
+        errors = {}
+        file_by_key = {}
+        content_hashes = {}
+        for file_name in file_names:
+            keys, content_hash = self._get_file_keys(file_name)
+            file_by_key.update((key, file_name) for key in keys)
+            if content_hash:
+                content_hashes[file_name] = content_hash
+
+        # The objects of all the files, in requests of at most DELETE_BATCH_SIZE keys
+        keys = list(file_by_key)
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start : start + DELETE_BATCH_SIZE]
+            try:
+                response = self.bucket.delete_objects(
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+                )
+            except (NoCredentialsError, ClientError) as e:
+                error = RuntimeError(f"Failed to delete file from S3: {str(e)}")
+                errors.update((file_by_key[key], error) for key in batch)
+                continue
+            for error in response.get("Errors", []):
+                log.error("Failed to delete object %s from S3: %s", error.get("Key"), error.get("Message"))
+                file_name = file_by_key.get(error.get("Key"), error.get("Key"))
+                errors[file_name] = RuntimeError(
+                    f"Failed to delete file from S3: {error.get('Message')}"
+                )
+
+        for content_hash in {
+            content_hash
+            for file_name, content_hash in content_hashes.items()
+            if file_name not in errors
+        }:
+            try:
+                self._release_blob(content_hash)
+            except (NoCredentialsError, ClientError) as e:
+                log.error("Failed to release blob %s: %s", content_hash, e)
+        return errors
+
     def update_file_expiration(self, file_signature, expiration_timestamp):
-        metadata = self.get_metadata(file_signature)
-        metadata["expiration_timestamp"] = expiration_timestamp
+        self.update_metadata(file_signature, {"expiration_timestamp": expiration_timestamp})
+
+    def update_metadata(self, file_signature: str, values: dict):
+        old_metadata = self.get_metadata(file_signature)
+        metadata = {**old_metadata, **values}
         self._save_metadata(file_signature, metadata)
+        if self.metadata_index:
+            try:
+                self.metadata_index.update(file_signature, old_metadata, metadata)
+            except (NoCredentialsError, ClientError) as e:
+                raise RuntimeError(f"Failed to index metadata in S3: {str(e)}")
 
     def list_all_metadata(self) -> list:
-        all_metadata = []
         try:
+            if self.metadata_index:
+                return self.metadata_index.list_all()
+            all_metadata = []
             for obj in self.bucket.objects.all():
                 if obj.key.endswith(".metadata"):
-                    meta_buffer = self.download_to_buffer(obj.key)
+                    meta_buffer = self._download_object(obj.key)
                     metadata = json.loads(meta_buffer)
 
                     all_metadata.append(metadata)
         except (NoCredentialsError, ClientError) as e:
             raise RuntimeError(f"Failed to list metadata from S3: {str(e)}")
         return all_metadata
+
+    def list_metadata_by_session(self, session_id: str) -> list:
+        if not self.metadata_index:
+            return super().list_metadata_by_session(session_id)
+        try:
+            return self.metadata_index.list_by_session(session_id)
+        except (NoCredentialsError, ClientError) as e:
+            raise RuntimeError(f"Failed to list metadata from S3: {str(e)}")
+
+    def list_expired_metadata(self, timestamp: float) -> list:
+        if not self.metadata_index:
+            return super().list_expired_metadata(timestamp)
+        try:
+            return self.metadata_index.list_expired(timestamp)
+        except (NoCredentialsError, ClientError) as e:
+            raise RuntimeError(f"Failed to list metadata from S3: {str(e)}")
+
+    def list_expirations(self) -> list:
+        if not self.metadata_index:
+            return super().list_expirations()
+        try:
+            return self.metadata_index.list_expirations()
+        except (NoCredentialsError, ClientError) as e:
+            raise RuntimeError(f"Failed to list metadata from S3: {str(e)}")
+
+    def rebuild_metadata_index(self) -> int:
+        """
+        Rebuild the metadata index from the metadata objects in the bucket.
+        """
+        if not self.metadata_index:
+            raise ValueError("The metadata index is disabled for this file manager.")
+        return self.metadata_index.rebuild()
@@ -0,0 +1,185 @@
+"""
+Key-based index of the metadata objects stored by the BucketFileManager.
+
+For every file, two empty marker objects are written whose keys carry the indexed
+fields:
+
+    <prefix>session/<quoted session_id>/<file name>
+    <prefix>expiry/<zero padded expiration timestamp>/<file name>
+
+A paginated listing of one of these prefixes finds the files of a session, or
+the expired files in timestamp order, without reading any metadata object.
+S3 listings do not return object tags or user metadata, which is why the fields
+are kept in the keys. Only the matching metadata objects are then downloaded,
+concurrently on a bounded thread pool.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from solace_ai_connector.common.log import log
+
+from ..file_service_constants import META_FILE_EXTENSION
+
+DEFAULT_INDEX_PREFIX = ".amfs_index/"
+DEFAULT_MAX_CONCURRENCY = 16
+TIMESTAMP_DIGITS = 12
+# S3 accepts at most 1000 keys per delete_objects request
+MAX_DELETE_BATCH = 1000
+
+
+class BucketMetadataIndex:
+    """
+    Maintains the marker objects and reads metadata through them.
+    """
+
+    def __init__(self, bucket, prefix: str = None, max_concurrency: int = None, tagging: str = None):
+        self.bucket = bucket
+        # Clients are thread-safe, unlike resources
+        self.client = bucket.meta.client
+        self.prefix = prefix or DEFAULT_INDEX_PREFIX
+        self.max_concurrency = max_concurrency or DEFAULT_MAX_CONCURRENCY
+        # The markers are tagged like the metadata objects they index
+        self.put_args = {"Tagging": tagging} if tagging else {}
+
+    def _session_prefix(self, session_id) -> str:
+        return f"{self.prefix}session/{quote(str(session_id), safe='')}/"
+
+    def _expiry_prefix(self) -> str:
+        return f"{self.prefix}expiry/"
+
+    def get_keys(self, name: str, metadata: dict) -> list:
+        """
+        The marker keys of a file.
+        """
+        keys = []
+        if metadata.get("session_id") is not None:
+            keys.append(self._session_prefix(metadata["session_id"]) + name)
+        if metadata.get("expiration_timestamp") is not None:
+            timestamp = int(metadata["expiration_timestamp"])
+            keys.append(f"{self._expiry_prefix()}{timestamp:0{TIMESTAMP_DIGITS}d}/{name}")
+        return keys
+
+    def _iter_keys(self, prefix: str = ""):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket.name, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"]
+
+    def is_empty(self) -> bool:
+        response = self.client.list_objects_v2(
+            Bucket=self.bucket.name, Prefix=self.prefix, MaxKeys=1
+        )
+        return not response.get("KeyCount")
+
+    def add(self, name: str, metadata: dict):
+        for key in self.get_keys(name, metadata):
+            self.client.put_object(Bucket=self.bucket.name, Key=key, Body=b"", **self.put_args)
+
+    def update(self, name: str, old_metadata: dict, metadata: dict):
+        old_keys = set(self.get_keys(name, old_metadata))
+        new_keys = set(self.get_keys(name, metadata))
+        for key in new_keys - old_keys:
+            self.client.put_object(Bucket=self.bucket.name, Key=key, Body=b"", **self.put_args)
+        self.delete_keys(list(old_keys - new_keys))
+
+    def delete_keys(self, keys: list):
+        for start in range(0, len(keys), MAX_DELETE_BATCH):
+            batch = keys[start : start + MAX_DELETE_BATCH]
+            response = self.client.delete_objects(
+                Bucket=self.bucket.name,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+            for error in response.get("Errors", []):
+                log.warning("Failed to delete index marker %s: %s", error.get("Key"), error.get("Message"))
+
+    def fetch_metadata(self, names: list) -> dict:
+        """
+        Download the metadata of the files concurrently.
+
+        :return: The metadata by file name. Files whose metadata no longer exists are left out.
+        """
+
+        def fetch(name):
+            try:
+                response = self.client.get_object(
+                    Bucket=self.bucket.name, Key=f"{name}{META_FILE_EXTENSION}"
+                )
+                return name, json.loads(response["Body"].read())
+            except self.client.exceptions.NoSuchKey:
+                return name, None
+
+        if not names:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(names))) as executor:
+            return {
+                name: metadata
+                for name, metadata in executor.map(fetch, names)
+                if metadata is not None
+            }
+
+    def _fetch_indexed(self, keys_by_name: dict) -> list:
+        found = self.fetch_metadata(list(keys_by_name))
+        stale = [key for name, key in keys_by_name.items() if name not in found]
+        if stale:
+            # The file was removed without its markers, e.g. by a lifecycle rule
+            log.debug("Removing %d stale file metadata index entries", len(stale))
+            self.delete_keys(stale)
+        return list(found.values())
+
+    def list_all(self) -> list:
+        names = [
+            key[: -len(META_FILE_EXTENSION)]
+            for key in self._iter_keys()
+            if key.endswith(META_FILE_EXTENSION) and not key.startswith(self.prefix)
+        ]
+        return list(self.fetch_metadata(names).values())
+
+    def list_by_session(self, session_id) -> list:
+        prefix = self._session_prefix(session_id)
+        return self._fetch_indexed({key[len(prefix) :]: key for key in self._iter_keys(prefix)})
+
+    def list_expired(self, timestamp: float) -> list:
+        prefix = self._expiry_prefix()
+        keys_by_name = {}
+        # Keys are listed in timestamp order, stop at the first one in the future
+        for key in self._iter_keys(prefix):
+            expiry, _, name = key[len(prefix) :].partition("/")
+            if int(expiry) > timestamp:
+                break
+            keys_by_name[name] = key
+        return [
+            metadata
+            for metadata in self._fetch_indexed(keys_by_name)
+            if metadata["expiration_timestamp"] < timestamp
+        ]
+
+    def list_expirations(self) -> list:
+        """
+        The (expiration timestamp, file name) pairs of all indexed files, read
+        from the marker keys only. Timestamps are truncated to the second.
+        """
+        prefix = self._expiry_prefix()
+        expirations = []
+        for key in self._iter_keys(prefix):
+            expiry, _, name = key[len(prefix) :].partition("/")
+            expirations.append((int(expiry), name))
+        return expirations
+
+    def rebuild(self) -> int:
+        """
+        Replace the markers with ones built from the metadata objects in the bucket.
+
+        :return: The number of indexed files.
+        """
+        self.delete_keys(list(self._iter_keys(self.prefix)))
+        all_metadata = self.list_all()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            list(
+                executor.map(
+                    lambda metadata: self.add(metadata["url"].split("://", 1)[-1], metadata),
+                    all_metadata,
+                )
+            )
+        return len(all_metadata)
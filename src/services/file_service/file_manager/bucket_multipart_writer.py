@@ -0,0 +1,75 @@
+from io import BytesIO
+
+# S3 requires every part but the last to be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+class BucketMultipartSink:
+    """
+    Buffers written bytes into parts and streams them to S3 as a multipart upload.
+
+    Objects smaller than one part are stored with a single put_object request.
+    The object is tagged with the tagging query string, if any.
+    """
+
+    def __init__(
+        self, client, bucket_name: str, key: str, content_type: str, part_size: int = None, tagging: str = None
+    ):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.content_type = content_type
+        self.extra_args = {"Tagging": tagging} if tagging else {}
+        self.part_size = max(part_size or DEFAULT_PART_SIZE, MIN_PART_SIZE)
+        self.buffer = BytesIO()
+        self.upload_id = None
+        self.parts = []
+
+    def write(self, data) -> int:
+        written = self.buffer.write(data)
+        if self.buffer.tell() >= self.part_size:
+            self._upload_part()
+        return written
+
+    def _upload_part(self):
+        if self.upload_id is None:
+            response = self.client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, ContentType=self.content_type, **self.extra_args
+            )
+            self.upload_id = response["UploadId"]
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=self.buffer.getvalue(),
+        )
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        self.buffer = BytesIO()
+
+    def complete(self):
+        if self.upload_id is None:
+            self.client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.key,
+                Body=self.buffer.getvalue(),
+                ContentType=self.content_type,
+                **self.extra_args,
+            )
+            return
+        if self.buffer.tell():
+            self._upload_part()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, UploadId=self.upload_id
+            )
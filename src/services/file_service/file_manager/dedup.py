@@ -0,0 +1,66 @@
+"""
+Helpers for the content-addressed (deduplicated) storage of the file managers.
+
+File contents are stored once as blobs named by their SHA-256, and every upload
+gets its own file name and metadata pointing at the blob. A blob is removed when
+the last file referencing it is deleted.
+"""
+
+import hashlib
+import threading
+
+CONTENT_HASH_KEY = "content_hash"
+# All the file managers deduplicate unless their config sets deduplicate to false
+DEFAULT_DEDUPLICATE = True
+
+
+def hash_content(buffer) -> str:
+    return hashlib.sha256(buffer).hexdigest()
+
+
+class HashingSink:
+    """
+    Wraps a writable sink and hashes the bytes written through it.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self._hash = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self._hash.update(data)
+        return self.sink.write(data)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+class DedupStats:
+    """
+    Thread-safe counters of the deduplicated uploads of a file manager.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.deduplicated_uploads = 0
+        self.uploaded_bytes = 0
+        self.saved_bytes = 0
+
+    def record(self, size: int, deduplicated: bool):
+        with self._lock:
+            self.uploads += 1
+            self.uploaded_bytes += size
+            if deduplicated:
+                self.deduplicated_uploads += 1
+                self.saved_bytes += size
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "uploads": self.uploads,
+                "deduplicated_uploads": self.deduplicated_uploads,
+                "hit_rate": self.deduplicated_uploads / self.uploads if self.uploads else 0.0,
+                "uploaded_bytes": self.uploaded_bytes,
+                "saved_bytes": self.saved_bytes,
+            }
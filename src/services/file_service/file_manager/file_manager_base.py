@@ -1,20 +1,46 @@
+import io
+import os
 import uuid
 import mimetypes
 import re
+import shutil
+import threading
 import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Iterable, Iterator
 
-from ..file_service_constants import FS_PROTOCOL, META_FILE_EXTENSION
-from ..file_utils import get_file_schema_and_shape
+from solace_ai_connector.common.log import log
+
+from .file_writer import FileWriter
+from ..file_service_constants import FS_PROTOCOL, META_FILE_EXTENSION, DEFAULT_CHUNK_SIZE, DEFAULT_SCHEMA_MAX_BYTES
+from ..file_utils import get_file_schema_and_shape, iter_buffer_chunks, SCHEMA_MIME_TYPES
 
 
 MAX_NAME_LENGTH = 255 - (
     len(META_FILE_EXTENSION) + len(FS_PROTOCOL) + 3 + 36 + 1
 )  # 36 is the length of a UUID, 3 is ://
 
+_schema_executor = None
+_schema_executor_lock = threading.Lock()
+
+
+def _get_schema_executor() -> ThreadPoolExecutor:
+    """
+    Get the background worker shared by the file managers for deferred schema inference.
+    """
+    global _schema_executor
+    with _schema_executor_lock:
+        if _schema_executor is None:
+            _schema_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="file-schema-inference"
+            )
+        return _schema_executor
+
 
 class FileManagerBase(ABC):
     ttl: int
+    dedup_stats = None
 
     def _generate_file_signature(self, file_name: str) -> str:
         """
@@ -58,10 +84,42 @@ class FileManagerBase(ABC):
         metadata_path = f"{name}{META_FILE_EXTENSION}"
         return metadata_path
 
-    def _create_metadata(self, file_signature: str, file_name: str, file: bytes, metadata: dict):
+    def _get_schema_config(self) -> dict:
+        return getattr(self, "config", None) or {}
+
+    def _needs_schema(self, metadata: dict) -> bool:
+        return metadata.get("mime_type") in SCHEMA_MIME_TYPES and (
+            ("schema-yaml" not in metadata and "schema_yaml" not in metadata)
+            or "shape" not in metadata
+        )
+
+    def _add_schema_and_shape(self, metadata: dict, chunks: Iterable[bytes]) -> dict:
+        """
+        Add the schema and shape derived from the file content, if not present.
+        """
+        max_bytes = self._get_schema_config().get("schema_max_bytes", DEFAULT_SCHEMA_MAX_BYTES)
+        schema, shape = get_file_schema_and_shape(chunks, metadata, max_bytes)
+        values = {}
+        if "schema-yaml" not in metadata and schema:
+            values["schema-yaml"] = schema
+        if "shape" not in metadata and shape:
+            values["shape"] = shape
+        return values
+
+    def _create_metadata(
+        self,
+        file_signature: str,
+        file_name: str,
+        file: bytes,
+        metadata: dict,
+        read_chunks: Callable[[], Iterable[bytes]] = None,
+    ):
         """
         Extend metadata with schema and shape if not present
         Add file_size if not present
+        The content is read from read_chunks, if given, instead of file.
+        With defer_schema_inference, the schema and shape are left to
+        _schedule_schema_inference once the file is stored.
         """
 
         mime_type = self._get_mime_type(file_name)
@@ -80,18 +138,12 @@ class FileManagerBase(ABC):
         if "name" not in meta_copy:
             meta_copy["name"] = file_name
 
-        if (
-            "schema-yaml" not in meta_copy
-            or "schema_yaml" not in meta_copy
-            or "shape" not in meta_copy
+        if self._needs_schema(meta_copy) and not self._get_schema_config().get(
+            "defer_schema_inference", False
         ):
-            schema, shape = get_file_schema_and_shape(file, meta_copy)
-            if "schema-yaml" not in meta_copy and schema:
-                meta_copy["schema-yaml"] = schema
+            chunks = read_chunks() if read_chunks else iter_buffer_chunks(file)
+            meta_copy.update(self._add_schema_and_shape(meta_copy, chunks))
 
-            if "shape" not in meta_copy and shape:
-                meta_copy["shape"] = shape
-    
         if "file_size" not in meta_copy:
             meta_copy["file_size"] = len(file)
 
@@ -102,7 +154,120 @@ class FileManagerBase(ABC):
             meta_copy["expiration_timestamp"] = meta_copy["upload_timestamp"] + self.ttl
 
         return meta_copy
-    
+
+    def _create_stream_metadata(
+        self,
+        file_signature: str,
+        file_name: str,
+        file_size: int,
+        read_chunks: Callable[[], Iterable[bytes]],
+        metadata: dict,
+    ):
+        """
+        Create the metadata of a streamed file.
+        The content is only read, in chunks, when it is needed for the schema and shape.
+        """
+        meta_copy = dict(metadata or {})
+        meta_copy.setdefault("file_size", file_size)
+        return self._create_metadata(file_signature, file_name, b"", meta_copy, read_chunks)
+
+    def _schedule_schema_inference(self, file_signature: str, metadata: dict):
+        """
+        With defer_schema_inference, derive the schema and shape of a stored file
+        in the background and add them to its metadata.
+        """
+        if not self._get_schema_config().get(
+            "defer_schema_inference", False
+        ) or not self._needs_schema(metadata):
+            return
+
+        def infer_schema():
+            try:
+                values = self._add_schema_and_shape(metadata, self.iter_chunks(file_signature))
+                if values:
+                    self.update_metadata(file_signature, values)
+            except FileNotFoundError:
+                # Deleted in the meantime
+                pass
+            except Exception as e:
+                log.error("Failed to infer the schema of file %s: %s", file_signature, e)
+
+        _get_schema_executor().submit(infer_schema)
+
+    def update_metadata(self, file_signature: str, values: dict):
+        """
+        Add or replace values in the stored metadata of a file.
+        Managers must implement this to support defer_schema_inference.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support updating the file metadata."
+        )
+
+    def get_dedup_stats(self) -> dict:
+        """
+        Get the deduplication counters of the uploads, or None if deduplication is disabled.
+        """
+        return self.dedup_stats.as_dict() if self.dedup_stats else None
+
+    def get_memory_stats(self) -> dict:
+        """
+        Get the counters of the contents held in memory, or None if the manager does not hold any.
+        """
+        return None
+
+    def open_read(self, file_name: str) -> BinaryIO:
+        """
+        Open a file for reading as a binary file object.
+        Managers that can stream should override this.
+        """
+        return io.BytesIO(self.download_to_buffer(file_name))
+
+    def iter_chunks(self, file_name: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Iterate over the content of a file in chunks of at most chunk_size bytes.
+        Chunks may be memoryviews that are only valid until the next chunk is requested.
+        """
+        with self.open_read(file_name) as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def open_write(self, file_name: str, **kwargs) -> FileWriter:
+        """
+        Open a new file for writing.
+        kwargs are added to metadata, which is available on the writer once closed.
+        Managers that can stream should override this.
+        """
+        return FileWriter(
+            io.BytesIO(),
+            lambda writer: self.upload_from_buffer(
+                writer._sink.getvalue(), file_name, **kwargs
+            ),
+        )
+
+    def upload_from_file(self, file_path: str, **kwargs) -> dict:
+        """
+        Upload a file from a file path, streaming it through open_write.
+        kwargs are added to metadata
+        """
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"The file {file_path} does not exist.")
+
+        with open(file_path, "rb") as source_file:
+            with self.open_write(os.path.basename(file_path), **kwargs) as writer:
+                shutil.copyfileobj(source_file, writer, DEFAULT_CHUNK_SIZE)
+        return writer.metadata
+
+    def download_to_file(self, file_name: str, destination_path: str):
+        """
+        Download a file to a destination path, streaming it through iter_chunks.
+        """
+        with open(destination_path, "wb") as destination_file:
+            for chunk in self.iter_chunks(file_name):
+                destination_file.write(chunk)
+
     @abstractmethod
     def update_file_expiration(self, file_signature: str, expiration_timestamp: float):
         """
@@ -118,14 +283,6 @@ class FileManagerBase(ABC):
         """
         pass
 
-    @abstractmethod
-    def upload_from_file(self, file_path: str, **kwargs) -> dict:
-        """
-        Upload a file from a file path.
-        kwargs are added to metadata
-        """
-        pass
-
     @abstractmethod
     def download_to_buffer(self, file_name: str) -> bytes:
         """
@@ -134,18 +291,25 @@ class FileManagerBase(ABC):
         pass
 
     @abstractmethod
-    def download_to_file(self, file_name: str, destination_path: str):
+    def delete_by_name(self, file_name: str):
         """
-        Download a file to a destination path.
+        Delete a file by name.
         """
         pass
 
-    @abstractmethod
-    def delete_by_name(self, file_name: str):
+    def delete_by_names(self, file_names: list) -> dict:
         """
-        Delete a file by name.
+        Delete several files.
+        Returns the exceptions of the files that could not be deleted, by file name.
+        Managers that can delete in batches should override this.
         """
-        pass
+        errors = {}
+        for file_name in file_names:
+            try:
+                self.delete_by_name(file_name)
+            except Exception as e:
+                errors[file_name] = e
+        return errors
 
     @abstractmethod
     def get_metadata(self, file_name: str) -> dict:
@@ -160,3 +324,36 @@ class FileManagerBase(ABC):
         List all file metadata in the storage.
         """
         pass
+
+    def list_metadata_by_session(self, session_id: str) -> list:
+        """
+        List the metadata of all files of a session.
+        Managers with an index of the metadata should override this.
+        """
+        return [
+            metadata
+            for metadata in self.list_all_metadata()
+            if metadata.get("session_id") == session_id
+        ]
+
+    def list_expired_metadata(self, timestamp: float) -> list:
+        """
+        List the metadata of all files that expired before the timestamp.
+        Managers with an index of the metadata should override this.
+        """
+        return [
+            metadata
+            for metadata in self.list_all_metadata()
+            if metadata["expiration_timestamp"] < timestamp
+        ]
+
+    def list_expirations(self) -> list:
+        """
+        List the (expiration timestamp, file name) pairs of all files.
+        Managers with an index of the metadata should override this.
+        """
+        return [
+            (metadata["expiration_timestamp"], metadata["url"].split("://", 1)[-1])
+            for metadata in self.list_all_metadata()
+            if metadata.get("expiration_timestamp") is not None
+        ]
@@ -0,0 +1,78 @@
+import io
+
+
+class FileWriter(io.RawIOBase):
+    """
+    Writable file object returned by ``open_write``.
+
+    The bytes are written to a sink provided by the file manager. On close the
+    upload is completed and ``metadata`` is set. When used as a context manager,
+    an exception inside the block aborts the upload instead. A writer that is
+    garbage collected without being closed is aborted, so that a truncated file
+    is never stored.
+    """
+
+    def __init__(self, sink, on_close, on_abort=None):
+        super().__init__()
+        self._sink = sink
+        self._on_close = on_close
+        self._on_abort = on_abort
+        self.size = 0
+        self.metadata = None
+        self._done_callbacks = []
+        # Set by close or abort, the upload is then completed or discarded
+        self._finished = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        written = self._sink.write(data)
+        written = len(data) if written is None else written
+        self.size += written
+        return written
+
+    def add_done_callback(self, callback):
+        """
+        Call callback with the metadata once the upload is completed.
+        """
+        self._done_callbacks.append(callback)
+
+    def close(self):
+        if self._finished:
+            return
+        self._finished = True
+        try:
+            self.metadata = self._on_close(self)
+        finally:
+            super().close()
+        for callback in self._done_callbacks:
+            callback(self.metadata)
+
+    def abort(self):
+        """
+        Discard the bytes written so far without storing the file.
+        """
+        if self._finished:
+            return
+        self._finished = True
+        try:
+            if self._on_abort:
+                self._on_abort(self)
+        finally:
+            super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __del__(self):
+        # io.RawIOBase.__del__ would call close and store the truncated upload
+        try:
+            self.abort()
+        except Exception:
+            pass
@@ -0,0 +1,203 @@
+"""
+Byte-budgeted storage of the file contents of the memory file manager.
+
+Contents are kept in an LRU, bounded by their total size when a budget is set.
+When the budget is exceeded, the least recently used contents are spilled to a
+volume file manager if one is configured, and loaded back on access, otherwise
+they are dropped.
+"""
+
+import threading
+from collections import OrderedDict
+
+# The budget when spilling is configured without one
+DEFAULT_MEMORY_MAX_BYTES = 512 * 1024 * 1024
+
+
+class MemoryContentStore:
+    """
+    A thread-safe LRU of file contents, bounded by their total size in bytes.
+    Spilled contents are written and read without holding the lock, contents
+    being spilled are still served from memory.
+    """
+
+    def __init__(self, max_bytes: int = None, spill_manager=None):
+        self._lock = threading.Lock()
+        self._resident = OrderedDict()
+        # Contents being written to the spill manager, by key
+        self._spilling = {}
+        # Spilled contents by key, as their spill manager, file name in it, and size
+        self._spilled = {}
+        self.max_bytes = max_bytes
+        self.spill_manager = spill_manager
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.spills = 0
+        self.evictions = 0
+
+    def configure(self, max_bytes: int, spill_manager=None) -> list:
+        """
+        Change the budget and spill manager. Returns the keys of the dropped contents.
+        The contents already spilled stay with their spill manager.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self.spill_manager = spill_manager
+            dropped, to_spill = self._evict()
+        self._spill(spill_manager, to_spill)
+        return dropped
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._resident or key in self._spilling or key in self._spilled
+
+    def put(self, key, content: bytes) -> list:
+        """
+        Store a content. Returns the keys of the contents dropped to stay in budget.
+        """
+        released = None
+        dropped = []
+        to_spill = []
+        with self._lock:
+            spill_manager = self.spill_manager
+            if self.max_bytes is not None and len(content) > self.max_bytes:
+                if not spill_manager:
+                    raise ValueError(
+                        f"The file is larger than the memory budget of {self.max_bytes} bytes."
+                    )
+                if key not in self._spilling and key not in self._spilled:
+                    self._spilling[key] = content
+                    to_spill.append((key, content))
+            else:
+                released = self._remove(key)
+                self._resident[key] = content
+                self.resident_bytes += len(content)
+                dropped, to_spill = self._evict()
+        self._delete_spilled(released)
+        self._spill(spill_manager, to_spill)
+        return dropped
+
+    def get(self, key) -> tuple:
+        """
+        Get a content, loading it back if it was spilled.
+        Returns the content and the keys of the contents dropped to stay in budget.
+        """
+        with self._lock:
+            content = self._resident.get(key)
+            if content is not None:
+                self._resident.move_to_end(key)
+                self.hits += 1
+                return content, []
+            content = self._spilling.get(key)
+            if content is not None:
+                self.hits += 1
+                return content, []
+            self.misses += 1
+            spilled = self._spilled.get(key)
+            if spilled is None:
+                raise FileNotFoundError(f"The content {key} does not exist.")
+
+        spill_manager, spilled_name, _ = spilled
+        content = spill_manager.download_to_buffer(spilled_name)
+        dropped = []
+        to_spill = []
+        with self._lock:
+            spill_manager = self.spill_manager
+            if (
+                (self.max_bytes is None or len(content) <= self.max_bytes)
+                and self._spilled.get(key) is spilled
+                and key not in self._resident
+            ):
+                # The spilled copy is kept, so evicting it again does not rewrite it
+                self._resident[key] = content
+                self.resident_bytes += len(content)
+                dropped, to_spill = self._evict()
+        self._spill(spill_manager, to_spill)
+        return content, dropped
+
+    def delete(self, key):
+        with self._lock:
+            released = self._remove(key)
+        self._delete_spilled(released)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "spills": self.spills,
+                "evictions": self.evictions,
+                "resident_bytes": self.resident_bytes,
+                "resident_files": len(self._resident),
+                "spilled_bytes": sum(size for _, _, size in self._spilled.values()),
+            }
+
+    def _spill(self, spill_manager, entries: list):
+        """
+        Write the (key, content) entries taken out of memory to the spill manager.
+        """
+        error = None
+        for key, content in entries:
+            try:
+                metadata = spill_manager.upload_from_buffer(content, str(key))
+            except Exception as e:
+                with self._lock:
+                    if self._spilling.get(key) is content:
+                        # Kept in memory, over budget, rather than lost
+                        del self._spilling[key]
+                        self._resident[key] = content
+                        self._resident.move_to_end(key, last=False)
+                        self.resident_bytes += len(content)
+                error = error or e
+                continue
+            spilled = (spill_manager, metadata["url"].split("://", 1)[1], len(content))
+            with self._lock:
+                if self._spilling.get(key) is content:
+                    del self._spilling[key]
+                    self._spilled[key] = spilled
+                    self.spills += 1
+                    spilled = None
+            # Deleted or stored again while it was written
+            self._delete_spilled(spilled)
+        if error:
+            raise error
+
+    @staticmethod
+    def _delete_spilled(spilled):
+        if spilled:
+            spill_manager, spilled_name, _ = spilled
+            try:
+                spill_manager.delete_by_name(spilled_name)
+            except FileNotFoundError:
+                pass
+
+    def _remove(self, key):
+        """
+        Remove a content. Returns its spilled copy, to delete once the lock is released.
+        """
+        content = self._resident.pop(key, None)
+        if content is not None:
+            self.resident_bytes -= len(content)
+        self._spilling.pop(key, None)
+        return self._spilled.pop(key, None)
+
+    def _evict(self) -> tuple:
+        """
+        Take the least recently used contents out of memory until it is within budget.
+        Returns the keys of the dropped contents and the (key, content) entries to spill.
+        """
+        dropped = []
+        to_spill = []
+        while self.max_bytes is not None and self.resident_bytes > self.max_bytes:
+            key, content = self._resident.popitem(last=False)
+            self.resident_bytes -= len(content)
+            if key in self._spilled or key in self._spilling:
+                continue
+            if self.spill_manager:
+                self._spilling[key] = content
+                to_spill.append((key, content))
+            else:
+                self.evictions += 1
+                dropped.append(key)
+        return dropped, to_spill
@@ -1,64 +1,181 @@
-import os
+import threading
+from io import BytesIO
+from typing import BinaryIO, Iterator
 
+from solace_ai_connector.common.log import log
+
+from .dedup import CONTENT_HASH_KEY, DEFAULT_DEDUPLICATE, DedupStats, hash_content
 from .file_manager_base import FileManagerBase
+from .file_writer import FileWriter
+from .memory_content_store import MemoryContentStore, DEFAULT_MEMORY_MAX_BYTES
+from .volume_file_manager import VolumeFileManager
+from ..file_service_constants import DEFAULT_CHUNK_SIZE
+from ..file_utils import iter_buffer_chunks
 
 
 class MemoryFileManager(FileManagerBase):
+    """
+    Stores files in the memory of the process, shared by all the memory file managers.
+
+    The contents are unbounded unless max_bytes or spill_directory is set. Beyond
+    max_bytes, the least recently used contents are spilled to spill_directory
+    if it is set, otherwise the files are deleted. With deduplication, the files
+    with the same content share it.
+    """
+
+    # The metadata of the files, by metadata name
     storage = {}
+    contents = MemoryContentStore()
+    # The files using each content, by content hash or by file name without deduplication
+    references = {}
+    _references_lock = threading.Lock()
 
     def __init__(self, config, ttl):
         self.config = config
         self.ttl = ttl
+        self.dedup_stats = DedupStats() if config.get("deduplicate", DEFAULT_DEDUPLICATE) else None
+
+        spill_manager = None
+        if config.get("spill_directory"):
+            spill_manager = VolumeFileManager(
+                {
+                    "directory": config.get("spill_directory"),
+                    "metadata_index": False,
+                    "deduplicate": False,
+                },
+                ttl,
+            )
+        max_bytes = config.get("max_bytes")
+        if max_bytes is None and spill_manager:
+            max_bytes = DEFAULT_MEMORY_MAX_BYTES
+        # The content store is shared, the last configured budget applies
+        dropped = self.contents.configure(max_bytes, spill_manager)
+        self._delete_contents(dropped)
+
+    def _get_content_key(self, file_signature: str, metadata: dict) -> str:
+        return metadata.get(CONTENT_HASH_KEY) or file_signature
+
+    def _store(self, file_signature: str, content: bytes, metadata: dict):
+        content_key = file_signature
+        if self.dedup_stats:
+            content_key = hash_content(content)
+            # The hash is internal, it is only kept in the stored metadata
+            metadata = {**metadata, CONTENT_HASH_KEY: content_key}
+
+        dropped = []
+        with self._references_lock:
+            files = self.references.setdefault(content_key, set())
+            deduplicated = content_key in self.contents
+            # Referenced first, so that a concurrent delete keeps the content
+            files.add(file_signature)
+        if not deduplicated:
+            # Outside the lock, the put may spill contents to disk
+            try:
+                dropped = self.contents.put(content_key, content)
+            except ValueError:
+                with self._references_lock:
+                    files.discard(file_signature)
+                    if not files and self.references.get(content_key) is files:
+                        del self.references[content_key]
+                raise
+        if self.dedup_stats:
+            self.dedup_stats.record(len(content), deduplicated)
+
+        self.storage[self._get_metadata_name(file_signature)] = metadata
+        self._delete_contents(dropped)
+
+    def _delete_contents(self, content_keys: list):
+        """
+        Delete the files whose content was dropped to stay within the budget.
+        """
+        for content_key in content_keys:
+            with self._references_lock:
+                files = self.references.pop(content_key, set())
+            for file_signature in files:
+                self.storage.pop(self._get_metadata_name(file_signature), None)
+                log.warning(
+                    "Deleted the file %s from memory to stay within the budget of %s bytes",
+                    file_signature,
+                    self.contents.max_bytes,
+                )
 
     def upload_from_buffer(self, buffer: bytes, file_name: str, **kwargs) -> dict:
         file_signature = self._generate_file_signature(file_name)
         metadata = self._create_metadata(
             file_signature, file_name, buffer, kwargs
         )
-        metadata_name = self._get_metadata_name(file_signature)
-        self.storage[file_signature] = buffer
-        self.storage[metadata_name] = metadata
+        self._store(file_signature, buffer, metadata)
+        self._schedule_schema_inference(file_signature, metadata)
         return metadata
 
-    def upload_from_file(self, file_path: str, **kwargs) -> dict:
-        """
-        Upload a file from a file path.
-        kwargs are added to metadata
-        """
-        with open(file_path, "rb") as file:
-            buffer = file.read()
-        return self.upload_from_buffer(buffer, os.path.basename(file_path), **kwargs)
+    def open_write(self, file_name: str, **kwargs) -> FileWriter:
+        file_signature = self._generate_file_signature(file_name)
+        buffer = BytesIO()
+
+        def on_close(writer):
+            content = buffer.getvalue()
+            metadata = self._create_stream_metadata(
+                file_signature, file_name, writer.size, lambda: iter_buffer_chunks(content), kwargs
+            )
+            self._store(file_signature, content, metadata)
+            self._schedule_schema_inference(file_signature, metadata)
+            return metadata
+
+        return FileWriter(buffer, on_close)
 
     def download_to_buffer(self, file_name: str) -> bytes:
-        if not file_name in self.storage:
+        metadata = self.storage.get(self._get_metadata_name(file_name))
+        if metadata is None:
+            raise FileNotFoundError(f"The file {file_name} does not exist.")
+        try:
+            content, dropped = self.contents.get(self._get_content_key(file_name, metadata))
+        except FileNotFoundError:
             raise FileNotFoundError(f"The file {file_name} does not exist.")
-        return self.storage[file_name]
+        self._delete_contents(dropped)
+        return content
 
-    def download_to_file(self, file_name: str, destination_path: str):
-        with open(destination_path, "wb") as file:
-            file.write(self.download_to_buffer(file_name))
+    def open_read(self, file_name: str) -> BinaryIO:
+        # BytesIO shares the stored bytes until it is written to
+        return BytesIO(self.download_to_buffer(file_name))
+
+    def iter_chunks(self, file_name: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[memoryview]:
+        view = memoryview(self.download_to_buffer(file_name))
+        for start in range(0, len(view), chunk_size):
+            yield view[start : start + chunk_size]
 
     def delete_by_name(self, file_name: str):
-        metadata_name = self._get_metadata_name(file_name)
-        if file_name in self.storage:
-            del self.storage[file_name]
-        if metadata_name in self.storage:
-            del self.storage[metadata_name]
+        metadata = self.storage.pop(self._get_metadata_name(file_name), None)
+        if metadata is None:
+            return
+        content_key = self._get_content_key(file_name, metadata)
+        with self._references_lock:
+            files = self.references.get(content_key, set())
+            files.discard(file_name)
+            if files:
+                return
+            self.references.pop(content_key, None)
+            self.contents.delete(content_key)
+
+    def get_memory_stats(self) -> dict:
+        return self.contents.as_dict()
 
     def get_metadata(self, file_name: str) -> dict:
         metadata_name = self._get_metadata_name(file_name)
         if metadata_name in self.storage:
             return self.storage[metadata_name]
         raise FileNotFoundError(f"The file {file_name} does not exist.")
-    
+
     def update_file_expiration(self, file_signature, expiration_timestamp):
+        self.update_metadata(file_signature, {"expiration_timestamp": expiration_timestamp})
+
+    def update_metadata(self, file_signature: str, values: dict):
         metadata_name = self._get_metadata_name(file_signature)
         if metadata_name in self.storage:
             metadata = self.storage[metadata_name]
-            metadata["expiration_timestamp"] = expiration_timestamp
+            metadata.update(values)
             self.storage[metadata_name] = metadata
         else:
             raise FileNotFoundError(f"The file {file_signature} does not exist.")
 
     def list_all_metadata(self) -> list:
-        return [data for key, data in self.storage.items() if key.endswith(".metadata")]
+        return list(self.storage.values())
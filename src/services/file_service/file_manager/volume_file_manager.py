@@ -1,13 +1,32 @@
 import os
 import json
+import mmap
+import shutil
+import tempfile
+from io import BytesIO
+from typing import BinaryIO, Iterator
 
+from solace_ai_connector.common.log import log
+
+from .dedup import CONTENT_HASH_KEY, DEFAULT_DEDUPLICATE, DedupStats, HashingSink, hash_content
 from .file_manager_base import FileManagerBase
-from ..file_service_constants import FS_PROTOCOL
+from .file_writer import FileWriter
+from .volume_metadata_index import VolumeMetadataIndex
+from ..file_service_constants import FS_PROTOCOL, DEFAULT_CHUNK_SIZE
 
 DEFAULT_DIRECTORY = f"/tmp/{FS_PROTOCOL}"
+BLOB_DIRECTORY = ".blobs"
 
 
 class VolumeFileManager(FileManagerBase):
+    """
+    Stores files in a (shared) directory.
+
+    With deduplication, each content is stored once in the blob directory, named
+    by its SHA-256, and every uploaded file is a hard link to its blob. The link
+    count of the blob is its reference count, so it stays consistent between the
+    processes sharing the directory, and downloads read the file path as usual.
+    """
 
     def __init__(self, config, ttl):
         self.config = config
@@ -16,10 +35,75 @@ class VolumeFileManager(FileManagerBase):
         if not os.path.exists(self.shared_volume_directory):
             os.makedirs(self.shared_volume_directory)
 
+        self.metadata_index = None
+        if config.get("metadata_index", True):
+            self.metadata_index = VolumeMetadataIndex(
+                self.shared_volume_directory, config.get("metadata_index_path")
+            )
+
+        self.blob_directory = os.path.join(self.shared_volume_directory, BLOB_DIRECTORY)
+        self.dedup_stats = None
+        if config.get("deduplicate", DEFAULT_DEDUPLICATE) and self._supports_hard_links():
+            self.dedup_stats = DedupStats()
+
+    def _supports_hard_links(self) -> bool:
+        os.makedirs(self.blob_directory, exist_ok=True)
+        probe_path = self._create_blob_temp_file()[1]
+        try:
+            os.link(probe_path, probe_path + ".link")
+            os.remove(probe_path + ".link")
+            return True
+        except OSError as e:
+            log.warning("Hard links are not supported in %s, file deduplication is disabled: %s", self.blob_directory, e)
+            return False
+        finally:
+            os.remove(probe_path)
+
+    def _create_blob_temp_file(self):
+        fd, temp_path = tempfile.mkstemp(dir=self.blob_directory, prefix=".", suffix=".tmp")
+        return os.fdopen(fd, "wb"), temp_path
+
+    def _get_blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.blob_directory, content_hash)
+
+    def _link_blob(self, content_hash: str, file_path: str) -> bool:
+        """
+        Link the file to an existing blob. Returns False if there is no such blob.
+        """
+        try:
+            os.link(self._get_blob_path(content_hash), file_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _add_blob(self, temp_path: str, content_hash: str, file_path: str):
+        """
+        Turn a written temp file into the blob of its content and link the file to it.
+        """
+        try:
+            os.link(temp_path, self._get_blob_path(content_hash))
+        except FileExistsError:
+            # Stored concurrently by another upload, the file keeps its own copy
+            pass
+        os.replace(temp_path, file_path)
+
+    def _release_blob(self, content_hash: str):
+        """
+        Remove the blob once no file links to it anymore.
+        """
+        blob_path = self._get_blob_path(content_hash)
+        try:
+            if os.stat(blob_path).st_nlink == 1:
+                os.remove(blob_path)
+        except FileNotFoundError:
+            pass
+
     def _save_metadata(self, file_path: str, metadata: dict):
         metadata_path = self._get_metadata_name(file_path)
         with open(metadata_path, "w", encoding="utf-8") as metadata_file:
             json.dump(metadata, metadata_file, indent=4)
+        if self.metadata_index:
+            self.metadata_index.upsert(os.path.basename(file_path), metadata)
 
     def upload_from_buffer(self, buffer: bytes, file_name: str, **kwargs) -> dict:
         file_signature = self._generate_file_signature(file_name)
@@ -27,40 +111,117 @@ class VolumeFileManager(FileManagerBase):
 
         metadata = self._create_metadata(file_signature, file_name, buffer, kwargs)
 
-        with open(file_path, "wb") as file:
-            file.write(buffer)
+        stored_metadata = metadata
+        if self.dedup_stats:
+            content_hash = hash_content(buffer)
+            # The hash is internal, it is only kept in the stored metadata
+            stored_metadata = {**metadata, CONTENT_HASH_KEY: content_hash}
+            deduplicated = self._link_blob(content_hash, file_path)
+            if not deduplicated:
+                file, temp_path = self._create_blob_temp_file()
+                with file:
+                    file.write(buffer)
+                self._add_blob(temp_path, content_hash, file_path)
+            self.dedup_stats.record(len(buffer), deduplicated)
+        else:
+            with open(file_path, "wb") as file:
+                file.write(buffer)
 
-        self._save_metadata(file_path, metadata)
+        self._save_metadata(file_path, stored_metadata)
+        self._schedule_schema_inference(file_signature, metadata)
 
         return metadata
 
-    def upload_from_file(self, file_path: str, **kwargs) -> dict:
-        if not os.path.isfile(file_path):
-            raise FileNotFoundError(f"The file {file_path} does not exist.")
+    def open_write(self, file_name: str, **kwargs) -> FileWriter:
+        file_signature = self._generate_file_signature(file_name)
+        file_path = os.path.join(self.shared_volume_directory, file_signature)
+        if self.dedup_stats:
+            file, temp_path = self._create_blob_temp_file()
+            sink = HashingSink(file)
+        else:
+            file = sink = open(file_path, "wb")
+            temp_path = file_path
 
-        file_name = os.path.basename(file_path)
+        def on_close(writer):
+            file.close()
+            extra_metadata = {}
+            if self.dedup_stats:
+                content_hash = sink.hexdigest()
+                extra_metadata[CONTENT_HASH_KEY] = content_hash
+                deduplicated = self._link_blob(content_hash, file_path)
+                if deduplicated:
+                    os.remove(temp_path)
+                else:
+                    self._add_blob(temp_path, content_hash, file_path)
+                self.dedup_stats.record(writer.size, deduplicated)
+            metadata = self._create_stream_metadata(
+                file_signature,
+                file_name,
+                writer.size,
+                lambda: self.iter_chunks(file_signature),
+                kwargs,
+            )
+            self._save_metadata(file_path, {**metadata, **extra_metadata})
+            self._schedule_schema_inference(file_signature, metadata)
+            return metadata
 
-        with open(file_path, "rb") as source_file:
-            buffer = source_file.read()
+        def on_abort(writer):
+            file.close()
+            os.remove(temp_path)
 
-        return self.upload_from_buffer(buffer, file_name, **kwargs)
+        return FileWriter(sink, on_close, on_abort)
 
-    def download_to_buffer(self, file_name: str) -> bytes:
+    def _get_file_path(self, file_name: str) -> str:
         file_path = os.path.join(self.shared_volume_directory, file_name)
         if not os.path.exists(file_path):
             raise FileNotFoundError(
                 f"The file at {file_name} does not exist in the shared volume."
             )
+        return file_path
 
-        with open(file_path, "rb") as file:
+    def download_to_buffer(self, file_name: str) -> bytes:
+        with open(self._get_file_path(file_name), "rb") as file:
             buffer = file.read()
 
         return buffer
 
+    def open_read(self, file_name: str) -> BinaryIO:
+        """
+        Map the file into memory. The returned mmap is a read-only file object
+        that also supports slicing without copying.
+        """
+        with open(self._get_file_path(file_name), "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                # Empty files can not be mapped
+                return BytesIO(b"")
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def iter_chunks(self, file_name: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[memoryview]:
+        """
+        Iterate over zero-copy memoryview slices of the mapped file.
+        Each chunk is released when the next one is requested.
+        """
+        mapped = self.open_read(file_name)
+        if not isinstance(mapped, mmap.mmap):
+            return
+        view = memoryview(mapped)
+        try:
+            for start in range(0, len(view), chunk_size):
+                chunk = view[start : start + chunk_size]
+                try:
+                    yield chunk
+                finally:
+                    chunk.release()
+        finally:
+            view.release()
+            try:
+                mapped.close()
+            except BufferError:
+                # A caller kept a view of the mapping, it is unmapped once released
+                pass
+
     def download_to_file(self, file_name: str, destination_path: str):
-        buffer = self.download_to_buffer(file_name)
-        with open(destination_path, "wb") as destination_file:
-            destination_file.write(buffer)
+        shutil.copyfile(self._get_file_path(file_name), destination_path)
 
     def get_metadata(self, file_name: str) -> dict:
         metadata_name = self._get_metadata_name(file_name)
@@ -82,20 +243,35 @@ class VolumeFileManager(FileManagerBase):
 
         # Delete the main file
         if os.path.exists(file_path):
+            content_hash = None
+            if os.path.exists(metadata_path):
+                with open(metadata_path, "r", encoding="utf-8") as metadata_file:
+                    content_hash = json.load(metadata_file).get(CONTENT_HASH_KEY)
             os.remove(file_path)
             os.remove(metadata_path)
+            if content_hash:
+                self._release_blob(content_hash)
+            if self.metadata_index:
+                self.metadata_index.delete(file_name)
         else:
+            if self.metadata_index:
+                self.metadata_index.delete(file_name)
             raise FileNotFoundError(
                 f"The file at {file_name} does not exist in the shared volume."
             )
-        
+
     def update_file_expiration(self, file_signature, expiration_timestamp):
+        self.update_metadata(file_signature, {"expiration_timestamp": expiration_timestamp})
+
+    def update_metadata(self, file_signature: str, values: dict):
         metadata = self.get_metadata(file_signature)
-        metadata["expiration_timestamp"] = expiration_timestamp
+        metadata.update(values)
         file_path = os.path.join(self.shared_volume_directory, file_signature)
         self._save_metadata(file_path, metadata)
 
     def list_all_metadata(self) -> list:
+        if self.metadata_index:
+            return self.metadata_index.list_all()
         all_metadata = []
         for file_name in os.listdir(self.shared_volume_directory):
             if file_name.endswith(".metadata"):
@@ -104,3 +280,26 @@ class VolumeFileManager(FileManagerBase):
                     metadata = json.load(metadata_file)
                     all_metadata.append(metadata)
         return all_metadata
+
+    def list_metadata_by_session(self, session_id: str) -> list:
+        if self.metadata_index:
+            return self.metadata_index.list_by_session(session_id)
+        return super().list_metadata_by_session(session_id)
+
+    def list_expired_metadata(self, timestamp: float) -> list:
+        if self.metadata_index:
+            return self.metadata_index.list_expired(timestamp)
+        return super().list_expired_metadata(timestamp)
+
+    def list_expirations(self) -> list:
+        if self.metadata_index:
+            return self.metadata_index.list_expirations()
+        return super().list_expirations()
+
+    def rebuild_metadata_index(self) -> int:
+        """
+        Rebuild the metadata index from the metadata files in the directory.
+        """
+        if not self.metadata_index:
+            raise ValueError("The metadata index is disabled for this file manager.")
+        return self.metadata_index.rebuild()
@@ -0,0 +1,168 @@
+"""
+SQLite index of the metadata files stored by the VolumeFileManager.
+
+The index keeps a copy of each metadata document keyed by the file name, with
+the session ID and expiration timestamp in indexed columns, so listings and
+expiry sweeps do not have to open every ``.metadata`` file in the directory.
+The ``.metadata`` files stay the source of truth and the index can be rebuilt
+from them at any time:
+
+    python -m solace_agent_mesh.services.file_service.file_manager.volume_metadata_index <directory>
+"""
+
+import argparse
+import json
+import os
+import threading
+
+from solace_ai_connector.common.log import log
+
+from ....common.sqlite_database import SQLiteDatabase
+from ..file_service_constants import META_FILE_EXTENSION
+
+DEFAULT_INDEX_NAME = ".metadata_index.sqlite"
+
+CREATE_STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS file_metadata (
+        name TEXT PRIMARY KEY,
+        session_id TEXT,
+        expiration_timestamp REAL,
+        metadata TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS file_metadata_session_id ON file_metadata (session_id)",
+    "CREATE INDEX IF NOT EXISTS file_metadata_expiration ON file_metadata (expiration_timestamp)",
+)
+
+
+class VolumeMetadataIndex:
+    """
+    A WAL-mode SQLite index of the file metadata in a shared volume directory.
+    """
+
+    def __init__(self, directory: str, index_path: str = None):
+        self.directory = directory
+        self.index_path = index_path or os.path.join(directory, DEFAULT_INDEX_NAME)
+        is_new = not os.path.exists(self.index_path)
+
+        self.database = SQLiteDatabase(database=self.index_path)
+        self._lock = threading.Lock()
+        with self._lock:
+            for statement in CREATE_STATEMENTS:
+                self.database.execute(statement)
+
+        if is_new:
+            # Files may have been written before the index existed
+            self.rebuild()
+
+    def upsert(self, name: str, metadata: dict):
+        """
+        Add or replace the metadata of a file.
+        """
+        with self._lock:
+            self.database.execute(
+                "INSERT OR REPLACE INTO file_metadata (name, session_id, expiration_timestamp, metadata) "
+                "VALUES (?, ?, ?, ?)",
+                self._get_row(name, metadata),
+            )
+
+    def delete(self, name: str):
+        """
+        Remove a file from the index.
+        """
+        with self._lock:
+            self.database.execute("DELETE FROM file_metadata WHERE name = ?", (name,))
+
+    def list_all(self) -> list:
+        return self._select("SELECT metadata FROM file_metadata")
+
+    def list_by_session(self, session_id: str) -> list:
+        return self._select(
+            "SELECT metadata FROM file_metadata WHERE session_id = ?", (session_id,)
+        )
+
+    def list_expired(self, timestamp: float) -> list:
+        return self._select(
+            "SELECT metadata FROM file_metadata WHERE expiration_timestamp < ?",
+            (timestamp,),
+        )
+
+    def list_expirations(self) -> list:
+        with self._lock:
+            rows = self.database.execute(
+                "SELECT expiration_timestamp, name FROM file_metadata "
+                "WHERE expiration_timestamp IS NOT NULL"
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def rebuild(self) -> int:
+        """
+        Replace the index content with the metadata files found in the directory.
+
+        :return: The number of indexed files.
+        """
+        rows = []
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith(META_FILE_EXTENSION):
+                continue
+            metadata_path = os.path.join(self.directory, file_name)
+            try:
+                with open(metadata_path, "r", encoding="utf-8") as metadata_file:
+                    metadata = json.load(metadata_file)
+            except (OSError, ValueError) as e:
+                log.warning("Skipping unreadable metadata file %s: %s", metadata_path, e)
+                continue
+            rows.append(self._get_row(file_name[: -len(META_FILE_EXTENSION)], metadata))
+
+        with self._lock:
+            cursor = self.database.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute("DELETE FROM file_metadata")
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO file_metadata (name, session_id, expiration_timestamp, metadata) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self.database.close()
+
+    def _select(self, query: str, params=None) -> list:
+        with self._lock:
+            rows = self.database.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    @staticmethod
+    def _get_row(name: str, metadata: dict) -> tuple:
+        return (
+            name,
+            metadata.get("session_id"),
+            metadata.get("expiration_timestamp"),
+            json.dumps(metadata),
+        )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Rebuild the metadata index of a volume file service directory."
+    )
+    parser.add_argument("directory", help="The shared volume directory of the file service.")
+    parser.add_argument("--index-path", help="Path of the index database, if not the default.")
+    args = parser.parse_args(args)
+
+    index = VolumeMetadataIndex(args.directory, args.index_path)
+    count = index.rebuild()
+    index.close()
+    print(f"Indexed {count} files in {index.index_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,35 @@
 import importlib
 import time
+from concurrent.futures import ThreadPoolExecutor
 import json
 import re
+from typing import BinaryIO, Callable, Iterable, Iterator
 from urllib.parse import urlencode, urlparse, urlunparse, parse_qsl
 
 from solace_ai_connector.common.log import log
 
 from ...common.time import ONE_DAY, TEN_MINUTES
 from ..common import AutoExpiry, AutoExpirySingletonMeta
-from .file_manager.bucket_file_manager import BucketFileManager
-from .file_manager.volume_file_manager import VolumeFileManager
-from .file_manager.memory_file_manager import MemoryFileManager
+from ...common.lazy_registry import LazyRegistry
 from .file_manager.file_manager_base import FileManagerBase
-from .file_service_constants import FS_PROTOCOL, INDENT_SIZE, DEFAULT_FILE_MANAGER, BLOCK_IGNORE_KEYS, BLOCK_TAG_KEYS, FS_URL_REGEX
+from .file_manager.file_writer import FileWriter
+from .file_service_constants import FS_PROTOCOL, INDENT_SIZE, DEFAULT_FILE_MANAGER, BLOCK_IGNORE_KEYS, BLOCK_TAG_KEYS, FS_URL_REGEX, FS_URL_PATTERN, FS_URL_PREFIX, DEFAULT_CHUNK_SIZE, DEFAULT_RESOLVE_CONCURRENCY, DEFAULT_IO_CONCURRENCY, DEFAULT_EXPIRATION_RESEED_INTERVAL
 from .file_transformations import apply_file_transformations
 from .file_utils import starts_with_fs_url
+from .expiry_schedule import ExpirySchedule
+from .resolved_url_cache import RESOLVED_URL_CACHE, DEFAULT_RESOLVED_URL_CACHE_MAX_BYTES
+from .url_resolver import UrlResolver, DEFAULT_MAX_RESOLVED_SIZE, run_now
 from ...tools.config.runtime_config import get_service_config
 
-FILE_MANAGERS = {
-    "bucket": BucketFileManager,
-    "volume": VolumeFileManager,
-    "memory": MemoryFileManager,
-}
+# Imported when selected, the bucket file manager needs boto3
+FILE_MANAGERS = LazyRegistry(
+    {
+        "bucket": ".file_manager.bucket_file_manager:BucketFileManager",
+        "volume": ".file_manager.volume_file_manager:VolumeFileManager",
+        "memory": ".file_manager.memory_file_manager:MemoryFileManager",
+    },
+    package=__package__,
+)
 
 
 class FileServicePermissionError(Exception):
@@ -34,13 +42,16 @@ class FileService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
 
     def __init__(self, config=None, identifier=None) -> None:
         self.identifier = identifier
-        self._expiry_thread = None
+        self._expiry_job = None
         config = config or get_service_config("file_service")
         self.service_type = config.get("type", DEFAULT_FILE_MANAGER)
         self.max_time_to_live = config.get("max_time_to_live", ONE_DAY)
         self.expiration_check_interval = config.get(
             "expiration_check_interval", TEN_MINUTES
         )
+        self.expiration_reseed_interval = config.get(
+            "expiration_reseed_interval", DEFAULT_EXPIRATION_RESEED_INTERVAL
+        )
 
         if self.service_type not in config.get("config", {}):
             raise ValueError(
@@ -77,30 +88,145 @@ class FileService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
             except Exception as e:
                 raise ImportError("Unable to load component: " + str(e)) from e
 
+        self._resolve_executor = ThreadPoolExecutor(
+            max_workers=config.get("resolve_max_concurrency", DEFAULT_RESOLVE_CONCURRENCY),
+            thread_name_prefix="file-service-resolve",
+        )
+        self.max_resolved_size = config.get("resolve_max_output_size", DEFAULT_MAX_RESOLVED_SIZE)
+        # Separate from the resolve pool, the tasks run on it may resolve URLs
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=config.get("io_max_concurrency", DEFAULT_IO_CONCURRENCY),
+            thread_name_prefix="file-service-io",
+        )
+
+        # The cache is shared by all the file services of the process
+        RESOLVED_URL_CACHE.configure(
+            config.get("resolved_url_cache_max_bytes", DEFAULT_RESOLVED_URL_CACHE_MAX_BYTES)
+        )
+
+        # Expirations of the files stored through this service, seeded by the first sweep
+        self._expiry_schedule = ExpirySchedule()
+        self._checks_since_seed = 0
+
         # Start the background thread for auto-expiry
         self._start_auto_expiry_thread(self.expiration_check_interval)
 
     def _delete_expired_items(self):
-        """Checks all files and deletes those that have exceeded max_time_to_live."""
-        all_files_metadata = self.file_manager.list_all_metadata()
-        current_time = time.time()
-        for metadata in all_files_metadata:
-            current_time = time.time()
-            expiration_timestamp = metadata["expiration_timestamp"]
-
-            if current_time > expiration_timestamp:
-                try:
-                    filename, _ = self.get_parsed_url(metadata["url"])
-                    self.file_manager.delete_by_name(filename)
-                    log.info(
-                        f"Deleted expired file: {metadata['url']} {current_time} > {expiration_timestamp}"
-                    )
-                except FileNotFoundError:
-                    log.warning(f"File not found: {metadata['url']}")
-                except Exception as e:
+        """
+        Deletes the files that have exceeded max_time_to_live.
+
+        Expirations are tracked in memory: the files already stored are listed
+        on the first run, and again every expiration_reseed_interval runs to find
+        the files stored by other processes. Uploads and expiration updates made
+        through this service keep the schedule up to date in between. The metadata
+        of the files that are due is read again before they are deleted, in case
+        another process extended their expiration.
+        """
+        reseed = (
+            self.expiration_reseed_interval
+            and self._checks_since_seed >= self.expiration_reseed_interval
+        )
+        if not self._expiry_schedule.seeded or reseed:
+            # From the metadata index when the manager has one
+            self._expiry_schedule.seed(self.file_manager.list_expirations(), replace=bool(reseed))
+            self._checks_since_seed = 0
+        self._checks_since_seed += 1
+
+        now = time.time()
+        expired_files = self._get_expired_files(self._expiry_schedule.pop_due(now), now)
+        if expired_files:
+            for filename in expired_files:
+                RESOLVED_URL_CACHE.invalidate(filename)
+            errors = self.file_manager.delete_by_names(expired_files)
+            for filename, error in errors.items():
+                if isinstance(error, FileNotFoundError):
+                    log.warning(f"File not found: {FS_PROTOCOL}://{filename}")
+                else:
                     log.error(
-                        f"Failed to delete expired file: {metadata['url']} with error: {e}"
+                        f"Failed to delete expired file: {FS_PROTOCOL}://{filename} with error: {error}"
                     )
+            log.info(
+                "Deleted %d expired files", len(expired_files) - len(errors)
+            )
+
+        dedup_stats = self.get_dedup_stats()
+        if dedup_stats:
+            log.debug(
+                "File deduplication: %d of %d uploads deduplicated, %d bytes saved",
+                dedup_stats["deduplicated_uploads"],
+                dedup_stats["uploads"],
+                dedup_stats["saved_bytes"],
+            )
+
+        memory_stats = self.get_memory_stats()
+        if memory_stats:
+            log.debug(
+                "File memory: %d bytes in %d files, %d hits, %d misses, %d spills, %d evictions",
+                memory_stats["resident_bytes"],
+                memory_stats["resident_files"],
+                memory_stats["hits"],
+                memory_stats["misses"],
+                memory_stats["spills"],
+                memory_stats["evictions"],
+            )
+
+    def _get_expired_files(self, filenames: list, timestamp: float) -> list:
+        """
+        Get the files that are still expired according to their stored metadata.
+        The files whose expiration was extended are rescheduled, and the files
+        already deleted are left out.
+        """
+        expired_files = []
+        for filename, metadata in zip(
+            filenames, self.map_concurrently(self.file_manager.get_metadata, filenames)
+        ):
+            if isinstance(metadata, FileNotFoundError):
+                RESOLVED_URL_CACHE.invalidate(filename)
+            elif isinstance(metadata, Exception):
+                # Deleted as scheduled, as before the expiration could be read again
+                expired_files.append(filename)
+            elif metadata.get("expiration_timestamp", 0) > timestamp:
+                self._expiry_schedule.add(filename, metadata["expiration_timestamp"])
+            else:
+                expired_files.append(filename)
+        return expired_files
+
+    def map_concurrently(self, function: Callable, items: Iterable) -> list:
+        """
+        Call a function on each item, concurrently on the file service I/O pool,
+        for example to upload or download the files of a message.
+
+        Returns the results in the order of the items. The result of an item whose
+        call raised is the exception, the other items are not affected.
+        """
+        items = list(items)
+        if len(items) <= 1:
+            futures = [run_now(function, item) for item in items]
+        else:
+            futures = [self._io_executor.submit(function, item) for item in items]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def get_dedup_stats(self) -> dict:
+        """
+        Get the upload deduplication counters of this process: uploads,
+        deduplicated_uploads, hit_rate, uploaded_bytes and saved_bytes.
+        Returns None if the file manager does not deduplicate files.
+        """
+        return self.file_manager.get_dedup_stats()
+
+    def get_memory_stats(self) -> dict:
+        """
+        Get the counters of the file contents held in memory: hits, misses, spills,
+        evictions, resident_bytes, resident_files and spilled_bytes.
+        Returns None if the file manager does not keep the files in memory.
+        """
+        return self.file_manager.get_memory_stats()
 
     def _validate_file_url(self, file_url: str):
         if not starts_with_fs_url(file_url):
@@ -109,13 +235,8 @@ class FileService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
             )
 
     def list_all_metadata(self, session_id: str):
-        all_files_metadata = self.file_manager.list_all_metadata()
-        return [
-            metadata
-            for metadata in all_files_metadata
-            if metadata.get("session_id") == session_id
-        ]
-        
+        return self.file_manager.list_metadata_by_session(session_id)
+
 
     def validate_access_permission(
         self, filename: str, session_id: str, return_metadata=False
@@ -167,12 +288,14 @@ class FileService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
         elif type(buffer) != bytes:
             raise ValueError("Invalid buffer type. Expected bytes or string.")
 
-        return self.file_manager.upload_from_buffer(
+        metadata = self.file_manager.upload_from_buffer(
             buffer,
             file_name,
             session_id=session_id,
             **kwargs,
         )
+        self._schedule_expiry(metadata)
+        return metadata
 
     def upload_from_file(self, file_path: str, session_id: str, **kwargs) -> dict:
         """
@@ -184,9 +307,25 @@ class FileService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
         - shape: str
         - data_source: str
         """
-        return self.file_manager.upload_from_file(
+        metadata = self.file_manager.upload_from_file(
             file_path, session_id=session_id, **kwargs
         )
+        self._schedule_expiry(metadata)
+        return metadata
+
+    def open_write(self, file_name: str, session_id: str, **kwargs) -> FileWriter:
+        """
+        Open a new file for writing, to upload content without holding it all in memory.
+        kwargs are added to metadata, as with upload_from_buffer.
+        The metadata is available as the writer's metadata attribute once it is closed.
+        """
+        writer = self.file_manager.open_write(file_name, session_id=session_id, **kwargs)
+        writer.add_done_callback(self._schedule_expiry)
+        return writer
+
+    def _schedule_expiry(self, metadata: dict):
+        filename, _ = self.get_parsed_url(metadata["url"])
+        self._expiry_schedule.add(filename, metadata["expiration_timestamp"])
 
     def get_metadata(self, file_url: str) -> dict:
         """
@@ -205,17 +344,38 @@ class FileService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
 
     def download_to_file(self, file_url: str, destination_path: str, session_id: str):
         """
-        Download a file to a destination path.
+        Download a file to a destination path, without holding it in memory.
         """
         filename, _ = self.get_parsed_url(file_url)
         self.validate_access_permission(filename, session_id)
         return self.file_manager.download_to_file(filename, destination_path)
 
+    def open_read(self, file_url: str, session_id: str) -> BinaryIO:
+        """
+        Open a file for reading as a binary file object.
+        """
+        filename, _ = self.get_parsed_url(file_url)
+        self.validate_access_permission(filename, session_id)
+        return self.file_manager.open_read(filename)
+
+    def iter_chunks(
+        self, file_url: str, session_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """
+        Iterate over the content of a file in chunks.
+        Chunks may be memoryviews that are only valid until the next chunk is requested.
+        """
+        filename, _ = self.get_parsed_url(file_url)
+        self.validate_access_permission(filename, session_id)
+        return self.file_manager.iter_chunks(filename, chunk_size)
+
     def delete_by_url(self, file_url: str):
         """
         Delete a file by URL.
         """
         filename, _ = self.get_parsed_url(file_url)
+        RESOLVED_URL_CACHE.invalidate(filename)
+        self._expiry_schedule.remove(filename)
         return self.file_manager.delete_by_name(filename)
     
     def update_file_expiration(self, file_url: str, expiration_timestamp: float):
@@ -223,7 +383,8 @@ class FileService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
         Update the expiration timestamp for a file.
         """
         filename, _ = self.get_parsed_url(file_url)
-        return self.file_manager.update_file_expiration(filename, expiration_timestamp)
+        self.file_manager.update_file_expiration(filename, expiration_timestamp)
+        self._expiry_schedule.add(filename, expiration_timestamp)
 
     def get_file_block_by_url(self, file_url: str) -> str:
         """
@@ -285,82 +446,57 @@ class FileService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
         file_metadata = self.validate_access_permission(
             filename, session_id, return_metadata=True
         )
-        file_bytes = self.file_manager.download_to_buffer(filename)
         if return_extra:
+            file_bytes = self._get_resolved_content(filename, file_metadata, {})
             return (
-                apply_file_transformations(file_bytes, file_metadata, queries),
+                self._get_resolved_content(filename, file_metadata, queries, file_bytes),
                 file_bytes,
                 file_metadata,
             )
-        return apply_file_transformations(file_bytes, file_metadata, queries)
+        return self._get_resolved_content(filename, file_metadata, queries)
+
+    def _get_resolved_content(
+        self, filename: str, metadata: dict, queries: dict, file_bytes: bytes = None
+    ):
+        """
+        Get the transformed content of a file from the resolved URL cache, or
+        download and transform it. The access must be validated by the caller.
+        """
+        content = RESOLVED_URL_CACHE.get(filename, queries)
+        if content is not None:
+            return content
+        if file_bytes is None:
+            file_bytes = self.file_manager.download_to_buffer(filename)
+        content = apply_file_transformations(file_bytes, metadata, queries)
+        RESOLVED_URL_CACHE.put(filename, queries, content)
+        return content
 
     def resolve_all_resolvable_urls(
         self, text: str, session_id: str, forceResolve=False
     ) -> str:
         """
-        Resolve all resolvable URLs in a text
+        Resolve all resolvable URLs in a text, and the resolvable URLs in their
+        resolved contents (for example, report sections that embed images).
 
         Parameters:
         - text (str): The text to resolve URLs in.
         - forceResolve (bool): Whether to force resolve all URLs (if false, only URLs with 'resolve' query parameter set to True will be resolved).
         """
-        cache = {}
+        return self._get_url_resolver(session_id, forceResolve).resolve(text)
+
+    def iter_resolved_text(
+        self, text: str, session_id: str, forceResolve=False
+    ) -> Iterator[str]:
+        """
+        Same as resolve_all_resolvable_urls, but yields the resolved text in pieces
+        instead of assembling it.
+        """
+        return self._get_url_resolver(session_id, forceResolve).iter_resolved(text)
 
+    def _get_url_resolver(self, session_id: str, force_resolve: bool) -> UrlResolver:
         if not session_id:
             raise ValueError("Invalid session ID used for resolving URLs")
-
-        def replace_url(match):
-            raw_url = match.group()
-            url = FileService._clean_url(raw_url)
-            try:
-                filename, queries = self.get_parsed_url(url)
-
-                resolvable = queries.get("resolve", False)
-                resolvable = (
-                    resolvable
-                    if isinstance(resolvable, bool)
-                    else resolvable.lower() == "true"
-                )
-                if not resolvable and not forceResolve:
-                    return raw_url
-
-                if filename in cache:
-                    metadata = cache[filename][0]
-                    file_bytes = cache[filename][1]
-                else:
-                    metadata = self.validate_access_permission(
-                        filename, session_id, return_metadata=True
-                    )
-                    file_bytes = self.file_manager.download_to_buffer(filename)
-                    cache[filename] = (metadata, file_bytes)
-
-                response = apply_file_transformations(file_bytes, metadata, queries)
-                # Convert type to string
-                if type(response) == bytes:
-                    response = response.decode("utf-8", "ignore")
-                elif type(response) == str:
-                    pass
-                else:
-                    response = json.dumps(response)
-                # If initial URl was in quotes, return the response in quotes
-                if raw_url.startswith('"') or raw_url.startswith("'"):
-                    response = f"{raw_url[0]}{response}"
-
-                if raw_url.endswith('"') or raw_url.endswith("'"):
-                    response = f"{response}{raw_url[-1]}"
-                elif raw_url.endswith("',") or raw_url.endswith('",'):
-                    response = f"{response}{''.join(raw_url[-2:])}"
-                # If initial URL ends with a comma, return the response with a comma
-                elif raw_url.endswith(","):
-                    response = f"{response},"
-                return response
-            except FileServicePermissionError as e:
-                raise e
-            except Exception as e:
-                log.error(f"Failed to resolve URL: {raw_url} with error: {e}")
-                raise e
-
-        return re.sub(FS_URL_REGEX, replace_url, text)
+        return UrlResolver(self, session_id, force_resolve, self.max_resolved_size)
 
     @staticmethod
     def get_urls_from_text(text: str) -> list:
@@ -375,7 +511,8 @@ class FileService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
             urls.append(url)
             return raw_url
 
-        re.sub(FS_URL_REGEX, append_url, text)
+        if text and FS_URL_PREFIX in text:
+            re.sub(FS_URL_PATTERN, append_url, text)
         return urls
 
     @staticmethod
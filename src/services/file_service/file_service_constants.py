@@ -1,8 +1,15 @@
+import re
+
 FS_PROTOCOL = "amfs"
 """
 mesh file service protocol.
 """
 
+FS_URL_PREFIX = f"{FS_PROTOCOL}://"
+"""
+Prefix of the file service URLs, used to skip texts without any URL.
+"""
+
 META_FILE_EXTENSION = ".metadata"
 """
 Extension for metadata files.
@@ -23,6 +30,7 @@ BLOCK_IGNORE_KEYS = [
     "session_id",
     "upload_timestamp",
     "url",
+    "content_hash",
 ]
 """
 Keys to ignore from metadata file attribute while generating file block.
@@ -52,3 +60,33 @@ Matches if: \n
 - Starts with "FS_PROTOCOL:// ends with " or newline \n
 - Starts with 'FS_PROTOCOL:// ends with ' or newline \n
 """
+
+FS_URL_PATTERN = re.compile(FS_URL_REGEX)
+"""
+Compiled FS_URL_REGEX.
+"""
+
+DEFAULT_RESOLVE_CONCURRENCY = 8
+"""
+Maximum number of file URLs resolved concurrently.
+"""
+
+DEFAULT_IO_CONCURRENCY = 8
+"""
+Maximum number of files uploaded or downloaded concurrently by map_concurrently.
+"""
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+"""
+Chunk size in bytes for streaming file reads and writes.
+"""
+
+DEFAULT_SCHEMA_MAX_BYTES = 64 * 1024 * 1024
+"""
+Maximum number of bytes of a file read to extract its schema and shape.
+"""
+
+DEFAULT_EXPIRATION_RESEED_INTERVAL = 6
+"""
+Number of expiry checks between two listings of the stored files, to find the files stored by other processes.
+"""
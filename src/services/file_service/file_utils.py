@@ -1,9 +1,19 @@
 # Add utility functions for upload CSV that automatically creates the number of row and data types
+import base64
+import codecs
 import csv
-from typing import Tuple, Union
+import re
+from typing import Iterable, Iterator, Tuple, Union
 import json
 
-from .file_service_constants import FS_PROTOCOL, INDENT_SIZE
+from .file_service_constants import FS_PROTOCOL, INDENT_SIZE, DEFAULT_CHUNK_SIZE
+
+SCHEMA_MIME_TYPES = ("text/csv", "application/json")
+"""
+MIME types for which a schema and shape are extracted.
+"""
+
+BASE64_REGEX = re.compile(r"[A-Za-z0-9+/]*={0,2}")
 
 
 class Types:
@@ -75,46 +85,104 @@ def space(size=INDENT_SIZE):
     return " " * size
 
 
-def extract_csv_schema_and_shape(csv_file: Union[str, bytes]) -> Tuple[dict, Tuple[int, int]]:
+def iter_buffer_chunks(buffer: Union[bytes, str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator:
+    """
+    Iterate over zero-copy slices of a buffer.
+    """
+    if isinstance(buffer, str):
+        buffer = buffer.encode("utf-8")
+    view = memoryview(buffer)
+    for start in range(0, len(view), chunk_size):
+        yield view[start : start + chunk_size]
+
+
+def iter_text_lines(chunks: Iterable, max_bytes: int = None, _state: dict = None) -> Iterator[str]:
+    """
+    Decode UTF-8 chunks incrementally and yield their lines, with their line endings.
+    Stops at the last complete line once max_bytes have been read, and then sets
+    _state["truncated"].
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    pending = ""
+    read_bytes = 0
+    for chunk in chunks:
+        read_bytes += len(chunk)
+        lines = (pending + decoder.decode(chunk)).splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        yield from lines
+        if max_bytes is not None and read_bytes > max_bytes:
+            if _state is not None:
+                _state["truncated"] = True
+            return
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def infer_column_type(values: Iterable[str]) -> str:
+    """
+    Get the type of a column from its values: their common type, or str if they differ.
+    """
+    types = {get_str_type(value) for value in values}
+    if not types:
+        return None
+    return types.pop() if len(types) == 1 else Types.STR
+
+
+def extract_csv_schema_and_shape(
+    csv_file: Union[str, bytes, Iterable], max_bytes: int = None, sample_size: int = 10
+) -> Tuple[dict, Tuple[int, int]]:
     """
-    Get the schema and shape of a CSV file.
+    Get the schema and shape of a CSV file, reading it as a stream.
 
     Parameters:
-    - csv_file (str): The CSV file content.
-    - header_row (str): The header row of the CSV file.
+    - csv_file (str|bytes|Iterable): The CSV file content, or an iterable of its chunks.
+    - max_bytes (int): Stop counting the rows after this many bytes.
+    - sample_size (int): The number of rows the column types are derived from.
 
     Returns:
-    - str: The schema of the CSV file.
-    - st: The shape of the CSV file.
-    """
-    if type(csv_file) == bytes:
-        csv_file = csv_file.decode("utf-8")
-
-    # Parse the CSV string
-    csv_lines = csv_file.splitlines()
-    csv_reader = csv.DictReader(csv_lines)
-    columns = csv_reader.fieldnames
-    listed_csv = list(csv_reader)
-    shape = (len(listed_csv), len(columns))
-    schema = {}
-    for col in columns:
-        # deriving type from the top 10 rows
-        col_type = None
-        for i, row in enumerate(listed_csv):
-            if i >= 10:
-                break
-            curr_type = get_str_type(row[col])
-            if col_type is None:
-                col_type = curr_type
-            elif col_type != curr_type:
-                # multiple types, set as str
-                col_type = Types.STR
-                break
-        schema[col] = {"type": col_type}
-
+    - dict: The schema of the CSV file.
+    - Tuple[int, int]: The shape of the CSV file. With max_bytes, the number of
+      rows may be a lower bound, see extract_csv_schema_and_shape_from_chunks.
+    """
+    schema, shape, _ = extract_csv_schema_and_shape_from_chunks(
+        csv_file, max_bytes, sample_size
+    )
     return schema, shape
 
 
+def extract_csv_schema_and_shape_from_chunks(
+    csv_file: Union[str, bytes, Iterable], max_bytes: int = None, sample_size: int = 10
+) -> Tuple[dict, Tuple[int, int], bool]:
+    """
+    Same as extract_csv_schema_and_shape, and also returns whether the file was
+    truncated at max_bytes, in which case the number of rows is a lower bound.
+    """
+    if isinstance(csv_file, (bytes, str)):
+        csv_file = iter_buffer_chunks(csv_file)
+    state = {"truncated": False}
+    csv_reader = csv.reader(iter_text_lines(csv_file, max_bytes, state))
+    columns = next(csv_reader, [])
+
+    # Only the first rows are kept, the others are counted
+    sample = []
+    row_count = 0
+    for row in csv_reader:
+        if not row:
+            continue
+        row_count += 1
+        if row_count <= sample_size:
+            sample.append(row + [None] * (len(columns) - len(row)))
+
+    # Derive the type of each column from the sampled rows
+    sample_columns = list(zip(*sample)) if sample else [()] * len(columns)
+    schema = {
+        column: {"type": infer_column_type(values)}
+        for column, values in zip(columns, sample_columns)
+    }
+    return schema, (row_count, len(columns)), state["truncated"]
+
+
 def dict_to_schema(input_dict: dict) -> dict:
     """
     Convert a dictionary to a JSON schema.
@@ -195,19 +263,24 @@ def get_dict_array_shape(
     return _result
 
 
-def get_csv_schema_and_shape(schema: dict, shape: Tuple[int, int]) -> Tuple[str, str]:
+def get_csv_schema_and_shape(
+    schema: dict, shape: Tuple[int, int], truncated: bool = False
+) -> Tuple[str, str]:
     """
     Get the formatted schema and shape of a CSV file.
 
     Parameters:
     - schema (dict): The schema of the CSV file.
     - shape (Tuple[int, int]): The shape of the CSV file.
+    - truncated (bool): Whether the number of rows is a lower bound.
 
     Returns:
     - str: The formatted schema of the CSV file.
     - Tuple[int, int]: The shape of the CSV file.
     """
     shape_str = f"{shape[0]} rows x {shape[1]} columns"
+    if truncated:
+        shape_str = f"at least {shape_str}"
     schema_dict = {
         "type": Types.ARRAY,
         "items": {"type": Types.OBJECT, "properties": schema},
@@ -216,8 +289,23 @@ def get_csv_schema_and_shape(schema: dict, shape: Tuple[int, int]) -> Tuple[str,
     return schema_str, shape_str
 
 
-def get_json_schema_and_shape(file: Union[bytes, str]) -> Tuple[str, str]:
+def get_json_schema_and_shape(
+    file: Union[bytes, str, Iterable], max_bytes: int = None
+) -> Tuple[str, str]:
+    """
+    Get the schema and shape of a JSON file.
+    Files larger than max_bytes are not parsed, and have no schema or shape.
+    """
     try:
+        if not isinstance(file, (bytes, str)):
+            buffer = bytearray()
+            for chunk in file:
+                buffer += chunk
+                if max_bytes is not None and len(buffer) > max_bytes:
+                    return None, None
+            file = bytes(buffer)
+        elif max_bytes is not None and len(file) > max_bytes:
+            return None, None
         if type(file) == bytes:
             file = file.decode("utf-8")
         json_data = json.loads(file)
@@ -238,24 +326,27 @@ def get_json_schema_and_shape(file: Union[bytes, str]) -> Tuple[str, str]:
         return None, None
 
 
-def get_file_schema_and_shape(file: bytes, metadata: dict) -> Tuple[str, str]:
+def get_file_schema_and_shape(
+    file: Union[bytes, Iterable], metadata: dict, max_bytes: int = None
+) -> Tuple[str, str]:
     """
     Get the schema and shape of a file.
 
     Parameters:
-    - file (bytes): The file content as bytes.
+    - file (bytes|Iterable): The file content as bytes, or an iterable of its chunks.
     - metadata (dict): The file metadata.
+    - max_bytes (int): The maximum number of bytes read from the file.
 
     Returns:
     - str: The schema of the file. None if cannot be determined.
     - str: The shape of the file. None if cannot be determined.
     """
     if metadata.get("mime_type") == "text/csv":
-        schema, shape = extract_csv_schema_and_shape(file)
-        schema_str, shape_str = get_csv_schema_and_shape(schema, shape)
+        schema, shape, truncated = extract_csv_schema_and_shape_from_chunks(file, max_bytes)
+        schema_str, shape_str = get_csv_schema_and_shape(schema, shape, truncated)
         return schema_str, shape_str
     elif metadata.get("mime_type") == "application/json":
-        schema, shape = get_json_schema_and_shape(file)
+        schema, shape = get_json_schema_and_shape(file, max_bytes)
         return schema, shape
     else:
         return None, None
@@ -322,3 +413,47 @@ def starts_with_fs_url(url: str) -> bool:
         or url.startswith(f"<url>{FS_PROTOCOL}://")
         or url.startswith(f"<url> {FS_PROTOCOL}://")
     )
+
+
+def iter_base64_decoded(content: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Decode a base64 string in chunks of about chunk_size bytes.
+
+    Parameters:
+    - content (str): The base64 encoded content.
+    - chunk_size (int): The size of the decoded chunks.
+
+    Returns:
+    - Iterator[bytes]: The decoded chunks. Raises binascii.Error before the first
+      chunk if the content is not valid base64.
+    """
+    if len(content) % 4 or not BASE64_REGEX.fullmatch(content):
+        # Not a single unbroken base64 string (e.g. line wrapped), decode it at once
+        yield base64.b64decode(content)
+        return
+
+    step = max(chunk_size // 3, 1) * 4
+    for start in range(0, len(content), step):
+        yield base64.b64decode(content[start : start + step])
+
+
+def encode_base64_chunks(chunks: Iterable) -> str:
+    """
+    Base64 encode content provided in chunks, without joining the raw content first.
+
+    Parameters:
+    - chunks (Iterable): The content chunks, bytes or memoryviews.
+
+    Returns:
+    - str: The base64 encoded content.
+    """
+    parts = []
+    remainder = b""
+    for chunk in chunks:
+        data = remainder + bytes(chunk) if remainder else chunk
+        # Encode whole 3 byte groups so that the parts can be concatenated
+        cut = len(data) - len(data) % 3
+        parts.append(base64.b64encode(data[:cut]).decode("ascii"))
+        remainder = bytes(data[cut:])
+    parts.append(base64.b64encode(remainder).decode("ascii"))
+    return "".join(parts)
@@ -0,0 +1,101 @@
+"""
+Process-wide LRU cache of resolved file URLs.
+
+Entries are keyed by file name and normalized query, and hold the transformed
+content (bytes or str) so repeated resolutions of the same URL skip both the
+download and the transformations. Access checks are not cached: callers validate
+the session before reading from the cache.
+"""
+
+import threading
+from collections import OrderedDict
+
+DEFAULT_RESOLVED_URL_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+
+def get_cache_key(filename: str, queries: dict) -> tuple:
+    # The query parameters are normalized so that their order does not matter
+    return (filename, tuple(sorted((k, str(v)) for k, v in queries.items())))
+
+
+class ResolvedUrlCache:
+    """
+    A thread-safe LRU of resolved contents, bounded by their total size in bytes.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_RESOLVED_URL_CACHE_MAX_BYTES):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_filename = {}
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def get(self, filename: str, queries: dict):
+        """
+        Get the resolved content, or None if it is not cached.
+        """
+        key = get_cache_key(filename, queries)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, filename: str, queries: dict, content):
+        if not isinstance(content, (bytes, str)):
+            # Other results are mutable, they are not shared between callers
+            return
+        size = len(content)
+        # A single entry may use at most a quarter of the budget
+        if size > self.max_bytes // 4:
+            return
+        key = get_cache_key(filename, queries)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (content, size)
+            self._keys_by_filename.setdefault(filename, set()).add(key)
+            self.current_bytes += size
+            self._evict()
+
+    def invalidate(self, filename: str):
+        """
+        Drop all the cached resolutions of a file.
+        """
+        with self._lock:
+            for key in list(self._keys_by_filename.get(filename, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_filename.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.current_bytes -= entry[1]
+        keys = self._keys_by_filename.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_filename[key[0]]
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+
+RESOLVED_URL_CACHE = ResolvedUrlCache()
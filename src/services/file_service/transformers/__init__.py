@@ -1,5 +1,22 @@
-TRANSFORMERS = []
+from .transformer_base import TransformerBase
+from .query_transformers import (
+    JsonPathTransformer,
+    FilterTransformer,
+    ColumnsTransformer,
+    RowsTransformer,
+    MaxBytesTransformer,
+)
+
+# Applied in order, MaxBytesTransformer turns the selection back into text so it must be last
+TRANSFORMERS = [
+    JsonPathTransformer(),
+    FilterTransformer(),
+    ColumnsTransformer(),
+    RowsTransformer(),
+    MaxBytesTransformer(),
+]
 
 __all__ = [
-    "TRANSFORMERS"
+    "TRANSFORMERS",
+    "TransformerBase",
 ]
@@ -0,0 +1,152 @@
+"""
+A small JSONPath evaluator.
+
+Supported syntax: the root `$`, child names (`.name`, `['name']`, `["name"]`),
+unions of names or indexes (`['a','b']`, `[0,2]`), indexes (`[0]`, `[-1]`),
+slices (`[1:5]`, `[::2]`), wildcards (`.*`, `[*]`) and recursive descent (`..name`).
+"""
+
+import re
+from typing import Any, List
+
+_TOKEN_REGEX = re.compile(
+    r"""
+    (?P<recursive>\.\.)
+    |\.(?P<name>[^.\[\]]+)
+    |\[(?P<bracket>(?:'[^']*'|"[^"]*"|[^\]'"])*)\]
+    """,
+    re.VERBOSE,
+)
+
+
+class JsonPathError(ValueError):
+    pass
+
+
+def _parse_bracket(content: str):
+    content = content.strip()
+    if content == "*":
+        return ("wildcard", None)
+    if ":" in content and not content.startswith(("'", '"')):
+        parts = [part.strip() for part in content.split(":")]
+        if len(parts) > 3:
+            raise JsonPathError(f"Invalid slice: [{content}]")
+        try:
+            values = [int(part) if part else None for part in parts]
+        except ValueError:
+            raise JsonPathError(f"Invalid slice: [{content}]")
+        return ("slice", slice(*values))
+    selectors = []
+    for part in re.findall(r"""'[^']*'|"[^"]*"|[^,]+""", content):
+        part = part.strip()
+        if part.startswith(("'", '"')):
+            selectors.append(part[1:-1])
+        else:
+            try:
+                selectors.append(int(part))
+            except ValueError:
+                raise JsonPathError(f"Invalid selector: [{content}]")
+    if not selectors:
+        raise JsonPathError("Empty selector: []")
+    return ("union", selectors) if len(selectors) > 1 else ("child", selectors[0])
+
+
+def parse_jsonpath(path: str) -> list:
+    """
+    Parse a JSONPath expression into a list of (recursive, kind, value) steps.
+    """
+    path = path.strip()
+    if path.startswith("$"):
+        path = path[1:]
+    elif path and not path.startswith((".", "[")):
+        # Allow "items[0].name" for "$.items[0].name"
+        path = "." + path
+
+    steps = []
+    position = 0
+    recursive = False
+    while position < len(path):
+        match = _TOKEN_REGEX.match(path, position)
+        if not match:
+            raise JsonPathError(f"Invalid JSONPath at position {position + 1}: {path}")
+        position = match.end()
+        if match.group("recursive"):
+            recursive = True
+            # "..name" and "..*" have the name directly after the dots
+            name_match = re.match(r"[^.\[\]]+", path[position:])
+            if name_match:
+                name = name_match.group()
+                steps.append((True, "wildcard" if name == "*" else "child", None if name == "*" else name))
+                position += name_match.end()
+                recursive = False
+            continue
+        if match.group("name") is not None:
+            name = match.group("name").strip()
+            step = ("wildcard", None) if name == "*" else ("child", name)
+        else:
+            step = _parse_bracket(match.group("bracket"))
+        steps.append((recursive, *step))
+        recursive = False
+    if recursive:
+        raise JsonPathError(f"Invalid JSONPath, it ends with '..': {path}")
+    return steps
+
+
+def _children(value) -> list:
+    if isinstance(value, dict):
+        return list(value.values())
+    if isinstance(value, list):
+        return value
+    return []
+
+
+def _descendants(value) -> list:
+    result = [value]
+    for child in _children(value):
+        result.extend(_descendants(child))
+    return result
+
+
+def _select(value, kind: str, selector) -> list:
+    if kind == "wildcard":
+        return _children(value)
+    if kind == "slice":
+        return value[selector] if isinstance(value, list) else []
+    selectors = selector if kind == "union" else [selector]
+    result = []
+    for key in selectors:
+        if isinstance(value, dict) and str(key) in value:
+            result.append(value[str(key)])
+        elif isinstance(value, list) and isinstance(key, int) and -len(value) <= key < len(value):
+            result.append(value[key])
+    return result
+
+
+def is_definite(steps: list) -> bool:
+    """
+    Whether the path selects at most one value.
+    """
+    return all(not recursive and kind == "child" for recursive, kind, _ in steps)
+
+
+def find(data: Any, path: str) -> List[Any]:
+    """
+    Get all the values matching a JSONPath expression.
+    """
+    matches = [data]
+    for recursive, kind, selector in parse_jsonpath(path):
+        if recursive:
+            matches = [descendant for match in matches for descendant in _descendants(match)]
+        matches = [result for match in matches for result in _select(match, kind, selector)]
+    return matches
+
+
+def select(data: Any, path: str) -> Any:
+    """
+    Get the value of a JSONPath expression: the matched value for paths that
+    select a single value (None if there is no match), otherwise the list of matches.
+    """
+    matches = find(data, path)
+    if is_definite(parse_jsonpath(path)):
+        return matches[0] if matches else None
+    return matches
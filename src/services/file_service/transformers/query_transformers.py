@@ -0,0 +1,409 @@
+"""
+Transformers that select part of a CSV, JSON or text file from the query
+parameters of its URL, so that only the needed slice is returned.
+
+CSV rows are read lazily and go through the transformers as a stream of rows:
+`head` and `rows` stop reading the file once they have enough rows, and `tail`
+only keeps the last rows. JSON files are parsed once. The last transformer,
+MaxBytesTransformer, turns the selection back into text.
+"""
+
+import csv
+import io
+import json
+import re
+from collections import deque
+from itertools import islice
+from typing import Any, Iterator, Optional
+
+from .jsonpath import select
+from .transformer_base import TransformerBase
+from ..file_service_constants import FS_PROTOCOL
+
+FILTER_REGEX = re.compile(r"^\s*(.+?)\s*(==|!=|>=|<=|~=|>|<)\s*(.*?)\s*$")
+
+
+class Table:
+    """
+    The rows of a CSV file, or the lines of a text file (without header), read lazily.
+    """
+
+    def __init__(self, header: Optional[list], rows: Iterator):
+        self.header = header
+        self.rows = rows
+
+    @classmethod
+    def from_csv(cls, text: str) -> "Table":
+        reader = csv.reader(_iter_lines(text))
+        header = next(reader, [])
+        return cls(header, (row for row in reader if row))
+
+    @classmethod
+    def from_text(cls, text: str) -> "Table":
+        return cls(None, _iter_lines(text))
+
+    def get_column_index(self, column: str) -> int:
+        if self.header is None:
+            raise ValueError("Columns are only supported for CSV and JSON files")
+        try:
+            return self.header.index(column)
+        except ValueError:
+            raise ValueError(
+                f"Unknown column '{column}', the columns are: {', '.join(self.header)}"
+            )
+
+
+class JsonData:
+    """
+    A parsed JSON file.
+    """
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+def _iter_lines(text: str) -> Iterator[str]:
+    """
+    Iterate over the lines of a text, with their line endings.
+    """
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        if end == -1:
+            end = len(text)
+        else:
+            end += 1
+        yield text[start:end]
+        start = end
+
+
+def _load(data: Any, other: dict):
+    """
+    Get the data as a Table or JsonData, parsing the file content if needed.
+    """
+    if isinstance(data, (Table, JsonData)):
+        return data
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+    mime_type = other.get("mime_type") or ""
+    if "csv" in mime_type:
+        return Table.from_csv(data)
+    if "json" in mime_type:
+        return JsonData(json.loads(data))
+    return Table.from_text(data)
+
+
+def _to_number(value) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_text(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return ""
+    return str(value)
+
+
+def parse_filters(expression: str) -> list:
+    """
+    Parse a filter expression: conditions separated by ';', all of which must match.
+    """
+    filters = []
+    for condition in expression.split(";"):
+        if not condition.strip():
+            continue
+        match = FILTER_REGEX.match(condition)
+        if not match:
+            raise ValueError(
+                f"Invalid filter '{condition}', expected <column><operator><value> "
+                "with one of the operators ==, !=, >, >=, <, <=, ~="
+            )
+        column, operator, value = match.groups()
+        if len(value) > 1 and value[0] == value[-1] and value[0] in "'\"":
+            value = value[1:-1]
+        filters.append((column, operator, value))
+    return filters
+
+
+def matches_filter(actual, operator: str, expected: str) -> bool:
+    if operator == "~=":
+        return expected.lower() in _to_text(actual).lower()
+    actual_number = _to_number(actual)
+    expected_number = _to_number(expected)
+    if actual_number is not None and expected_number is not None:
+        actual, expected = actual_number, expected_number
+    else:
+        actual = _to_text(actual)
+    if operator == "==":
+        return actual == expected
+    if operator == "!=":
+        return actual != expected
+    try:
+        if operator == ">":
+            return actual > expected
+        if operator == ">=":
+            return actual >= expected
+        if operator == "<":
+            return actual < expected
+        return actual <= expected
+    except TypeError:
+        return False
+
+
+def parse_row_range(value: str) -> slice:
+    """
+    Parse a row range: 'start:end', 'start:', ':end' or a single row index.
+    """
+    try:
+        if ":" in value:
+            start, end = (int(part) if part.strip() else None for part in value.split(":", 1))
+            return slice(start, end)
+        index = int(value)
+        return slice(index, index + 1 if index != -1 else None)
+    except ValueError:
+        raise ValueError(f"Invalid row range '{value}', expected start:end")
+
+
+def parse_count(value: str, name: str) -> int:
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        count = -1
+    if count < 0:
+        raise ValueError(f"Invalid {name} '{value}', expected a positive integer")
+    return count
+
+
+def slice_rows(rows, selection: slice):
+    if isinstance(rows, list):
+        return rows[selection]
+    if (selection.start or 0) < 0 or (selection.stop or 0) < 0:
+        # Negative indexes need the whole file
+        return list(rows)[selection]
+    return islice(rows, selection.start, selection.stop)
+
+
+class JsonPathTransformer(TransformerBase):
+    queries = {"jsonpath": {"type": "str"}}
+    description = """
+    For JSON files, there's `jsonpath` parameter to select part of the file with a JSONPath expression. Supported: `$`, `.name`, `['name']`, `[0]`, `[-1]`, `[1:5]`, `[0,2]`, `[*]`, `.*` and `..name`.
+    """
+    examples = [
+        f"Names of all the users: `{FS_PROTOCOL}://bfe47b63-dd8a-4cf8-9a3b-0e6a2ad5e8d5_users.json?jsonpath=$.users[*].name&resolve=true`",
+    ]
+
+    def transform(self, file, data, transformations, other):
+        path = transformations.get("jsonpath")
+        if not path:
+            return data
+        data = _load(data, other)
+        if not isinstance(data, JsonData):
+            raise ValueError("The jsonpath parameter is only supported for JSON files")
+        return JsonData(select(data.value, path))
+
+
+class FilterTransformer(TransformerBase):
+    queries = {"filter": {"type": "str"}}
+    description = """
+    For CSV files and JSON arrays of objects, there's `filter` parameter to only keep the matching rows. The format is `<column><operator><value>`, with the operators `==`, `!=`, `>`, `>=`, `<`, `<=` and `~=` (contains, case insensitive). Separate several conditions, that must all match, with `;`. In URLs, write `>` as `%3E`, `<` as `%3C` and `&` as `%26`.
+    """
+    examples = [
+        f"Orders above 100 in the north region: `{FS_PROTOCOL}://3f1a6c0e-8a73-4d2e-9f55-7b0c1d2e3f4a_orders.csv?filter=region==north;amount%3E100&resolve=true`",
+    ]
+
+    def transform(self, file, data, transformations, other):
+        expression = transformations.get("filter")
+        if not expression:
+            return data
+        filters = parse_filters(expression)
+        data = _load(data, other)
+        if isinstance(data, Table):
+            indexes = [(data.get_column_index(column), operator, value) for column, operator, value in filters]
+            data.rows = (
+                row
+                for row in data.rows
+                if all(
+                    matches_filter(row[index] if index < len(row) else None, operator, value)
+                    for index, operator, value in indexes
+                )
+            )
+            return data
+        if not isinstance(data.value, list):
+            raise ValueError("The filter parameter is only supported for CSV files and JSON arrays")
+        data.value = [
+            item
+            for item in data.value
+            if isinstance(item, dict)
+            and all(
+                column in item and matches_filter(item[column], operator, value)
+                for column, operator, value in filters
+            )
+        ]
+        return data
+
+
+class ColumnsTransformer(TransformerBase):
+    queries = {"columns": {"type": "str"}}
+    description = """
+    For CSV files and JSON arrays of objects, there's `columns` parameter to only keep some columns (or object keys), comma-separated.
+    """
+    examples = [
+        f"Only the name and email columns: `{FS_PROTOCOL}://9c2d4e6f-1a3b-4c5d-8e7f-0a1b2c3d4e5f_contacts.csv?columns=name,email&resolve=true`",
+    ]
+
+    def transform(self, file, data, transformations, other):
+        value = transformations.get("columns")
+        if not value:
+            return data
+        columns = [column.strip() for column in value.split(",") if column.strip()]
+        data = _load(data, other)
+        if isinstance(data, Table):
+            indexes = [data.get_column_index(column) for column in columns]
+            data.header = columns
+            data.rows = ([row[index] if index < len(row) else "" for index in indexes] for row in data.rows)
+            return data
+
+        def project(item):
+            return {column: item[column] for column in columns if column in item}
+
+        if isinstance(data.value, list):
+            data.value = [project(item) if isinstance(item, dict) else item for item in data.value]
+        elif isinstance(data.value, dict):
+            data.value = project(data.value)
+        return data
+
+
+class RowsTransformer(TransformerBase):
+    queries = {
+        "rows": {"type": "str"},
+        "head": {"type": "int"},
+        "tail": {"type": "int"},
+    }
+    description = """
+    For CSV files, JSON arrays and text files, there are `rows`, `head` and `tail` parameters to only return some rows (excluding the CSV header), array items or lines. `rows=start:end` returns the rows from start (0-based, included) to end (excluded), `head=n` the first n rows and `tail=n` the last n rows. They can be combined with `filter`, which is applied first.
+    """
+    examples = [
+        f"The first 20 rows: `{FS_PROTOCOL}://5e6f7a8b-9c0d-4e1f-a2b3-c4d5e6f7a8b9_sales.csv?head=20&resolve=true`",
+        f"Rows 100 to 149: `{FS_PROTOCOL}://5e6f7a8b-9c0d-4e1f-a2b3-c4d5e6f7a8b9_sales.csv?rows=100:150&resolve=true`",
+    ]
+
+    def transform(self, file, data, transformations, other):
+        if not any(transformations.get(key) not in (None, "") for key in self.queries):
+            return data
+        data = _load(data, other)
+        if isinstance(data, JsonData):
+            if not isinstance(data.value, list):
+                raise ValueError("The rows, head and tail parameters are only supported for JSON arrays")
+            rows = data.value
+        else:
+            rows = data.rows
+
+        if transformations.get("rows") not in (None, ""):
+            rows = slice_rows(rows, parse_row_range(str(transformations["rows"])))
+        if transformations.get("head") not in (None, ""):
+            rows = slice_rows(rows, slice(parse_count(transformations["head"], "head")))
+        if transformations.get("tail") not in (None, ""):
+            count = parse_count(transformations["tail"], "tail")
+            rows = list(deque(rows, maxlen=count)) if count else []
+
+        if isinstance(data, JsonData):
+            data.value = list(rows)
+        else:
+            data.rows = rows
+        return data
+
+
+class MaxBytesTransformer(TransformerBase):
+    """
+    Turns the selected data back into text, truncated to max_bytes on a row boundary.
+    Must be the last transformer.
+    """
+
+    queries = {"max_bytes": {"type": "int"}}
+    description = """
+    For CSV, JSON and text files, there's `max_bytes` parameter to limit the size of the returned content. CSV files and text files are cut after the last complete row or line, and JSON arrays after the last complete item.
+    """
+
+    def transform(self, file, data, transformations, other):
+        max_bytes = transformations.get("max_bytes")
+        if max_bytes in (None, ""):
+            max_bytes = None
+        else:
+            max_bytes = parse_count(max_bytes, "max_bytes")
+        if not isinstance(data, (Table, JsonData)):
+            if max_bytes is None:
+                return data
+            data = _load(data, other)
+        if isinstance(data, JsonData):
+            return self._serialize_json(data.value, max_bytes)
+        return self._serialize_table(data, max_bytes)
+
+    @staticmethod
+    def _fits(size: int, max_bytes: Optional[int]) -> bool:
+        return max_bytes is None or size <= max_bytes
+
+    def _serialize_table(self, table: Table, max_bytes: Optional[int]) -> str:
+        output = io.StringIO()
+        size = 0
+        if table.header is None:
+            for line in table.rows:
+                line_size = len(line.encode("utf-8"))
+                if not self._fits(size + line_size, max_bytes):
+                    if size == 0:
+                        output.write(_truncate_text(line, max_bytes))
+                    break
+                output.write(line)
+                size += line_size
+            return output.getvalue()
+
+        # The header is always kept, the rows are added while they fit
+        row_buffer = io.StringIO()
+        writer = csv.writer(row_buffer, lineterminator="\n")
+        writer.writerow(table.header)
+        header = row_buffer.getvalue()
+        size = len(header.encode("utf-8"))
+        if not self._fits(size, max_bytes):
+            return _truncate_text(header, max_bytes)
+        output.write(header)
+        for row in table.rows:
+            row_buffer.seek(0)
+            row_buffer.truncate()
+            writer.writerow(row)
+            line = row_buffer.getvalue()
+            line_size = len(line.encode("utf-8"))
+            if not self._fits(size + line_size, max_bytes):
+                break
+            output.write(line)
+            size += line_size
+        return output.getvalue()
+
+    def _serialize_json(self, value: Any, max_bytes: Optional[int]) -> str:
+        if isinstance(value, str) and max_bytes is None:
+            return value
+        text = json.dumps(value)
+        if self._fits(len(text.encode("utf-8")), max_bytes):
+            return text
+        if isinstance(value, list):
+            items = []
+            size = 2
+            for item in value:
+                item_text = json.dumps(item)
+                item_size = len(item_text.encode("utf-8")) + (2 if items else 0)
+                if not self._fits(size + item_size, max_bytes):
+                    break
+                items.append(item_text)
+                size += item_size
+            return "[" + ", ".join(items) + "]"
+        return _truncate_text(text, max_bytes)
+
+
+def _truncate_text(text: str, max_bytes: int) -> str:
+    return text.encode("utf-8")[:max_bytes].decode("utf-8", "ignore")
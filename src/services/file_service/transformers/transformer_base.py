@@ -0,0 +1,34 @@
+from typing import Any
+
+
+class TransformerBase:
+    """
+    Base class of the file transformers, applied by apply_file_transformations
+    to the file content from the query parameters of its URL.
+
+    - queries: The query parameters handled by the transformer, with their type.
+    - description, examples: Instructions added to the LLM prompt.
+    - is_text_transformer, is_binary_transformer: Whether the transformer is
+      applied to text files (CSV, JSON, ...) or to the other files.
+    """
+
+    queries: dict = {}
+    description: str = ""
+    examples: list = []
+    is_text_transformer: bool = True
+    is_binary_transformer: bool = False
+
+    def transform(self, file: bytes, data: Any, transformations: dict, other: dict) -> Any:
+        """
+        Transform the data.
+
+        Parameters:
+        - file (bytes): The original file content.
+        - data: The data returned by the previous transformer, the decoded file at first.
+        - transformations (dict): The query parameters of the URL.
+        - other (dict): The mime_type and name of the file.
+
+        Returns:
+        - The transformed data.
+        """
+        raise NotImplementedError()
@@ -0,0 +1,239 @@
+"""
+Resolution of the file URLs in a text, including the URLs found in the resolved
+contents (for example, report sections that embed images or other sections).
+
+The references form a graph of documents keyed by file name and query. Every
+distinct document is downloaded and transformed once, concurrently on the file
+service pool, and the assembled text is produced as a stream of pieces.
+"""
+
+import json
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Iterator, NamedTuple
+
+from solace_ai_connector.common.log import log
+
+from .file_service_constants import FS_URL_PATTERN, FS_URL_PREFIX
+from .resolved_url_cache import get_cache_key
+
+DEFAULT_MAX_RESOLVED_SIZE = 64 * 1024 * 1024
+
+
+class FileResolutionError(ValueError):
+    """
+    Raised when the file URLs of a text can not be resolved as a whole.
+    """
+
+
+class UrlReference(NamedTuple):
+    start: int
+    end: int
+    raw_url: str
+    filename: str
+    queries: dict
+
+    @property
+    def key(self) -> tuple:
+        return get_cache_key(self.filename, self.queries)
+
+
+class Document(NamedTuple):
+    text: str
+    references: list
+
+
+def get_url_affixes(raw_url: str) -> tuple:
+    """
+    Get the quotes and the trailing comma matched around a URL, that are kept
+    around its resolved content.
+    """
+    prefix = suffix = ""
+    # If initial URl was in quotes, return the response in quotes
+    if raw_url.startswith('"') or raw_url.startswith("'"):
+        prefix = raw_url[0]
+
+    if raw_url.endswith('"') or raw_url.endswith("'"):
+        suffix = raw_url[-1]
+    elif raw_url.endswith("',") or raw_url.endswith('",'):
+        suffix = raw_url[-2:]
+    # If initial URL ends with a comma, return the response with a comma
+    elif raw_url.endswith(","):
+        suffix = ","
+    return prefix, suffix
+
+
+def run_now(function, *args) -> Future:
+    """
+    Run a function in the calling thread and wrap its outcome in a future.
+    """
+    future = Future()
+    try:
+        future.set_result(function(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class UrlResolver:
+    """
+    Resolves the file URLs of a text for a session.
+
+    Only the URLs with the 'resolve' query parameter set to true are resolved,
+    or all the URLs of the top-level text with force_resolve. Cycles between
+    documents and assembled texts larger than max_output_size characters raise
+    a FileResolutionError before anything is produced.
+    """
+
+    def __init__(
+        self,
+        file_service,
+        session_id: str,
+        force_resolve: bool = False,
+        max_output_size: int = DEFAULT_MAX_RESOLVED_SIZE,
+    ):
+        self.file_service = file_service
+        self.session_id = session_id
+        self.force_resolve = force_resolve
+        self.max_output_size = max_output_size
+
+    def resolve(self, text: str) -> str:
+        if not text or FS_URL_PREFIX not in text:
+            return text
+        return "".join(self.iter_resolved(text))
+
+    def iter_resolved(self, text: str) -> Iterator[str]:
+        """
+        Iterate over the pieces of the resolved text.
+        """
+        if not text or FS_URL_PREFIX not in text:
+            if text:
+                yield text
+            return
+
+        root = Document(text, self._scan(text, self.force_resolve))
+        documents = self._fetch_documents(root)
+        self._measure(root, documents, set(), {})
+        yield from self._iter_document(root, documents)
+
+    def _scan(self, text: str, force_resolve: bool) -> list:
+        """
+        Scan a text once for the URLs to resolve.
+        """
+        references = []
+        if FS_URL_PREFIX not in text:
+            return references
+        for match in FS_URL_PATTERN.finditer(text):
+            raw_url = match.group()
+            url = self.file_service._clean_url(raw_url)
+            try:
+                filename, queries = self.file_service.get_parsed_url(url)
+            except Exception as e:
+                log.error(f"Failed to resolve URL: {raw_url} with error: {e}")
+                raise e
+
+            resolvable = queries.get("resolve", False)
+            resolvable = (
+                resolvable
+                if isinstance(resolvable, bool)
+                else resolvable.lower() == "true"
+            )
+            if resolvable or force_resolve:
+                references.append(UrlReference(*match.span(), raw_url, filename, queries))
+        return references
+
+    def _fetch_document(self, reference: UrlReference) -> Document:
+        file_service = self.file_service
+        metadata = file_service.validate_access_permission(
+            reference.filename, self.session_id, return_metadata=True
+        )
+        response = file_service._get_resolved_content(
+            reference.filename, metadata, reference.queries
+        )
+        # Convert type to string
+        if isinstance(response, bytes):
+            response = response.decode("utf-8", "ignore")
+        elif not isinstance(response, str):
+            response = json.dumps(response)
+        return Document(response, self._scan(response, False))
+
+    def _fetch_documents(self, root: Document) -> dict:
+        """
+        Fetch every document reachable from the root, concurrently.
+        Returns the documents, or the exceptions raised fetching them, by key.
+        """
+        documents = {}
+        pending = {}
+
+        def schedule(references):
+            new_references = {}
+            for reference in references:
+                key = reference.key
+                if key not in documents and key not in new_references:
+                    new_references[key] = reference
+            for key, reference in new_references.items():
+                # Nothing else is running, so a single document is fetched in this thread
+                if len(new_references) == 1 and not pending:
+                    future = run_now(self._fetch_document, reference)
+                else:
+                    future = self.file_service._resolve_executor.submit(
+                        self._fetch_document, reference
+                    )
+                documents[key] = None
+                pending[future] = key
+
+        schedule(root.references)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                try:
+                    documents[key] = future.result()
+                except Exception as e:
+                    documents[key] = e
+                    continue
+                schedule(documents[key].references)
+        return documents
+
+    def _measure(self, document: Document, documents: dict, path: set, sizes: dict) -> int:
+        """
+        Get the resolved size of a document, checking for failed documents,
+        cycles and the size limit in text order.
+        """
+        size = len(document.text)
+        for reference in document.references:
+            key = reference.key
+            child = documents[key]
+            if isinstance(child, Exception):
+                # Imported here, the file service module imports this one
+                from .file_service import FileServicePermissionError
+
+                if not isinstance(child, FileServicePermissionError):
+                    log.error(f"Failed to resolve URL: {reference.raw_url} with error: {child}")
+                raise child
+            if key in path:
+                raise FileResolutionError(
+                    f"Circular file reference: {reference.filename} includes itself"
+                )
+            if key not in sizes:
+                path.add(key)
+                sizes[key] = self._measure(child, documents, path, sizes)
+                path.remove(key)
+            prefix, suffix = get_url_affixes(reference.raw_url)
+            size += sizes[key] + len(prefix) + len(suffix) - (reference.end - reference.start)
+            if size > self.max_output_size:
+                raise FileResolutionError(
+                    f"The resolved text exceeds the maximum size of {self.max_output_size} characters"
+                )
+        return size
+
+    def _iter_document(self, document: Document, documents: dict) -> Iterator[str]:
+        position = 0
+        for reference in document.references:
+            prefix, suffix = get_url_affixes(reference.raw_url)
+            yield document.text[position : reference.start] + prefix
+            yield from self._iter_document(documents[reference.key], documents)
+            if suffix:
+                yield suffix
+            position = reference.end
+        if position < len(document.text):
+            yield document.text[position:]
@@ -1,9 +1,13 @@
 from abc import ABC, abstractmethod
 
+from .session_codec import SessionCodec
+
 class BaseHistoryProvider(ABC):
 
     def __init__(self, config=None):
         self.config = config or {}
+        # Serializes (and optionally compresses) the stored session payloads
+        self.codec = SessionCodec(self.config)
     
     @abstractmethod
     def get_all_sessions(self) -> list[str]:
@@ -40,7 +44,39 @@ class BaseHistoryProvider(ABC):
         :param data: The session data to be stored.
         """
         raise NotImplementedError("Method not implemented")
-    
+
+    def store_sessions(self, sessions: dict):
+        """
+        Store multiple sessions. Providers that support batched writes should override it.
+
+        :param sessions: A dictionary of session identifier to session data.
+        """
+        for session_id, data in sessions.items():
+            self.store_session(session_id, data)
+
+    def get_last_active_times(self) -> dict:
+        """
+        Retrieve the last active time of all sessions.
+
+        Providers that can answer this without loading every session should override it.
+
+        :return: A dictionary of session identifier to last active timestamp.
+        """
+        last_active_times = {}
+        for session_id in self.get_all_sessions():
+            session = self.get_session(session_id)
+            if session and session.get("last_active_time") is not None:
+                last_active_times[session_id] = session["last_active_time"]
+        return last_active_times
+
+    def enable_native_expiry(self, time_to_live: float) -> bool:
+        """
+        Let the storage backend expire inactive sessions by itself.
+
+        :param time_to_live: Seconds of inactivity after which a session expires.
+        :return: True if the backend handles expiry, in which case no expiry sweep is needed.
+        """
+        return False
 
     def update_session(self, session_id: str, data: dict):
         """
@@ -1,6 +1,10 @@
-import json
 import os
+import tempfile
 from .base_history_provider import BaseHistoryProvider
+from .file_segment_store import SegmentedSessionStore, DEFAULT_COMPACTION_THRESHOLD
+
+STORAGE_MODE_JSON = "json"
+STORAGE_MODE_SEGMENTED = "segmented"
 
 class FileHistoryProvider(BaseHistoryProvider):
     """
@@ -11,12 +15,22 @@ class FileHistoryProvider(BaseHistoryProvider):
 
         if not self.config.get("path"):
             raise ValueError("Missing required configuration for FileHistoryProvider, Missing 'path' in configs.")
-        
+
         self.path = self.config.get("path")
+        self.storage_mode = self.config.get("storage_mode", STORAGE_MODE_JSON)
+        if self.storage_mode not in (STORAGE_MODE_JSON, STORAGE_MODE_SEGMENTED):
+            raise ValueError(f"Unsupported storage_mode for FileHistoryProvider: {self.storage_mode}")
 
         if not self._exists(self.path):
             os.makedirs(self.path, exist_ok=True)
 
+        self.segment_store = None
+        if self.storage_mode == STORAGE_MODE_SEGMENTED:
+            self.segment_store = SegmentedSessionStore(
+                self.path,
+                self.config.get("compaction_threshold", DEFAULT_COMPACTION_THRESHOLD),
+            )
+
     def _get_key(self, session_id):
         """
         Generate a file path for a session.
@@ -33,9 +47,20 @@ class FileHistoryProvider(BaseHistoryProvider):
         :param session_id: The session identifier.
         :param data: The session data to be stored.
         """
+        if self.segment_store:
+            return self.segment_store.store_session(session_id, data)
+
+        # Write to a temp file and rename it so readers never see a partial file
         file_path = self._get_key(session_id)
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(json.dumps(data))
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.codec.encode_bytes(data))
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if self._exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
     def get_session(self, session_id: str)->dict:
         """
@@ -44,28 +69,46 @@ class FileHistoryProvider(BaseHistoryProvider):
         :param session_id: The session identifier.
         :return: The session metadata as a dictionary.
         """
+        if self.segment_store:
+            return self.segment_store.get_session(session_id)
+
         file_path = self._get_key(session_id)
         if not self._exists(file_path):
             return {}
-        
+
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
+            with open(file_path, "rb") as f:
+                return self.codec.decode_bytes(f.read())
+        except (ValueError, FileNotFoundError):
             return {}
 
     def get_all_sessions(self) -> list[str]:
         """
         Retrieve all session identifiers.
         """
+        if self.segment_store:
+            return self.segment_store.get_all_sessions()
+
         return [f[9:-13] for f in os.listdir(self.path) if f.startswith("sessions_") and f.endswith("_history.json")]
-    
+
+    def get_last_active_times(self) -> dict:
+        """
+        Retrieve the last active time of all sessions.
+        """
+        if self.segment_store:
+            return self.segment_store.get_last_active_times()
+
+        return super().get_last_active_times()
+
     def delete_session(self, session_id: str):
         """
         Delete the session.
 
         :param session_id: The session identifier.
         """
+        if self.segment_store:
+            return self.segment_store.delete_session(session_id)
+
         file_path = self._get_key(session_id)
         if self._exists(file_path):
             os.remove(file_path)
@@ -0,0 +1,307 @@
+"""
+Append-only, lock-protected segment storage used by the file history provider.
+
+Each session is stored as a JSONL segment file. Every write appends a single
+record describing the change since the previous state, and the segment is
+compacted into a single snapshot record (written to a temp file and renamed
+into place) once it grows past the compaction threshold. All access is
+serialised across processes with ``fcntl`` advisory locks.
+
+A small append-only index of ``session_id -> last_active_time`` is kept next
+to the segments so that expiry sweeps do not need to open every session file.
+"""
+
+import copy
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+SEGMENT_PREFIX = "sessions_"
+SEGMENT_SUFFIX = "_history.jsonl"
+INDEX_FILE_NAME = "sessions_index.jsonl"
+
+DEFAULT_COMPACTION_THRESHOLD = 64
+MIN_INDEX_COMPACTION_LINES = 256
+
+
+def _diff(old: dict, new: dict):
+    """
+    Build a patch record that turns ``old`` into ``new``.
+
+    Lists are patched with a splice from the first differing index, so that
+    appending messages or editing the last message only writes the tail.
+    Returns None when a full snapshot is required.
+    """
+    if not old or any(key not in new for key in old):
+        return None
+
+    patch_set = {}
+    patch_splice = {}
+    for key, value in new.items():
+        previous = old.get(key)
+        if key in old and previous == value:
+            continue
+        if isinstance(value, list) and isinstance(previous, list):
+            start = 0
+            limit = min(len(value), len(previous))
+            while start < limit and value[start] == previous[start]:
+                start += 1
+            if start > 0:
+                patch_splice[key] = [start, value[start:]]
+                continue
+        patch_set[key] = value
+
+    record = {"op": "patch"}
+    if patch_set:
+        record["set"] = patch_set
+    if patch_splice:
+        record["splice"] = patch_splice
+    return record
+
+
+def _apply(state: dict, record: dict) -> dict:
+    """
+    Apply a single segment record to the state.
+    """
+    if record.get("op") == "snapshot":
+        return record.get("data") or {}
+    state.update(record.get("set", {}))
+    for key, (start, items) in record.get("splice", {}).items():
+        state[key] = state.get(key, [])[:start] + items
+    return state
+
+
+def _read_records(f, offset: int):
+    """
+    Read all complete records from ``offset``. Lines that fail to parse (e.g. a
+    torn write left behind by a crashed process) are skipped.
+    """
+    f.seek(offset)
+    records = []
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+class _CachedFile:
+    """
+    Parsed state of a file, valid as long as the inode and size are unchanged.
+    """
+
+    __slots__ = ("inode", "size", "state", "records")
+
+    def __init__(self, inode, size, state, records):
+        self.inode = inode
+        self.size = size
+        self.state = state
+        self.records = records
+
+
+class SegmentedSessionStore:
+    """
+    Crash-safe session storage using append-only JSONL segments.
+    """
+
+    def __init__(self, path: str, compaction_threshold: int = DEFAULT_COMPACTION_THRESHOLD):
+        if fcntl is None:
+            raise ImportError(
+                "The segmented file history storage requires the 'fcntl' module, which is not available on this platform."
+            )
+        self.path = path
+        self.compaction_threshold = max(1, int(compaction_threshold))
+        self.index_path = os.path.join(self.path, INDEX_FILE_NAME)
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def _get_key(self, session_id: str) -> str:
+        return os.path.join(self.path, f"{SEGMENT_PREFIX}{session_id}{SEGMENT_SUFFIX}")
+
+    @contextmanager
+    def _locked(self, file_path: str, exclusive: bool):
+        """
+        Open and lock a file. If the file was replaced or removed while waiting
+        for the lock, the lock is retried on the current file.
+
+        Yields None when opening for reading and the file does not exist.
+        """
+        lock_type = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        while True:
+            try:
+                f = open(file_path, "a+" if exclusive else "r", encoding="utf-8", errors="replace")
+            except FileNotFoundError:
+                yield None
+                return
+            fcntl.flock(f.fileno(), lock_type)
+            try:
+                current = os.stat(file_path)
+            except FileNotFoundError:
+                current = None
+            if current is not None and current.st_ino == os.fstat(f.fileno()).st_ino:
+                break
+            # Compacted or deleted by another process while waiting for the lock
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            f.close()
+            if current is None and not exclusive:
+                yield None
+                return
+        try:
+            yield f
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            f.close()
+
+    def _load(self, key: str, f, apply) -> _CachedFile:
+        """
+        Load the state of a locked file, replaying only the records appended
+        since the cached read when the file has not been replaced.
+        """
+        stat = os.fstat(f.fileno())
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached is not None and cached.inode == stat.st_ino and cached.size <= stat.st_size:
+            if cached.size == stat.st_size:
+                return cached
+            state, records, offset = copy.deepcopy(cached.state), cached.records, cached.size
+        else:
+            state, records, offset = {}, 0, 0
+
+        new_records = _read_records(f, offset)
+        for record in new_records:
+            state = apply(state, record)
+        loaded = _CachedFile(stat.st_ino, stat.st_size, state, records + len(new_records))
+        with self._cache_lock:
+            self._cache[key] = loaded
+        return loaded
+
+    def _append(self, key: str, f, loaded: _CachedFile, record: dict, state: dict):
+        """
+        Append a record to a locked file and update the cache.
+        """
+        line = json.dumps(record) + "\n"
+        if loaded.size > 0:
+            # Guard against a torn trailing line left by a crashed writer
+            f.seek(loaded.size - 1)
+            if f.read(1) != "\n":
+                line = "\n" + line
+        f.write(line)
+        f.flush()
+        stat = os.fstat(f.fileno())
+        updated = _CachedFile(stat.st_ino, stat.st_size, state, loaded.records + 1)
+        with self._cache_lock:
+            self._cache[key] = updated
+        return updated
+
+    def _compact(self, file_path: str, records: list, state: dict):
+        """
+        Atomically replace a file with the given records. Must be called while
+        holding the exclusive lock on the current file.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+                for record in records:
+                    tmp.write(json.dumps(record) + "\n")
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        stat = os.stat(file_path)
+        with self._cache_lock:
+            self._cache[file_path] = _CachedFile(stat.st_ino, stat.st_size, state, len(records))
+
+    def store_session(self, session_id: str, data: dict):
+        """
+        Append the changes of the session to its segment.
+        """
+        file_path = self._get_key(session_id)
+        data = copy.deepcopy(data)
+        with self._locked(file_path, exclusive=True) as f:
+            loaded = self._load(file_path, f, _apply)
+            record = _diff(loaded.state, data)
+            if record is None:
+                record = {"op": "snapshot", "data": data}
+            if len(record) > 1:
+                loaded = self._append(file_path, f, loaded, record, data)
+            if loaded.records > self.compaction_threshold:
+                self._compact(file_path, [{"op": "snapshot", "data": data}], data)
+
+        self._update_index(session_id, data.get("last_active_time"))
+
+    def get_session(self, session_id: str) -> dict:
+        """
+        Retrieve the session state by replaying its segment.
+        """
+        file_path = self._get_key(session_id)
+        with self._locked(file_path, exclusive=False) as f:
+            if f is None:
+                return {}
+            return copy.deepcopy(self._load(file_path, f, _apply).state)
+
+    def delete_session(self, session_id: str):
+        """
+        Delete the session segment and remove it from the index.
+        """
+        file_path = self._get_key(session_id)
+        if os.path.exists(file_path):
+            with self._locked(file_path, exclusive=True):
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+        with self._cache_lock:
+            self._cache.pop(file_path, None)
+        self._update_index(session_id, None)
+
+    @staticmethod
+    def _apply_index(state: dict, record: dict) -> dict:
+        if record.get("last_active_time") is None:
+            state.pop(record.get("session_id"), None)
+        else:
+            state[record["session_id"]] = record["last_active_time"]
+        return state
+
+    def _update_index(self, session_id: str, last_active_time):
+        """
+        Append an index entry, compacting the index once it mostly holds
+        superseded entries.
+        """
+        record = {"session_id": session_id, "last_active_time": last_active_time}
+        with self._locked(self.index_path, exclusive=True) as f:
+            loaded = self._load(self.index_path, f, self._apply_index)
+            state = self._apply_index(copy.deepcopy(loaded.state), record)
+            loaded = self._append(self.index_path, f, loaded, record, state)
+            if loaded.records > max(MIN_INDEX_COMPACTION_LINES, 4 * len(state)):
+                self._compact(
+                    self.index_path,
+                    [{"session_id": key, "last_active_time": value} for key, value in state.items()],
+                    state,
+                )
+
+    def get_last_active_times(self) -> dict:
+        """
+        Retrieve the last active time of all sessions from the index.
+        """
+        with self._locked(self.index_path, exclusive=False) as f:
+            if f is None:
+                return {}
+            return dict(self._load(self.index_path, f, self._apply_index).state)
+
+    def get_all_sessions(self) -> list[str]:
+        """
+        Retrieve all session identifiers from the index.
+        """
+        return list(self.get_last_active_times().keys())
@@ -1,10 +1,21 @@
+from ....common.lazy_registry import LazyRegistry
 
 
 class HistoryProviderFactory:
     """
     Factory class for creating history provider instances.
     """
-    HISTORY_PROVIDERS = ["redis", "memory", "file", "mongodb", "sql"]
+    # The provider modules, and their database clients, are imported when selected
+    HISTORY_PROVIDERS = LazyRegistry(
+        {
+            "redis": ".redis_history_provider:RedisHistoryProvider",
+            "memory": ".memory_history_provider:MemoryHistoryProvider",
+            "file": ".file_history_provider:FileHistoryProvider",
+            "mongodb": ".mongodb_history_provider:MongoDBHistoryProvider",
+            "sql": ".sql_history_provider:SQLHistoryProvider",
+        },
+        package=__package__,
+    )
 
     @staticmethod
     def has_provider(class_name):
@@ -20,21 +31,4 @@ class HistoryProviderFactory:
         """
         if class_name not in HistoryProviderFactory.HISTORY_PROVIDERS:
             raise ValueError(f"Unsupported history provider: {class_name}")
-        if class_name == "redis":
-            from .redis_history_provider import RedisHistoryProvider
-            return RedisHistoryProvider
-        elif class_name == "memory":
-            from .memory_history_provider import MemoryHistoryProvider
-            return MemoryHistoryProvider
-        elif class_name == "file":
-            from .file_history_provider import FileHistoryProvider
-            return FileHistoryProvider
-        elif class_name == "mongodb":
-            from .mongodb_history_provider import MongoDBHistoryProvider
-            return MongoDBHistoryProvider
-        elif class_name == "sql":
-            from .sql_history_provider import SQLHistoryProvider
-            return SQLHistoryProvider
-        else:
-            raise ValueError(f"Unsupported history provider: {class_name}")
-
+        return HistoryProviderFactory.HISTORY_PROVIDERS[class_name]
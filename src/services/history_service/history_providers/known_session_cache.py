@@ -0,0 +1,40 @@
+"""
+Bounded cache of the last known state of sessions, used by providers that
+translate full session writes into partial updates.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+
+DEFAULT_KNOWN_SESSION_CACHE_SIZE = 256
+
+
+class KnownSessionCache:
+    """
+    A thread-safe LRU of deep copies of the last read or written session data.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_KNOWN_SESSION_CACHE_SIZE):
+        self.max_size = max_size
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, session_id: str, data: dict):
+        data = copy.deepcopy(data)
+        with self._lock:
+            self._sessions[session_id] = data
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_size:
+                self._sessions.popitem(last=False)
+
+    def forget(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def get(self, session_id: str):
+        """
+        Get the last known state of the session. The returned data must not be modified.
+        """
+        with self._lock:
+            return self._sessions.get(session_id)
@@ -2,32 +2,117 @@
 Memory history provider
 """
 
+import threading
+from collections import OrderedDict
+
+from solace_ai_connector.common.log import log
+
 from .base_history_provider import BaseHistoryProvider
 
 
+def approximate_size(value) -> int:
+    """
+    Cheaply approximate the memory used by a JSON-like value, in bytes.
+    """
+    if isinstance(value, str):
+        return 49 + len(value)
+    if isinstance(value, dict):
+        return 64 + sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return 56 + 8 * len(value) + sum(approximate_size(v) for v in value)
+    return 28
+
+
 class MemoryHistoryProvider(BaseHistoryProvider):
     """
     A history provider that stores history in memory.
+
+    When ``max_memory_bytes`` is set, the least recently used sessions are evicted
+    once the approximate size of all sessions exceeds the budget. Evicted sessions
+    are dropped, or moved to a local directory when ``spill_path`` is set and
+    loaded back transparently on access.
     """
 
     def __init__(self, config=None):
         super().__init__(config)
-        self.history = {}
+        self.history = OrderedDict()
+        self.max_memory_bytes = self.config.get("max_memory_bytes")
+        self.sizes = {}
+        self.resident_bytes = 0
+        self._lock = threading.RLock()
+
+        self.spill_provider = None
+        if self.config.get("spill_path"):
+            from .file_history_provider import FileHistoryProvider
+            self.spill_provider = FileHistoryProvider({"path": self.config.get("spill_path")})
+
+    def _track(self, session_id):
+        """
+        Update the size accounting of a session and evict sessions over the budget.
+        """
+        if not self.max_memory_bytes:
+            return
+        size = approximate_size(self.history[session_id])
+        self.resident_bytes += size - self.sizes.get(session_id, 0)
+        self.sizes[session_id] = size
+        self.history.move_to_end(session_id)
+
+        while self.resident_bytes > self.max_memory_bytes and len(self.history) > 1:
+            evicted_id, evicted = self.history.popitem(last=False)
+            self.resident_bytes -= self.sizes.pop(evicted_id, 0)
+            if self.spill_provider:
+                self.spill_provider.store_session(evicted_id, evicted)
+            else:
+                log.debug("History memory budget exceeded, dropping session %s", evicted_id)
+
+    def _load_spilled(self, session_id):
+        if not self.spill_provider:
+            return None
+        data = self.spill_provider.get_session(session_id)
+        if not data:
+            return None
+        self.spill_provider.delete_session(session_id)
+        self.history[session_id] = data
+        self._track(session_id)
+        return data
 
     def store_session(self, session_id, data):
-        if session_id not in self.history:
-            self.history[session_id] = {}
-        
-        self.history[session_id].update(data)
+        with self._lock:
+            if session_id not in self.history:
+                self.history[session_id] = self._load_spilled(session_id) or {}
+
+            self.history[session_id].update(data)
+            self._track(session_id)
 
     def get_session(self, session_id):
-        if session_id not in self.history:
-            return {}
-        return self.history[session_id]
+        with self._lock:
+            if session_id not in self.history:
+                return self._load_spilled(session_id) or {}
+            if self.max_memory_bytes:
+                self.history.move_to_end(session_id)
+            return self.history[session_id]
 
     def get_all_sessions(self) -> list[str]:
-        return list(self.history.keys())
+        with self._lock:
+            sessions = list(self.history.keys())
+        if self.spill_provider:
+            sessions.extend(s for s in self.spill_provider.get_all_sessions() if s not in sessions)
+        return sessions
+
+    def get_last_active_times(self) -> dict:
+        last_active_times = {}
+        if self.spill_provider:
+            last_active_times.update(self.spill_provider.get_last_active_times())
+        with self._lock:
+            for session_id, session in self.history.items():
+                if session.get("last_active_time") is not None:
+                    last_active_times[session_id] = session["last_active_time"]
+        return last_active_times
 
     def delete_session(self, session_id):
-        if session_id in self.history:
-            del self.history[session_id]
\ No newline at end of file
+        with self._lock:
+            if session_id in self.history:
+                del self.history[session_id]
+                self.resident_bytes -= self.sizes.pop(session_id, 0)
+        if self.spill_provider:
+            self.spill_provider.delete_session(session_id)
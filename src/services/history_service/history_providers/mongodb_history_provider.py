@@ -1,11 +1,23 @@
 """
 MongoDB-based history provider for storing session data.
 """
+from datetime import datetime, timezone
+
+from solace_ai_connector.common.log import log
+
 from .base_history_provider import BaseHistoryProvider
+from .known_session_cache import KnownSessionCache, DEFAULT_KNOWN_SESSION_CACHE_SIZE
+
+TTL_INDEX_FIELD = "last_active_time"
 
 class MongoDBHistoryProvider(BaseHistoryProvider):
     """
     A MongoDB-based history provider for storing session data.
+
+    Writes are translated into a single atomic update of the changed fields
+    ($push/$slice for messages, $inc for counters, $set for the rest) whenever the
+    last known state of the session allows it. Expiry is delegated to a TTL index
+    on the top-level ``last_active_time`` date.
     """
     def __init__(self, config=None):
         super().__init__(config)
@@ -14,15 +26,19 @@ class MongoDBHistoryProvider(BaseHistoryProvider):
             from pymongo import MongoClient
         except ImportError:
             raise ImportError("Please install the pymongo package to use the MongoDBHistoryProvider.\n\t$ pip install pymongo")
-        
+
         if not self.config.get("mongodb_uri"):
             raise ValueError("Missing required configuration for MongoDBHistoryProvider, Missing 'mongodb_uri' in 'store_config'.")
-        
-        
+
+
         self.client = MongoClient(self.config.get("mongodb_uri"))
         self.db = self.client[self.config.get("mongodb_db", "history_db")]
         self.collection = self.db[self.config.get("mongodb_collection", "sessions")]
-    
+        self.use_ttl_index = self.config.get("ttl_index", True)
+        self.known_sessions = KnownSessionCache(
+            self.config.get("partial_update_cache_size", DEFAULT_KNOWN_SESSION_CACHE_SIZE)
+        )
+
     def _get_key(self, session_id):
         """
         Generate a document identifier for a session.
@@ -31,7 +47,117 @@ class MongoDBHistoryProvider(BaseHistoryProvider):
         :return: The session ID as the primary key.
         """
         return {"_id": session_id}
-    
+
+    def enable_native_expiry(self, time_to_live: float) -> bool:
+        """
+        Create (or update) the TTL index so MongoDB removes inactive sessions.
+        """
+        if not self.use_ttl_index:
+            return False
+
+        from pymongo.errors import OperationFailure
+
+        try:
+            self.collection.create_index(TTL_INDEX_FIELD, expireAfterSeconds=int(time_to_live))
+        except OperationFailure:
+            # The index already exists with a different expiry
+            self.db.command(
+                "collMod",
+                self.collection.name,
+                index={"keyPattern": {TTL_INDEX_FIELD: 1}, "expireAfterSeconds": int(time_to_live)},
+            )
+        self._backfill_ttl_field()
+        return True
+
+    def _backfill_ttl_field(self):
+        """
+        Set the TTL field of the documents stored before it existed, which only
+        have data.last_active_time, so that the index expires them too.
+        Compressed documents, whose time can not be read, expire from now.
+        """
+        missing = {TTL_INDEX_FIELD: {"$exists": False}}
+        count = 0
+        for document in self.collection.find(
+            {**missing, "data.last_active_time": {"$type": "number"}}, {"data.last_active_time": 1}
+        ):
+            last_active_date = self._get_last_active_date(document["data"])
+            # Not if the session was stored in the meantime
+            result = self.collection.update_one(
+                {"_id": document["_id"], **missing}, {"$set": {TTL_INDEX_FIELD: last_active_date}}
+            )
+            count += result.modified_count
+        result = self.collection.update_many(missing, {"$set": {TTL_INDEX_FIELD: datetime.now(timezone.utc)}})
+        count += result.modified_count
+        if count:
+            log.info("Set the %s of %d sessions stored before the TTL index", TTL_INDEX_FIELD, count)
+
+    def _get_last_active_date(self, data: dict) -> datetime:
+        timestamp = data.get("last_active_time")
+        if timestamp is None:
+            return datetime.now(timezone.utc)
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+    @staticmethod
+    def _get_history_push(old_history: list, new_history: list):
+        """
+        Find the $push (with optional $slice) that turns the old history into the new one.
+
+        :return: The $push modifier or None if the change is not an append/truncate.
+        """
+        length = len(new_history)
+        for appended in range(length + 1):
+            kept = length - appended
+            if kept > len(old_history) or (kept == 0 and old_history):
+                continue
+            if kept == 0 or old_history[len(old_history) - kept:] == new_history[:kept]:
+                push = {"$each": new_history[kept:]}
+                if length < len(old_history) + appended:
+                    push["$slice"] = -length
+                return push
+        return None
+
+    def _get_partial_update(self, session_id: str, data: dict):
+        """
+        Build an atomic update from the last known state of the session.
+
+        :return: The filter and update documents, or None if the document must be replaced.
+        """
+        previous = self.known_sessions.get(session_id)
+        if not previous or any(key not in data for key in previous):
+            return None
+        if any("." in key or key.startswith("$") for key in data):
+            return None
+        if self.codec.should_compress(data):
+            # Grew past the compression threshold, compress the whole document
+            return None
+
+        old_history = previous.get("history")
+        new_history = data.get("history")
+        if not isinstance(old_history, list) or not isinstance(new_history, list):
+            return None
+
+        update = {"$set": {TTL_INDEX_FIELD: self._get_last_active_date(data)}}
+        if new_history != old_history:
+            if len(new_history) == len(old_history) and new_history[:-1] == old_history[:-1]:
+                update["$set"][f"data.history.{len(new_history) - 1}"] = new_history[-1]
+            else:
+                push = self._get_history_push(old_history, new_history)
+                if push is None:
+                    return None
+                update["$push"] = {"data.history": push}
+
+        for key, value in data.items():
+            if key == "history" or (key in previous and previous[key] == value):
+                continue
+            old_value = previous.get(key)
+            if type(value) is int and type(old_value) is int:
+                update.setdefault("$inc", {})[f"data.{key}"] = value - old_value
+            else:
+                update["$set"][f"data.{key}"] = value
+
+        # Only apply if nobody else changed the history since it was last seen
+        return {"_id": session_id, "data.history": {"$size": len(old_history)}}, update
+
     def store_session(self, session_id: str, data: dict):
         """
         Store the session metadata.
@@ -39,8 +165,26 @@ class MongoDBHistoryProvider(BaseHistoryProvider):
         :param session_id: The session identifier.
         :param data: The session data to be stored.
         """
-        self.collection.update_one(self._get_key(session_id), {"$set": {"data": data}}, upsert=True)
-    
+        partial_update = self._get_partial_update(session_id, data)
+        if partial_update:
+            result = self.collection.update_one(*partial_update)
+            if result.matched_count == 1:
+                self.known_sessions.remember(session_id, data)
+                return
+            log.debug("Session %s changed concurrently, replacing the document", session_id)
+
+        document = self.codec.encode_document(data, binary=True)
+        self.collection.update_one(
+            self._get_key(session_id),
+            {"$set": {"data": document, TTL_INDEX_FIELD: self._get_last_active_date(data)}},
+            upsert=True,
+        )
+        if document is data:
+            self.known_sessions.remember(session_id, data)
+        else:
+            # Compressed documents can not be partially updated
+            self.known_sessions.forget(session_id)
+
     def get_session(self, session_id: str)->dict:
         """
         Retrieve the session.
@@ -48,15 +192,33 @@ class MongoDBHistoryProvider(BaseHistoryProvider):
         :param session_id: The session identifier.
         :return: The session metadata as a dictionary.
         """
-        document = self.collection.find_one(self._get_key(session_id))
-        return document.get("data") if document else {}
-    
+        document = self.collection.find_one(self._get_key(session_id), {"data": 1})
+        if not document or not document.get("data"):
+            self.known_sessions.forget(session_id)
+            return {}
+        if self.codec.is_encoded(document["data"]):
+            self.known_sessions.forget(session_id)
+            return self.codec.decode_document(document["data"])
+        self.known_sessions.remember(session_id, document["data"])
+        return document["data"]
+
     def get_all_sessions(self) -> list[str]:
         """
         Retrieve all session identifiers.
         """
         return [doc["_id"] for doc in self.collection.find({}, {"_id": 1})]
-    
+
+    def get_last_active_times(self) -> dict:
+        """
+        Retrieve the last active time of all sessions without loading the session data.
+        """
+        last_active_times = {}
+        for doc in self.collection.find({}, {"data.last_active_time": 1}):
+            last_active_time = doc.get("data", {}).get("last_active_time")
+            if last_active_time is not None:
+                last_active_times[doc["_id"]] = last_active_time
+        return last_active_times
+
     def delete_session(self, session_id: str):
         """
         Delete the session.
@@ -64,3 +226,4 @@ class MongoDBHistoryProvider(BaseHistoryProvider):
         :param session_id: The session identifier.
         """
         self.collection.delete_one(self._get_key(session_id))
+        self.known_sessions.forget(session_id)
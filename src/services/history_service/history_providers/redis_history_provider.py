@@ -1,7 +1,6 @@
 """
 A history provider that stores history in Redis.
 """
-import json
 from .base_history_provider import BaseHistoryProvider
 
 class RedisHistoryProvider(BaseHistoryProvider):
@@ -19,7 +18,7 @@ class RedisHistoryProvider(BaseHistoryProvider):
             host=self.config.get("redis_host", "localhost"),
             port=self.config.get("redis_port", 6379),
             db=self.config.get("redis_db", 0),
-            decode_responses=True  # Ensures string output
+            decode_responses=False  # Payloads may be compressed bytes
         )
     
     def _get_key(self, session_id):
@@ -38,7 +37,7 @@ class RedisHistoryProvider(BaseHistoryProvider):
         :param session_id: The session identifier.
         :param data: The session data to be stored.
         """
-        self.redis_client.set(self._get_key(session_id), json.dumps(data))
+        self.redis_client.set(self._get_key(session_id), self.codec.encode_bytes(data))
 
     def get_session(self, session_id: str)->dict:
         """
@@ -48,14 +47,14 @@ class RedisHistoryProvider(BaseHistoryProvider):
         :return: The session metadata as a dictionary.
         """
         data = self.redis_client.get(self._get_key(session_id))
-        return json.loads(data) if data else {}
+        return self.codec.decode_bytes(data) if data else {}
 
     def get_all_sessions(self) -> list[str]:
         """
         Retrieve all session identifiers.
         """
         keys = self.redis_client.keys("sessions:*:history")
-        return [key.split(":")[1] for key in keys]
+        return [key.decode("utf-8").split(":")[1] for key in keys]
     
     def delete_session(self, session_id: str):
         """
@@ -0,0 +1,155 @@
+"""
+Optional compression of stored session payloads, shared by the history providers.
+
+Compressed byte payloads start with a small header (magic, format version and
+algorithm), so payloads written before compression was enabled, or below the
+size threshold, are stored as plain JSON and still load. Providers that store
+documents (SQL, MongoDB) wrap the compressed payload in an envelope that keeps
+``last_active_time`` readable for expiry checks.
+"""
+
+import base64
+import json
+import zlib
+
+DEFAULT_COMPRESSION_THRESHOLD = 4096
+
+CODEC_MAGIC = b"SAMC"
+CODEC_VERSION = 1
+ENVELOPE_KEY = "__sam_codec__"
+
+ALGORITHM_IDS = {"zlib": 1, "zstd": 2}
+ALGORITHM_NAMES = {value: key for key, value in ALGORITHM_IDS.items()}
+
+
+def _get_zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Please install the zstandard package to use zstd compression for history.\n\t$ pip install zstandard")
+    return zstandard
+
+
+class SessionCodec:
+    """
+    Serializes session data, compressing it when it is larger than the threshold.
+
+    Decoding always accepts plain JSON and any supported algorithm, regardless of
+    the configured compression.
+    """
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.algorithm = config.get("compression") or None
+        self.threshold = config.get("compression_threshold", DEFAULT_COMPRESSION_THRESHOLD)
+        self.level = config.get("compression_level")
+        if self.algorithm and self.algorithm not in ALGORITHM_IDS:
+            raise ValueError(
+                f"Unsupported history compression: {self.algorithm}. Supported values are {', '.join(ALGORITHM_IDS)}."
+            )
+        if self.algorithm == "zstd":
+            zstandard = _get_zstd()
+            self._zstd_compressor = zstandard.ZstdCompressor(level=self.level or 3)
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.algorithm == "zlib":
+            return zlib.compress(raw, 6 if self.level is None else self.level)
+        return self._zstd_compressor.compress(raw)
+
+    @staticmethod
+    def _decompress(algorithm: str, payload: bytes) -> bytes:
+        if algorithm == "zlib":
+            return zlib.decompress(payload)
+        if algorithm == "zstd":
+            return _get_zstd().ZstdDecompressor().decompress(payload)
+        raise ValueError(f"Unsupported history compression: {algorithm}")
+
+    def _should_compress(self, raw: bytes) -> bool:
+        return bool(self.algorithm) and len(raw) >= self.threshold
+
+    def should_compress(self, data: dict) -> bool:
+        """
+        Whether the session is large enough to be stored compressed. Providers that
+        partially update uncompressed sessions check it to write them whole once
+        they cross the threshold.
+        """
+        return bool(self.algorithm) and self._should_compress(json.dumps(data).encode("utf-8"))
+
+    def encode_bytes(self, data: dict) -> bytes:
+        """
+        Encode the session for byte/string stores (files, Redis).
+        """
+        raw = json.dumps(data).encode("utf-8")
+        if not self._should_compress(raw):
+            return raw
+        header = CODEC_MAGIC + bytes([CODEC_VERSION, ALGORITHM_IDS[self.algorithm]])
+        return header + self._compress(raw)
+
+    def decode_bytes(self, payload) -> dict:
+        """
+        Decode a payload produced by encode_bytes, or plain JSON.
+        """
+        if isinstance(payload, str):
+            return json.loads(payload)
+        if payload[:len(CODEC_MAGIC)] == CODEC_MAGIC:
+            version = payload[len(CODEC_MAGIC)]
+            if version != CODEC_VERSION:
+                raise ValueError(f"Unsupported history payload version: {version}")
+            algorithm = ALGORITHM_NAMES.get(payload[len(CODEC_MAGIC) + 1])
+            payload = self._decompress(algorithm, payload[len(CODEC_MAGIC) + 2:])
+        return json.loads(payload)
+
+    def _envelope(self, raw: bytes, data: dict, binary: bool) -> dict:
+        payload = self._compress(raw)
+        return {
+            ENVELOPE_KEY: {
+                "version": CODEC_VERSION,
+                "algorithm": self.algorithm,
+                "payload": payload if binary else base64.b64encode(payload).decode("ascii"),
+            },
+            "last_active_time": data.get("last_active_time"),
+        }
+
+    def encode_document(self, data: dict, binary: bool = False) -> dict:
+        """
+        Encode the session for document stores. Returns the data itself when it is
+        not compressed.
+
+        :param binary: Keep the compressed payload as bytes instead of base64 text.
+        """
+        if not self.algorithm:
+            return data
+        raw = json.dumps(data).encode("utf-8")
+        if not self._should_compress(raw):
+            return data
+        return self._envelope(raw, data, binary)
+
+    def encode_json(self, data: dict) -> str:
+        """
+        Encode the session as JSON text for document columns (SQL).
+        """
+        text = json.dumps(data)
+        if not self.algorithm:
+            return text
+        raw = text.encode("utf-8")
+        if not self._should_compress(raw):
+            return text
+        return json.dumps(self._envelope(raw, data, binary=False))
+
+    def decode_document(self, document: dict) -> dict:
+        """
+        Decode a document produced by encode_document, or plain session data.
+        """
+        if not self.is_encoded(document):
+            return document
+        envelope = document[ENVELOPE_KEY]
+        if envelope.get("version") != CODEC_VERSION:
+            raise ValueError(f"Unsupported history payload version: {envelope.get('version')}")
+        payload = envelope["payload"]
+        if isinstance(payload, str):
+            payload = base64.b64decode(payload)
+        return json.loads(self._decompress(envelope["algorithm"], bytes(payload)))
+
+    @staticmethod
+    def is_encoded(document) -> bool:
+        return isinstance(document, dict) and ENVELOPE_KEY in document
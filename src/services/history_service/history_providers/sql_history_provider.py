@@ -1,121 +1,340 @@
 import json
+import re
 
 from .base_history_provider import BaseHistoryProvider
-from ....common.postgres_database import PostgreSQLDatabase
-from ....common.mysql_database import MySQLDatabase
-from ....common.mssql_database import MSSQLDatabase
+from .session_codec import ENVELOPE_KEY
+from .known_session_cache import KnownSessionCache, DEFAULT_KNOWN_SESSION_CACHE_SIZE
+from ....common.sql_connection_pool import get_connection_pool, DEFAULT_POOL_SIZE, DEFAULT_POOL_TIMEOUT
+
+# SQL statements per database type. Postgres statements are server-side prepared,
+# so they use positional ($n) parameters.
+STATEMENTS = {
+    "postgres": {
+        "create": """
+            CREATE TABLE IF NOT EXISTS {table} (
+                session_id TEXT PRIMARY KEY,
+                data JSONB
+            )
+            """,
+        "upsert": """
+            INSERT INTO {table} (session_id, data)
+            VALUES ($1, $2)
+            ON CONFLICT (session_id) DO UPDATE
+            SET data = EXCLUDED.data
+            """,
+        "select": "SELECT data FROM {table} WHERE session_id = $1",
+        "select_all": "SELECT session_id FROM {table}",
+        "select_last_active": "SELECT session_id, (data::jsonb ->> 'last_active_time')::float FROM {table}",
+        "delete": "DELETE FROM {table} WHERE session_id = $1",
+        # Partial updates: merge the changed keys and append to the history array,
+        # guarded by the history length the change was computed against.
+        "append_history": """
+            UPDATE {table}
+            SET data = jsonb_set(data::jsonb || $1::jsonb, '{{history}}', (data::jsonb -> 'history') || $2::jsonb)
+            WHERE session_id = $3 AND jsonb_array_length(data::jsonb -> 'history') = $4::int
+            """,
+        "replace_last_history": """
+            UPDATE {table}
+            SET data = jsonb_set(data::jsonb || $1::jsonb, '{{history}}', ((data::jsonb -> 'history') - ($4::int - 1)) || $2::jsonb)
+            WHERE session_id = $3 AND jsonb_array_length(data::jsonb -> 'history') = $4::int
+            """,
+        "begin": "BEGIN",
+    },
+    "mysql": {
+        "create": """
+            CREATE TABLE IF NOT EXISTS {table} (
+                session_id VARCHAR(255) PRIMARY KEY,
+                data JSON
+            )
+            """,
+        "upsert": """
+            INSERT INTO {table} (session_id, data)
+            VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE data = VALUES(data)
+            """,
+        "select": "SELECT data FROM {table} WHERE session_id = %s",
+        "select_all": "SELECT session_id FROM {table}",
+        "select_last_active": "SELECT session_id, JSON_EXTRACT(data, '$.last_active_time') FROM {table}",
+        "delete": "DELETE FROM {table} WHERE session_id = %s",
+        "begin": "START TRANSACTION",
+    },
+    "mssql": {
+        # MSSQL uses NVARCHAR(MAX) for JSON and requires different syntax
+        "create": """
+            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{table}' AND xtype='U')
+            CREATE TABLE {table} (
+                session_id NVARCHAR(255) PRIMARY KEY,
+                data NVARCHAR(MAX)
+            )
+            """,
+        "upsert": """
+            MERGE {table} AS target
+            USING (SELECT ? AS session_id, ? AS data) AS source
+            ON target.session_id = source.session_id
+            WHEN MATCHED THEN
+                UPDATE SET data = source.data
+            WHEN NOT MATCHED THEN
+                INSERT (session_id, data) VALUES (source.session_id, source.data);
+            """,
+        "select": "SELECT data FROM {table} WHERE session_id = ?",
+        "select_all": "SELECT session_id FROM {table}",
+        "select_last_active": "SELECT session_id, CAST(JSON_VALUE(data, '$.last_active_time') AS FLOAT) FROM {table}",
+        "delete": "DELETE FROM {table} WHERE session_id = ?",
+        "begin": "BEGIN TRANSACTION",
+    },
+    "sqlite": {
+        "create": """
+            CREATE TABLE IF NOT EXISTS {table} (
+                session_id TEXT PRIMARY KEY,
+                data TEXT
+            )
+            """,
+        "upsert": """
+            INSERT INTO {table} (session_id, data)
+            VALUES (?, ?)
+            ON CONFLICT (session_id) DO UPDATE
+            SET data = excluded.data
+            """,
+        "select": "SELECT data FROM {table} WHERE session_id = ?",
+        "select_all": "SELECT session_id FROM {table}",
+        "select_last_active": "SELECT session_id, json_extract(data, '$.last_active_time') FROM {table}",
+        "delete": "DELETE FROM {table} WHERE session_id = ?",
+        "begin": "BEGIN",
+    },
+}
 
 
 class DatabaseFactory:
     """
     Factory class to create database instances.
     """
-    DATABASE_PROVIDERS = {
-        "postgres": PostgreSQLDatabase,
-        "mysql": MySQLDatabase,
-        "mssql": MSSQLDatabase,
-    }
+    DATABASE_PROVIDERS = ["postgres", "mysql", "mssql", "sqlite"]
 
     @staticmethod
-    def get_database(db_type, **kwargs):
-        if db_type not in DatabaseFactory.DATABASE_PROVIDERS:
+    def get_database_class(db_type):
+        """
+        Get the database class, importing the driver only when it is used.
+        """
+        if db_type == "postgres":
+            from ....common.postgres_database import PostgreSQLDatabase
+            return PostgreSQLDatabase
+        elif db_type == "mysql":
+            from ....common.mysql_database import MySQLDatabase
+            return MySQLDatabase
+        elif db_type == "mssql":
+            from ....common.mssql_database import MSSQLDatabase
+            return MSSQLDatabase
+        elif db_type == "sqlite":
+            from ....common.sqlite_database import SQLiteDatabase
+            return SQLiteDatabase
+        else:
             raise ValueError(f"Unsupported database type: {db_type}")
-        return DatabaseFactory.DATABASE_PROVIDERS[db_type](**kwargs)
+
+    @staticmethod
+    def get_database(db_type, **kwargs):
+        return DatabaseFactory.get_database_class(db_type)(**kwargs)
+
 
 class SQLHistoryProvider(BaseHistoryProvider):
     """
     A history provider that stores session history in a SQL database.
+
+    Connections are taken from a process-wide pool shared by all providers using
+    the same database. On Postgres, statements are prepared once per connection and
+    new messages are appended to the stored JSONB document instead of rewriting it.
     """
     def __init__(self, config=None):
         super().__init__(config)
         self.db_type = self.config.get("db_type", "postgres")
         self.table_name = self.config.get("table_name", "session_history")
-        self.db = DatabaseFactory.get_database(
-            self.db_type,
-            host=self.config.get("sql_host"),
-            user=self.config.get("sql_user"),
-            password=self.config.get("sql_password"),
-            database=self.config.get("sql_database"),
+        if self.db_type not in STATEMENTS:
+            raise ValueError(f"Unsupported database type: {self.db_type}")
+
+        db_config = {
+            "host": self.config.get("sql_host"),
+            "user": self.config.get("sql_user"),
+            "password": self.config.get("sql_password"),
+            "database": self.config.get("sql_database"),
+        }
+        database_class = DatabaseFactory.get_database_class(self.db_type)
+        self.pool = get_connection_pool(
+            (self.db_type, db_config["host"], db_config["user"], db_config["database"]),
+            lambda: database_class(**db_config),
+            self.config.get("pool_size", DEFAULT_POOL_SIZE),
+            self.config.get("pool_timeout", DEFAULT_POOL_TIMEOUT),
         )
+
+        self.statements = {
+            name: query.format(table=self.table_name)
+            for name, query in STATEMENTS[self.db_type].items()
+        }
+        self._statement_prefix = "sam_" + re.sub(r"\W", "_", self.table_name) + "_"
+
+        # Last known state of recently used sessions, to compute partial updates
+        self.partial_updates = self.db_type == "postgres" and self.config.get("partial_updates", True)
+        self.known_sessions = KnownSessionCache(
+            self.config.get("partial_update_cache_size", DEFAULT_KNOWN_SESSION_CACHE_SIZE)
+        )
+
         self._ensure_table_exists()
-    
+
     def _ensure_table_exists(self):
         """
         Ensures the required table exists in the database.
         """
-        if self.db_type == "mssql":
-            # MSSQL uses NVARCHAR(MAX) for JSON and requires different syntax
-            query = f"""
-            IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{self.table_name}' AND xtype='U')
-            CREATE TABLE {self.table_name} (
-                session_id NVARCHAR(255) PRIMARY KEY,
-                data NVARCHAR(MAX)
-            )
-            """
+        with self.pool.connection() as db:
+            db.cursor().execute(self.statements["create"])
+
+    def _prepare(self, db, cursor, name: str, num_params: int) -> str:
+        """
+        Return the query to run a statement. On Postgres, the statement is
+        prepared once per connection and executed by name.
+        """
+        if self.db_type != "postgres":
+            return self.statements[name]
+
+        prepared = getattr(db, "_prepared_statements", None)
+        if prepared is None or prepared[0] is not db.connection:
+            # New or reconnected connection
+            prepared = (db.connection, set())
+            db._prepared_statements = prepared
+
+        statement_name = self._statement_prefix + name
+        # Keyed by the full name, providers of other tables share the connections
+        if statement_name not in prepared[1]:
+            cursor.execute(f"PREPARE {statement_name} AS {self.statements[name]}")
+            prepared[1].add(statement_name)
+        if not num_params:
+            return f"EXECUTE {statement_name}"
+        return f"EXECUTE {statement_name} ({', '.join(['%s'] * num_params)})"
+
+    def _execute(self, db, name: str, params: tuple = ()):
+        cursor = db.cursor()
+        cursor.execute(self._prepare(db, cursor, name, len(params)), params)
+        return cursor
+
+    def _remember(self, session_id: str, data: dict):
+        if self.partial_updates:
+            self.known_sessions.remember(session_id, data)
+
+    def _forget(self, session_id: str):
+        self.known_sessions.forget(session_id)
+
+    def _get_partial_update(self, session_id: str, data: dict):
+        """
+        Build a partial update from the last known state of the session.
+
+        :return: The statement name and parameters, or None if a full write is required.
+        """
+        previous = self.known_sessions.get(session_id)
+        if not previous or any(key not in data for key in previous):
+            return None
+
+        old_history = previous.get("history")
+        new_history = data.get("history")
+        if not isinstance(old_history, list) or not isinstance(new_history, list):
+            return None
+        if self.codec.should_compress(data):
+            # Grew past the compression threshold, compress the whole document
+            return None
+
+        length = len(old_history)
+        if len(new_history) >= length and new_history[:length] == old_history:
+            statement, items = "append_history", new_history[length:]
+        elif length and len(new_history) >= length and new_history[:length - 1] == old_history[:length - 1]:
+            statement, items = "replace_last_history", new_history[length - 1:]
         else:
-            query = f"""
-            CREATE TABLE IF NOT EXISTS {self.table_name} (
-                session_id TEXT PRIMARY KEY,
-                data JSON
-            )
-            """
-        self.db.execute(query)
-    
+            return None
+
+        changed = {
+            key: value
+            for key, value in data.items()
+            if key != "history" and (key not in previous or previous[key] != value)
+        }
+        return statement, (json.dumps(changed), json.dumps(items), session_id, length)
+
     def store_session(self, session_id: str, data: dict):
         """
         Store or update session metadata.
         """
-        if self.db_type == "postgres":
-            query = f"""
-            INSERT INTO {self.table_name} (session_id, data) 
-            VALUES (%s, %s) 
-            ON CONFLICT (session_id) DO UPDATE 
-            SET data = EXCLUDED.data
-            """
-        elif self.db_type == "mysql":
-            query = f"""
-            INSERT INTO {self.table_name} (session_id, data) 
-            VALUES (%s, %s) 
-            ON DUPLICATE KEY UPDATE data = VALUES(data)
-            """
-        elif self.db_type == "mssql":
-            query = f"""
-            MERGE {self.table_name} AS target
-            USING (SELECT %s AS session_id, %s AS data) AS source
-            ON target.session_id = source.session_id
-            WHEN MATCHED THEN
-                UPDATE SET data = source.data
-            WHEN NOT MATCHED THEN
-                INSERT (session_id, data) VALUES (source.session_id, source.data);
-            """
+        partial_update = self._get_partial_update(session_id, data) if self.partial_updates else None
+        with self.pool.connection() as db:
+            if partial_update:
+                cursor = self._execute(db, *partial_update)
+                if cursor.rowcount == 1:
+                    self._remember(session_id, data)
+                    return
+            payload = self.codec.encode_json(data)
+            self._execute(db, "upsert", (session_id, payload))
+        if payload.startswith('{"' + ENVELOPE_KEY):
+            # Compressed documents can not be partially updated
+            self._forget(session_id)
         else:
-            raise ValueError(f"Unsupported database type: {self.db_type}")
-            
-        self.db.execute(query, (session_id, json.dumps(data)))
-    
+            self._remember(session_id, data)
+
+    def store_sessions(self, sessions: dict):
+        """
+        Store multiple sessions in a single transaction.
+
+        :param sessions: A dictionary of session identifier to session data.
+        """
+        if not sessions:
+            return
+        rows = [(session_id, self.codec.encode_json(data)) for session_id, data in sessions.items()]
+        with self.pool.connection() as db:
+            cursor = db.cursor()
+            cursor.execute(self.statements["begin"])
+            try:
+                cursor.executemany(self._prepare(db, cursor, "upsert", 2), rows)
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        for session_id in sessions:
+            self._forget(session_id)
+
+    def _parse_data(self, value) -> dict:
+        if isinstance(value, dict):
+            return value
+        if isinstance(value, (bytes, bytearray)):
+            value = value.decode("utf-8")
+        return json.loads(value)
+
     def get_session(self, session_id: str) -> dict:
         """
         Retrieve a session by ID.
         """
-        query = f"SELECT data FROM {self.table_name} WHERE session_id = %s"
-        cursor = self.db.execute(query, (session_id,))
-        row = cursor.fetchone()
-        if not row or not row.get("data"):
+        with self.pool.connection() as db:
+            row = self._execute(db, "select", (session_id,)).fetchone()
+        if not row or not row[0]:
+            self._forget(session_id)
             return {}
-        data = row["data"] if isinstance(row["data"], dict) else json.loads(row["data"])
-        return data
-    
+        document = self._parse_data(row[0])
+        if self.codec.is_encoded(document):
+            self._forget(session_id)
+            return self.codec.decode_document(document)
+        self._remember(session_id, document)
+        return document
+
     def get_all_sessions(self) -> list[str]:
         """
         Retrieve all session identifiers.
         """
-        query = f"SELECT session_id FROM {self.table_name}"
-        cursor = self.db.execute(query)
-        return [row["session_id"] for row in cursor.fetchall()]
-    
+        with self.pool.connection() as db:
+            return [row[0] for row in self._execute(db, "select_all").fetchall()]
+
+    def get_last_active_times(self) -> dict:
+        """
+        Retrieve the last active time of all sessions in a single query.
+        """
+        with self.pool.connection() as db:
+            rows = self._execute(db, "select_last_active").fetchall()
+        return {row[0]: float(row[1]) for row in rows if row[1] is not None}
+
     def delete_session(self, session_id: str):
         """
         Delete a session by ID. Since session_id is a PRIMARY KEY, only one row will be deleted.
         """
-        query = f"DELETE FROM {self.table_name} WHERE session_id = %s"
-        self.db.execute(query, (session_id,))
+        with self.pool.connection() as db:
+            self._execute(db, "delete", (session_id,))
+        self._forget(session_id)
@@ -1,7 +1,7 @@
 import time
 import importlib
 import threading
-from typing import Union, Tuple
+from typing import TYPE_CHECKING, Union, Tuple
 
 from solace_ai_connector.common.log import log
 
@@ -10,7 +10,9 @@ from ...common.constants import HISTORY_MEMORY_ROLE, HISTORY_ACTION_ROLE, HISTOR
 from ..common import AutoExpiry, AutoExpirySingletonMeta
 from .history_providers.index import HistoryProviderFactory
 from .history_providers.base_history_provider import BaseHistoryProvider
-from .long_term_memory.long_term_memory import LongTermMemory
+
+if TYPE_CHECKING:
+    from .long_term_memory.long_term_memory import LongTermMemory
 
 DEFAULT_PROVIDER = "memory"
 
@@ -29,7 +31,7 @@ DEFAULT_HISTORY_POLICY = {
 class HistoryService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
     history_provider: BaseHistoryProvider
     long_term_memory_store: BaseHistoryProvider
-    long_term_memory_service: LongTermMemory
+    long_term_memory_service: "LongTermMemory"
 
     def __init__(self, config={}, identifier=None):
         """
@@ -59,6 +61,9 @@ class HistoryService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
             self.long_term_memory_config = self.config.get("long_term_memory_config", {})
             if not self.long_term_memory_config.get("llm_config"):
                 raise ValueError("Missing required configuration for Long-Term Memory provider, Missing 'model' or 'api_key' in 'history_policy.long_term_memory_config.llm_config'.")
+            # Imported here, it needs litellm
+            from .long_term_memory.long_term_memory import LongTermMemory
+
             self.long_term_memory_service = LongTermMemory(self.long_term_memory_config.get("llm_config"))
 
             # Setting up the long-term memory store
@@ -69,8 +74,12 @@ class HistoryService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
                 store_config
             )
 
-        # Start the background thread for auto-expiry
-        self._start_auto_expiry_thread(self.expiration_check_interval)
+        # Long-term memory keeps session summaries past the time to live, which needs the sweep
+        if not self.use_long_term_memory and self.history_provider.enable_native_expiry(self.time_to_live):
+            log.debug("History provider expires sessions natively, skipping the expiry sweep")
+        else:
+            # Start the background thread for auto-expiry
+            self._start_auto_expiry_thread(self.expiration_check_interval)
 
     def _get_history_provider(self, provider_type:str, module_path:str="", config:dict={}):
         """
@@ -98,12 +107,9 @@ class HistoryService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
     def _delete_expired_items(self):
         """Checks all history entries and deletes those that have exceeded max_time_to_live."""
         current_time = time.time()
-        sessions = self.history_provider.get_all_sessions()
-        for session_id in sessions:
-            session = self.history_provider.get_session(session_id)
-            if not session:
-                continue
-            elapsed_time = current_time - session["last_active_time"]
+        last_active_times = self.history_provider.get_last_active_times()
+        for session_id, last_active_time in last_active_times.items():
+            elapsed_time = current_time - last_active_time
             if elapsed_time > self.time_to_live:
                 self.clear_history(session_id)
                 log.debug("History for session %s has expired", session_id)
@@ -410,4 +416,11 @@ class HistoryService(AutoExpiry, metaclass=AutoExpirySingletonMeta):
         # Delete the session if it has no chat history, files or summary
         else:
             return self.history_provider.delete_session(session_id)
-        
+
+    def delete_history(self, session_id:str):
+        """
+        Delete the history, files and summary of a session right away, without waiting for it to expire.
+
+        :param session_id: The session identifier.
+        """
+        return self.history_provider.delete_session(session_id)
@@ -2,7 +2,6 @@ from datetime import datetime
 import json
 
 from solace_ai_connector.common.log import log
-from litellm import completion
 
 # Some prompts were imported and modified from mem0
 PROMPTS = {
@@ -215,6 +214,9 @@ class LongTermMemory():
 
     def __init__(self, llm_config):
         def llm_request(messages):
+            # litellm is slow to import, it is only needed once a request is made
+            from litellm import completion
+
             response = completion(
                 model=llm_config.get("model"),
                 api_key=llm_config.get("api_key"),
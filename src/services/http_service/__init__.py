@@ -0,0 +1,3 @@
+from .http_service import HttpResponse, HttpService, ResponseTooLargeError
+
+__all__ = ["HttpResponse", "HttpService", "ResponseTooLargeError"]
@@ -0,0 +1,263 @@
+"""
+An on-disk cache of HTTP responses, for the HTTP service.
+
+Responses are stored as a body file and a JSON metadata file named by the hash
+of their URL. The freshness of a response comes from its Cache-Control max-age
+or s-maxage, or from its Expires header. A stale response with an ETag or a
+Last-Modified header is revalidated with a conditional request. The cache is a
+shared cache: responses marked private or no-store are not stored.
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+
+from solace_ai_connector.common.log import log
+
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Headers of the stored response that are refreshed by a 304 Not Modified
+REVALIDATION_HEADERS = ("cache-control", "expires", "etag", "last-modified", "date")
+
+
+def parse_cache_control(value: str) -> dict:
+    directives = {}
+    for directive in (value or "").split(","):
+        name, _, argument = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or True
+    return directives
+
+
+def _parse_http_date(value: str):
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def is_storable(status_code: int, headers: dict) -> bool:
+    """
+    Whether a response can be stored by a shared cache.
+    """
+    if status_code != 200:
+        return False
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-store" in directives or "private" in directives:
+        return False
+    vary = {field.strip().lower() for field in headers.get("vary", "").split(",") if field.strip()}
+    return not (vary - {"accept-encoding"})
+
+
+def get_freshness_lifetime(headers: dict) -> float:
+    """
+    Get how long, in seconds, a response stays fresh after it was received.
+    """
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-cache" in directives:
+        return 0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            try:
+                lifetime = int(directives[name])
+            except (TypeError, ValueError):
+                return 0
+            break
+    else:
+        expires = _parse_http_date(headers.get("expires"))
+        if expires is None:
+            return 0
+        date = _parse_http_date(headers.get("date")) or time.time()
+        lifetime = expires - date
+    try:
+        age = int(headers.get("age", 0))
+    except ValueError:
+        age = 0
+    return max(0, lifetime - age)
+
+
+class CachedResponse:
+    """
+    A stored response and whether it can be used without revalidation.
+    """
+
+    def __init__(self, key: str, metadata: dict, body_path: str):
+        self.key = key
+        self.url = metadata["url"]
+        self.status_code = metadata["status_code"]
+        self.headers = metadata["headers"]
+        self.expires_at = metadata["expires_at"]
+        self.body_path = body_path
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def get_validators(self) -> dict:
+        """
+        Get the headers of a conditional request for this response.
+        """
+        validators = {}
+        if self.headers.get("etag"):
+            validators["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            validators["If-Modified-Since"] = self.headers["last-modified"]
+        return validators
+
+    def read(self) -> bytes:
+        with open(self.body_path, "rb") as body_file:
+            return body_file.read()
+
+
+def get_default_cache_directory() -> str:
+    """
+    Get the cache directory of the current user, in the system temporary directory.
+    """
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return os.path.join(tempfile.gettempdir(), f"solace_agent_mesh_http_cache_{user}")
+
+
+def make_private_directory(directory: str):
+    """
+    Create the directory, only accessible to the current user. An existing
+    directory must be owned by the current user, and is made private.
+    Raises PermissionError otherwise, as another user could read or plant responses.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return
+    status = os.lstat(directory)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid():
+        raise PermissionError(f"The cache directory {directory} is not owned by the current user.")
+    if stat.S_IMODE(status.st_mode) != 0o700:
+        os.chmod(directory, 0o700)
+
+
+class HttpCache:
+    """
+    Stores responses in directory, up to max_bytes of bodies.
+    The least recently stored responses are removed first.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._size = sum(
+            entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".body")
+        )
+
+    @staticmethod
+    def get_key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _get_paths(self, key: str):
+        base_path = os.path.join(self.directory, key)
+        return base_path + ".json", base_path + ".body"
+
+    def get(self, url: str):
+        """
+        Get the stored response of url, or None.
+        """
+        key = self.get_key(url)
+        metadata_path, body_path = self._get_paths(key)
+        try:
+            with open(metadata_path, "r", encoding="utf-8") as metadata_file:
+                metadata = json.load(metadata_file)
+        except (OSError, ValueError):
+            return None
+        if metadata.get("url") != url or not os.path.exists(body_path):
+            return None
+        return CachedResponse(key, metadata, body_path)
+
+    def store(self, url: str, status_code: int, headers: dict, content: bytes) -> bool:
+        """
+        Store a response if it is storable and has a freshness lifetime or a validator.
+        Returns whether it was stored.
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        if not is_storable(status_code, headers) or len(content) > self.max_bytes:
+            return False
+        lifetime = get_freshness_lifetime(headers)
+        if not lifetime and not ("etag" in headers or "last-modified" in headers):
+            return False
+
+        key = self.get_key(url)
+        metadata_path, body_path = self._get_paths(key)
+        metadata = {
+            "url": url,
+            "status_code": status_code,
+            "headers": headers,
+            "expires_at": time.time() + lifetime,
+        }
+        with self._lock:
+            previous_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+            self._write(body_path, content, "wb")
+            self._write(metadata_path, json.dumps(metadata), "w")
+            self._size += len(content) - previous_size
+            if self._size > self.max_bytes:
+                self._prune()
+        return True
+
+    def refresh(self, cached_response: CachedResponse, headers: dict):
+        """
+        Update a stored response from the headers of a 304 Not Modified.
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        stored_headers = dict(cached_response.headers)
+        for name in REVALIDATION_HEADERS:
+            if name in headers:
+                stored_headers[name] = headers[name]
+        metadata = {
+            "url": cached_response.url,
+            "status_code": cached_response.status_code,
+            "headers": stored_headers,
+            "expires_at": time.time() + get_freshness_lifetime(stored_headers),
+        }
+        metadata_path, _ = self._get_paths(cached_response.key)
+        with self._lock:
+            self._write(metadata_path, json.dumps(metadata), "w")
+        cached_response.headers = stored_headers
+        cached_response.expires_at = metadata["expires_at"]
+
+    def delete(self, url: str):
+        with self._lock:
+            self._delete(self.get_key(url))
+
+    @staticmethod
+    def _write(path: str, content, mode: str):
+        # Unique to the thread, in any of the processes sharing the directory
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, mode) as output_file:
+            output_file.write(content)
+        os.replace(temporary_path, path)
+
+    def _delete(self, key: str):
+        metadata_path, body_path = self._get_paths(key)
+        try:
+            self._size -= os.path.getsize(body_path)
+            os.remove(body_path)
+        except OSError:
+            pass
+        try:
+            os.remove(metadata_path)
+        except OSError:
+            pass
+
+    def _prune(self):
+        # Remove the oldest responses until the cache is back under 90% of its budget
+        bodies = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".body")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in bodies:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            self._delete(entry.name[: -len(".body")])
+        log.debug("Pruned the HTTP cache %s to %d bytes", self.directory, self._size)
@@ -0,0 +1,193 @@
+"""
+The HTTP client shared by the agents.
+
+All the requests of the process go through one connection pool per host, so
+that repeated requests to a host reuse their connections. Response bodies are
+streamed and limited to a maximum size, and cacheable GET responses are kept
+in an on-disk cache and revalidated with conditional requests.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from solace_ai_connector.common.log import log
+
+from ..common.singleton import SingletonMeta
+from ...tools.config.runtime_config import get_service_config
+from .http_cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    HttpCache,
+    get_default_cache_directory,
+    make_private_directory,
+)
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_RESPONSE_BYTES = 100 * 1024 * 1024
+DEFAULT_POOL_CONNECTIONS = 32
+DEFAULT_POOL_MAXSIZE = 10
+CHUNK_SIZE = 64 * 1024
+
+# Requests with these headers are personalized, their responses are not cached
+PRIVATE_REQUEST_HEADERS = ("authorization", "cookie")
+
+
+class ResponseTooLargeError(ValueError):
+    pass
+
+
+class HttpResponse:
+    """
+    A fully read response.
+    """
+
+    def __init__(self, url: str, status_code: int, headers, content: bytes, from_cache: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        encoding = requests.utils.get_encoding_from_headers(self.headers) or "utf-8"
+        return self.content.decode(encoding, errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+def _load_config() -> dict:
+    try:
+        return get_service_config("http_service")
+    except (ValueError, FileNotFoundError):
+        return {}
+
+
+class HttpService(metaclass=SingletonMeta):
+    def __init__(self, config=None, identifier=None):
+        self.identifier = identifier
+        config = config if config is not None else _load_config()
+        self.timeout = config.get("timeout", DEFAULT_TIMEOUT)
+        self.max_response_bytes = config.get("max_response_bytes", DEFAULT_MAX_RESPONSE_BYTES)
+        # One adapter, and so one pool per host, shared by the sessions of all the threads
+        self._adapter = HTTPAdapter(
+            pool_connections=config.get("pool_connections", DEFAULT_POOL_CONNECTIONS),
+            pool_maxsize=config.get("pool_maxsize", DEFAULT_POOL_MAXSIZE),
+        )
+        self._local = threading.local()
+
+        cache_config = config.get("cache", {})
+        self.cache = None
+        if cache_config.get("enabled", True):
+            directory = cache_config.get("directory")
+            if not directory:
+                directory = get_default_cache_directory()
+                try:
+                    make_private_directory(directory)
+                except OSError as e:
+                    log.warning("The HTTP response cache is disabled: %s", e)
+                    return
+            self.cache = HttpCache(directory, cache_config.get("max_bytes", DEFAULT_CACHE_MAX_BYTES))
+
+    def get_session(self) -> requests.Session:
+        """
+        Get the session of the current thread. Sessions keep their own cookies
+        and share the connection pools.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
+
+    def get(self, url: str, headers: dict = None, timeout=None, max_bytes: int = None, use_cache: bool = True) -> HttpResponse:
+        """
+        GET url and read its body, of at most max_bytes.
+
+        A fresh cached response is returned without a request, and a stale one
+        is revalidated. Raises ResponseTooLargeError when the body is larger
+        than max_bytes, and the requests exceptions on connection errors.
+        """
+        headers = dict(headers or {})
+        timeout = timeout or self.timeout
+        max_bytes = max_bytes or self.max_response_bytes
+        cache = self.cache
+        if not use_cache or any(name.lower() in PRIVATE_REQUEST_HEADERS for name in headers):
+            cache = None
+
+        cached_response = cache.get(url) if cache else None
+        if cached_response:
+            if cached_response.is_fresh:
+                return self._from_cache(cached_response)
+            headers.update(cached_response.get_validators())
+
+        with self.get_session().get(url, headers=headers, timeout=timeout, stream=True) as response:
+            if cached_response and response.status_code == 304:
+                # Read the empty body, otherwise closing the response closes its connection
+                response.content
+                cache.refresh(cached_response, response.headers)
+                return self._from_cache(cached_response)
+            content = self._read_body(response, max_bytes)
+            http_response = HttpResponse(response.url, response.status_code, response.headers, content)
+
+        if cache:
+            try:
+                if not cache.store(url, http_response.status_code, http_response.headers, content) and cached_response:
+                    cache.delete(url)
+            except OSError as e:
+                log.warning("Failed to cache the response of %s: %s", url, e)
+        return http_response
+
+    @staticmethod
+    def _from_cache(cached_response) -> HttpResponse:
+        return HttpResponse(
+            cached_response.url,
+            cached_response.status_code,
+            cached_response.headers,
+            cached_response.read(),
+            from_cache=True,
+        )
+
+    def download(self, url: str, destination, headers: dict = None, timeout=None, max_bytes: int = None) -> HttpResponse:
+        """
+        GET url and write its body of at most max_bytes to destination, a writable
+        file object, without holding it in memory. The response is not cached.
+
+        Raises requests.HTTPError on an error status before anything is written,
+        and ResponseTooLargeError when the body is larger than max_bytes. The
+        returned response has the status and headers, and no content.
+        """
+        timeout = timeout or self.timeout
+        max_bytes = max_bytes or self.max_response_bytes
+        with self.get_session().get(url, headers=headers, timeout=timeout, stream=True) as response:
+            http_response = HttpResponse(response.url, response.status_code, response.headers, b"")
+            http_response.raise_for_status()
+            for chunk in self._iter_body(response, max_bytes):
+                destination.write(chunk)
+        return http_response
+
+    @staticmethod
+    def _iter_body(response: requests.Response, max_bytes: int):
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise ResponseTooLargeError(
+                f"The response of {response.url} is {content_length} bytes, more than the limit of {max_bytes} bytes"
+            )
+        size = 0
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ResponseTooLargeError(
+                    f"The response of {response.url} is more than the limit of {max_bytes} bytes"
+                )
+            yield chunk
+
+    @classmethod
+    def _read_body(cls, response: requests.Response, max_bytes: int) -> bytes:
+        return b"".join(cls._iter_body(response, max_bytes))
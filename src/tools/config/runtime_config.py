@@ -1,26 +1,156 @@
+"""
+Process-wide access to the runtime configuration at RUNTIME_CONFIG_PATH.
+
+The file is parsed once, with the libyaml loader when available, and reloaded
+only when its modification time or size changes. Services can subscribe to be
+notified of the changes of their section instead of re-reading the file.
+Environment variables are expanded when the file is loaded.
+"""
+
+import copy
 import os
+import threading
+import time
+
 import yaml
 
+from solace_ai_connector.common.log import log
 
-def load_runtime_config(default_config_path=None):
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+DEFAULT_POLL_INTERVAL = 5
+
+
+def _get_config_path(default_config_path=None) -> str:
     config_path = (
         default_config_path if default_config_path else os.getenv("RUNTIME_CONFIG_PATH")
     )
     if not config_path:
         raise ValueError("Environment variable RUNTIME_CONFIG_PATH not set.")
-    config = {}
-    try:
-        with open(config_path, "r", encoding="utf-8") as yaml_str:
-            yaml_str = os.path.expandvars(yaml_str.read())
-            config = yaml.safe_load(yaml_str)
-    except FileNotFoundError as er:
-        raise FileNotFoundError(
-            f"Runtime config file not found at {config_path}"
-        ) from er
-    return config
+    return config_path
+
+
+class RuntimeConfig:
+    """
+    A cached snapshot of a runtime config file.
+    """
+
+    def __init__(self, config_path: str):
+        self.config_path = config_path
+        self._lock = threading.Lock()
+        self._config = None
+        self._file_version = None
+        self._subscribers = []
+        self._poll_thread = None
+        self.loads = 0
+
+    def _read_file_version(self):
+        try:
+            stat = os.stat(self.config_path)
+        except FileNotFoundError as er:
+            raise FileNotFoundError(
+                f"Runtime config file not found at {self.config_path}"
+            ) from er
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as yaml_file:
+                yaml_str = os.path.expandvars(yaml_file.read())
+        except FileNotFoundError as er:
+            raise FileNotFoundError(
+                f"Runtime config file not found at {self.config_path}"
+            ) from er
+        self.loads += 1
+        return yaml.load(yaml_str, Loader=YAML_LOADER) or {}
+
+    def refresh(self) -> bool:
+        """
+        Reload the file if it changed, and notify the subscribers.
+        Returns whether the config changed.
+        """
+        with self._lock:
+            file_version = self._read_file_version()
+            if file_version == self._file_version:
+                return False
+            old_config = self._config
+            self._config = self._load()
+            self._file_version = file_version
+            new_config = self._config
+            subscribers = list(self._subscribers) if old_config is not None else []
+
+        for service_name, callback in subscribers:
+            old_value = old_config if service_name is None else old_config.get("services", {}).get(service_name, {})
+            new_value = new_config if service_name is None else new_config.get("services", {}).get(service_name, {})
+            if old_value != new_value:
+                try:
+                    callback(copy.deepcopy(new_value))
+                except Exception as e:
+                    log.error("Runtime config subscriber failed: %s", e)
+        return old_config is None or old_config != new_config
+
+    def get(self) -> dict:
+        """
+        Get the current config. The returned dict is shared, it must not be modified.
+        """
+        self.refresh()
+        return self._config
+
+    def subscribe(self, callback, service_name: str = None, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        Call callback with the new config, or with the new config of a service,
+        when it changes. The file is checked every poll_interval seconds, and
+        whenever the config is read.
+        """
+        with self._lock:
+            self._subscribers.append((service_name, callback))
+            if self._poll_thread is None:
+                self._poll_thread = threading.Thread(
+                    target=self._poll, args=(poll_interval,), daemon=True, name="runtime-config-poll"
+                )
+                self._poll_thread.start()
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = [
+                subscriber for subscriber in self._subscribers if subscriber[1] != callback
+            ]
+
+    def _poll(self, poll_interval: float):
+        while True:
+            time.sleep(poll_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                log.error("Failed to reload the runtime config %s: %s", self.config_path, e)
+
+
+_runtime_configs = {}
+_runtime_configs_lock = threading.Lock()
+
+
+def get_runtime_config(default_config_path=None) -> RuntimeConfig:
+    """
+    Get the process-wide snapshot of the runtime config file.
+    """
+    config_path = os.path.abspath(_get_config_path(default_config_path))
+    with _runtime_configs_lock:
+        if config_path not in _runtime_configs:
+            _runtime_configs[config_path] = RuntimeConfig(config_path)
+        return _runtime_configs[config_path]
+
+
+def load_runtime_config(default_config_path=None):
+    return copy.deepcopy(get_runtime_config(default_config_path).get())
 
 
 def get_service_config(service_name, default_config_path=None):
-    config = load_runtime_config(default_config_path)
+    config = get_runtime_config(default_config_path).get()
     services = config.get("services", {})
-    return services.get(service_name, {})
+    return copy.deepcopy(services.get(service_name, {}))
+
+
+def subscribe_to_service_config(service_name, callback, default_config_path=None):
+    """
+    Call callback with the new config of a service when the runtime config file changes.
+    """
+    get_runtime_config(default_config_path).subscribe(callback, service_name)
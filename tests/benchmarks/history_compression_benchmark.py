@@ -0,0 +1,151 @@
+"""
+Benchmark the compression of stored history sessions for each history provider.
+
+Reports the stored payload size, the compression ratio and the CPU time of a
+store + get round trip per session. Providers whose backend is not available
+locally (mongomock, fakeredis) are skipped.
+
+    python -m tests.benchmarks.history_compression_benchmark
+"""
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+from solace_agent_mesh.services.history_service.history_providers.index import HistoryProviderFactory
+
+NUM_SESSIONS = 50
+COMPRESSIONS = [None, "zlib", "zstd"]
+
+
+def make_session(index: int) -> dict:
+    """
+    A session with the kind of large assistant outputs seen in practice.
+    """
+    rng = random.Random(index)
+    csv_rows = "\n".join(
+        f"{i},{rng.choice(['north', 'south', 'east', 'west'])},{rng.randint(0, 10000)},{rng.random():.4f}"
+        for i in range(400)
+    )
+    html = "".join(
+        f"<tr><td class='cell'>{rng.randint(0, 999)}</td><td class='cell'>Item {i}</td></tr>"
+        for i in range(300)
+    )
+    history = []
+    for turn in range(10):
+        history.append({"role": "user", "content": f"Please generate report number {turn} for region {turn % 4}"})
+        history.append(
+            {
+                "role": "assistant",
+                "content": f"[Returned file report_{turn}.csv]\nid,region,amount,score\n{csv_rows}\n"
+                f"<html><body><table>{html}</table></body></html>",
+            }
+        )
+    return {
+        "history": history,
+        "files": [],
+        "summary": "",
+        "last_active_time": time.time(),
+        "num_characters": sum(len(m["content"]) for m in history),
+        "num_turns": len(history),
+    }
+
+
+def stored_size(provider_type: str, provider, data: dict) -> int:
+    if provider_type in ("file", "redis"):
+        return len(provider.codec.encode_bytes(data))
+    if provider_type == "sql":
+        return len(provider.codec.encode_json(data).encode("utf-8"))
+    try:
+        import bson
+        return len(bson.encode({"data": provider.codec.encode_document(data, binary=True)}))
+    except ImportError:
+        return len(json.dumps(provider.codec.encode_document(data)).encode("utf-8"))
+
+
+def get_provider_configs(path: str) -> dict:
+    configs = {
+        "file": {"path": os.path.join(path, "file")},
+        "sql": {"db_type": "sqlite", "sql_database": os.path.join(path, "history.db")},
+    }
+    try:
+        import mongomock  # noqa: F401
+        configs["mongodb"] = {"mongodb_uri": "mongodb://localhost"}
+    except ImportError:
+        pass
+    try:
+        import fakeredis  # noqa: F401
+        configs["redis"] = {}
+    except ImportError:
+        pass
+    return configs
+
+
+def run_benchmark(num_sessions: int = NUM_SESSIONS) -> list:
+    sessions = [make_session(i) for i in range(num_sessions)]
+    path = tempfile.mkdtemp()
+    patches = []
+    try:
+        import mongomock
+        patches.append(patch("pymongo.MongoClient", mongomock.MongoClient))
+    except ImportError:
+        pass
+    try:
+        import fakeredis
+        patches.append(patch("redis.Redis", fakeredis.FakeRedis))
+    except ImportError:
+        pass
+
+    results = []
+    try:
+        for p in patches:
+            p.start()
+        for provider_type, base_config in get_provider_configs(path).items():
+            raw_size = None
+            for compression in COMPRESSIONS:
+                config = {**base_config, "compression": compression}
+                if compression:
+                    config["table_name"] = f"session_history_{compression}"
+                try:
+                    provider = HistoryProviderFactory.get_provider_class(provider_type)(config)
+                except ImportError:
+                    continue
+
+                size = sum(stored_size(provider_type, provider, data) for data in sessions)
+                raw_size = raw_size or size
+                start = time.process_time()
+                for i, data in enumerate(sessions):
+                    session_id = f"{compression}_{i}"
+                    provider.store_session(session_id, data)
+                    provider.get_session(session_id)
+                cpu_time = time.process_time() - start
+                for i in range(num_sessions):
+                    provider.delete_session(f"{compression}_{i}")
+
+                results.append(
+                    {
+                        "provider": provider_type,
+                        "compression": compression or "none",
+                        "stored_bytes": size,
+                        "ratio": raw_size / size,
+                        "cpu_ms_per_session": cpu_time * 1000 / num_sessions,
+                    }
+                )
+    finally:
+        for p in patches:
+            p.stop()
+        shutil.rmtree(path, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'provider':<10}{'compression':<13}{'stored bytes':>14}{'ratio':>8}{'cpu ms/session':>16}")
+    for result in run_benchmark():
+        print(
+            f"{result['provider']:<10}{result['compression']:<13}{result['stored_bytes']:>14}"
+            f"{result['ratio']:>8.2f}{result['cpu_ms_per_session']:>16.2f}"
+        )
@@ -0,0 +1,113 @@
+"""
+Benchmark the extraction of page content against the previous conversion.
+
+The previous path parsed each page with BeautifulSoup, serialized it back and
+converted it with html2text. Reports the conversion time and the size of the
+markdown, in characters and estimated tokens, per page.
+
+The pages are the .html files of a directory of saved pages, or generated pages
+with the navigation, sidebars and footers of a typical site.
+
+    python -m tests.benchmarks.html_extraction_benchmark [pages_directory]
+"""
+
+import os
+import sys
+import time
+
+import html2text
+from bs4 import BeautifulSoup
+
+from solace_agent_mesh.agents.web_request.html_content import (
+    DEFAULT_MAX_PAGE_TOKENS,
+    estimate_tokens,
+    html_to_markdown,
+    truncate_to_token_budget,
+)
+
+REPEATS = 5
+
+
+def previous_conversion(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    converter = html2text.HTML2Text()
+    converter.ignore_links = False
+    converter.ignore_images = False
+    return converter.handle(str(soup))
+
+
+def make_page(title: str, num_sections: int, num_links: int) -> str:
+    links = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(num_links))
+    sections = "".join(
+        f"<h2>Part {i}</h2><p>{'The body text of the article goes on with details. ' * 12}</p>"
+        f"<ul><li>A point about part {i}</li><li>Another <a href='/ref/{i}'>reference</a></li></ul>"
+        for i in range(num_sections)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>" + title + "</title>"
+        "<style>" + "body { margin: 0 } " * 500 + "</style>"
+        "<script>" + "var tracking = {};" * 500 + "</script></head><body>"
+        '<header class="site-header"><nav class="navbar"><ul>' + links + "</ul></nav></header>"
+        '<div class="cookie-banner">We use cookies. <button>Accept</button></div>'
+        '<div class="layout"><aside class="sidebar"><ul>' + links + "</ul></aside>"
+        "<main><article><h1>" + title + "</h1>" + sections + "</article></main></div>"
+        '<footer class="site-footer"><ul>' + links + "</ul><p>Copyright</p></footer>"
+        "</body></html>"
+    )
+
+
+def load_pages(directory: str = None) -> dict:
+    if directory:
+        pages = {}
+        for name in sorted(os.listdir(directory)):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(directory, name), "rb") as page_file:
+                    pages[name] = page_file.read().decode("utf-8", errors="replace")
+        return pages
+    return {
+        "short article": make_page("A short article", 3, 100),
+        "long article": make_page("A long article", 60, 300),
+        "link heavy page": make_page("A portal", 5, 2000),
+    }
+
+
+def measure(convert, html: str):
+    output = convert(html)
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        convert(html)
+    return (time.perf_counter() - start) * 1000 / REPEATS, output
+
+
+def run_benchmark(directory: str = None) -> list:
+    results = []
+    for name, html in load_pages(directory).items():
+        previous_time, previous_output = measure(previous_conversion, html)
+        extraction_time, output = measure(
+            lambda html: truncate_to_token_budget(html_to_markdown(html), DEFAULT_MAX_PAGE_TOKENS), html
+        )
+        results.append(
+            {
+                "page": name,
+                "html_chars": len(html),
+                "previous_ms": previous_time,
+                "extraction_ms": extraction_time,
+                "previous_chars": len(previous_output),
+                "extraction_chars": len(output),
+                "previous_tokens": estimate_tokens(previous_output),
+                "extraction_tokens": estimate_tokens(output),
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    print(
+        f"{'page':<18}{'html chars':>12}{'previous ms':>13}{'extraction ms':>15}"
+        f"{'previous tokens':>17}{'extraction tokens':>19}"
+    )
+    for result in run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None):
+        print(
+            f"{result['page'][:17]:<18}{result['html_chars']:>12}{result['previous_ms']:>13.1f}"
+            f"{result['extraction_ms']:>15.1f}{result['previous_tokens']:>17}{result['extraction_tokens']:>19}"
+        )
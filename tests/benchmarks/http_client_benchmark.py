@@ -0,0 +1,66 @@
+"""
+Benchmark repeated fetches through the HTTP service against plain requests.get.
+
+A local HTTP server serves a page with no cache headers, a page revalidated
+with its ETag, and a page fresh for a minute. The previous path opened a new
+connection for every requests.get. New connections are delayed by
+CONNECT_LATENCY to stand for the TCP and TLS handshakes of a remote host.
+
+    python -m tests.benchmarks.http_client_benchmark
+"""
+
+import shutil
+import tempfile
+import time
+
+import requests
+
+from solace_agent_mesh.services.http_service import HttpService
+from tests.http_server import LocalHttpServer
+
+NUM_FETCHES = 100
+CONNECT_LATENCY = 0.002
+PAGE = b"<html><body>" + b"<p>Some page content</p>" * 2000 + b"</body></html>"
+
+def measure(fetch, url: str) -> float:
+    fetch(url)
+    start = time.perf_counter()
+    for _ in range(NUM_FETCHES):
+        fetch(url)
+    return (time.perf_counter() - start) * 1000 / NUM_FETCHES
+
+
+def run_benchmark() -> list:
+    cache_directory = tempfile.mkdtemp()
+    results = []
+    try:
+        http_service = HttpService(
+            {"cache": {"directory": cache_directory}}, identifier="http-client-benchmark"
+        )
+        with LocalHttpServer(CONNECT_LATENCY, PAGE) as server:
+            for path in ("/plain", "/etag", "/max-age"):
+                url = server.url(path)
+                requests_time = measure(lambda url: requests.get(url, timeout=30).content, url)
+                connections = server.connections
+                service_time = measure(lambda url: http_service.get(url).content, url)
+                results.append(
+                    {
+                        "case": path,
+                        "requests_ms": requests_time,
+                        "service_ms": service_time,
+                        "service_connections": server.connections - connections,
+                        "speedup": requests_time / service_time,
+                    }
+                )
+    finally:
+        shutil.rmtree(cache_directory, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'case':<10}{'requests ms':>13}{'service ms':>12}{'connections':>13}{'speedup':>9}")
+    for result in run_benchmark():
+        print(
+            f"{result['case']:<10}{result['requests_ms']:>13.2f}{result['service_ms']:>12.2f}"
+            f"{result['service_connections']:>13}{result['speedup']:>9.1f}"
+        )
@@ -0,0 +1,75 @@
+"""
+Benchmark the import time of the services and components.
+
+Each module is imported in a fresh interpreter with `python -X importtime`.
+Reports the total import time of the module, with everything it imports, and
+the optional heavy dependencies it loaded, which should only be imported once their backend is
+selected in the configuration.
+
+    python -m tests.benchmarks.import_time_benchmark
+"""
+
+import subprocess
+import sys
+
+ENTRY_MODULES = [
+    "solace_agent_mesh.services.file_service",
+    "solace_agent_mesh.services.history_service",
+    "solace_agent_mesh.orchestrator.orchestrator_main",
+    "solace_agent_mesh.gateway.components.gateway_input",
+    "solace_agent_mesh.gateway.components.gateway_output",
+    "solace_agent_mesh.agents.global.global_agent_component",
+    "solace_agent_mesh.agents.image_processing.image_processing_agent_component",
+]
+
+HEAVY_MODULES = ["boto3", "botocore", "litellm", "plotly", "kaleido", "markitdown"]
+
+
+def get_import_times(module: str, cwd: str = None) -> dict:
+    """
+    Import a module in a new interpreter, run in cwd.
+    Returns the import time, in microseconds, of every module it imported,
+    without the modules that it imported in turn.
+    """
+    result = subprocess.run(
+        # import_module, "global" is a keyword in the agent package name
+        [sys.executable, "-X", "importtime", "-c", f"import importlib; importlib.import_module({module!r})"],
+        capture_output=True,
+        text=True,
+        check=False,
+        cwd=cwd,
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Failed to import {module}: {errors[-1] if errors else result.returncode}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        if self_time.strip().isdigit():
+            times[name.strip()] = int(self_time)
+    return times
+
+
+def get_heavy_modules(times: dict) -> list:
+    """
+    Get the heavy top-level modules in the imported modules.
+    """
+    return sorted({name.split(".")[0] for name in times} & set(HEAVY_MODULES))
+
+
+def main():
+    print(f"{'module':<70} {'import time':>12}  heavy modules")
+    for module in ENTRY_MODULES:
+        times = get_import_times(module)
+        print(
+            f"{module:<70} {sum(times.values()) / 1000:>9.1f} ms  "
+            f"{', '.join(get_heavy_modules(times)) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
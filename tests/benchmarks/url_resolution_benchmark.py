@@ -0,0 +1,114 @@
+"""
+Benchmark the resolution of file URLs in texts against the previous regex path.
+
+The previous path ran FS_URL_REGEX through re.sub on every text and downloaded
+the URLs one after the other. Reports the time per text for plain texts (no
+URL, the common case) and for texts with several URLs, with a simulated
+download latency.
+
+    python -m tests.benchmarks.url_resolution_benchmark
+"""
+
+import json
+import re
+import time
+
+from solace_agent_mesh.services.file_service import FileService, FS_URL_REGEX
+from solace_agent_mesh.services.file_service.file_transformations import apply_file_transformations
+from solace_agent_mesh.services.file_service.resolved_url_cache import RESOLVED_URL_CACHE
+from solace_agent_mesh.services.file_service.url_resolver import get_url_affixes
+
+SESSION_ID = "benchmark_session"
+NUM_PLAIN_TEXTS = 2000
+NUM_URL_TEXTS = 20
+URLS_PER_TEXT = 8
+DOWNLOAD_LATENCY = 0.005
+
+CONFIG = {
+    "type": "memory",
+    "max_time_to_live": 86400,
+    "expiration_check_interval": 600,
+    "resolved_url_cache_max_bytes": 0,
+    "config": {"memory": {}},
+}
+
+
+def regex_resolve(file_service: FileService, text: str, session_id: str) -> str:
+    """
+    The previous implementation: re.sub with sequential downloads.
+    """
+
+    def replace_url(match):
+        raw_url = match.group()
+        filename, queries = file_service.get_parsed_url(FileService._clean_url(raw_url))
+        if queries.get("resolve", "").lower() != "true":
+            return raw_url
+        metadata = file_service.validate_access_permission(filename, session_id, return_metadata=True)
+        response = apply_file_transformations(
+            file_service.file_manager.download_to_buffer(filename), metadata, queries
+        )
+        if isinstance(response, bytes):
+            response = response.decode("utf-8", "ignore")
+        elif not isinstance(response, str):
+            response = json.dumps(response)
+        prefix, suffix = get_url_affixes(raw_url)
+        return prefix + response + suffix
+
+    return re.sub(FS_URL_REGEX, replace_url, text)
+
+
+def make_texts(file_service: FileService):
+    plain_text = "Here is the summary of the quarter.\n" * 40
+    urls = []
+    for i in range(URLS_PER_TEXT):
+        meta = file_service.upload_from_buffer(f"section {i}\n" * 100, f"section_{i}.txt", SESSION_ID)
+        urls.append(meta["url"] + "?resolve=true")
+    url_text = plain_text + "\n".join(f"Section {i}: {url}" for i, url in enumerate(urls)) + "\n"
+    return plain_text, url_text
+
+
+def measure(resolve, texts) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        resolve(text)
+    return (time.perf_counter() - start) * 1e6 / len(texts)
+
+
+def run_benchmark() -> list:
+    file_service = FileService(CONFIG, identifier="url-resolution-benchmark")
+    plain_text, url_text = make_texts(file_service)
+
+    download_to_buffer = file_service.file_manager.download_to_buffer
+
+    def slow_download(name):
+        time.sleep(DOWNLOAD_LATENCY)
+        return download_to_buffer(name)
+
+    file_service.file_manager.download_to_buffer = slow_download
+    RESOLVED_URL_CACHE.clear()
+
+    results = []
+    for name, texts in (("plain text", [plain_text] * NUM_PLAIN_TEXTS), ("text with URLs", [url_text] * NUM_URL_TEXTS)):
+        regex_time = measure(lambda text: regex_resolve(file_service, text, SESSION_ID), texts)
+        scanner_time = measure(lambda text: file_service.resolve_all_resolvable_urls(text, SESSION_ID), texts)
+        assert regex_resolve(file_service, texts[0], SESSION_ID) == file_service.resolve_all_resolvable_urls(
+            texts[0], SESSION_ID
+        )
+        results.append(
+            {
+                "case": name,
+                "regex_us": regex_time,
+                "scanner_us": scanner_time,
+                "speedup": regex_time / scanner_time,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'case':<16}{'regex us/text':>15}{'scanner us/text':>17}{'speedup':>9}")
+    for result in run_benchmark():
+        print(
+            f"{result['case']:<16}{result['regex_us']:>15.1f}{result['scanner_us']:>17.1f}"
+            f"{result['speedup']:>9.1f}"
+        )
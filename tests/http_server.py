@@ -0,0 +1,87 @@
+"""
+A local HTTP server for the tests of the HTTP clients.
+
+The server serves a page with no cache headers, a page revalidated with its
+ETag, a page fresh for a minute and a private page, and answers 404 to the
+other paths.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_HEADERS = {
+    "/plain": {},
+    "/etag": {"ETag": '"v1"', "Cache-Control": "no-cache"},
+    "/max-age": {"Cache-Control": "max-age=60"},
+    "/private": {"Cache-Control": "private, max-age=60"},
+}
+
+
+class LocalHttpServer:
+    """
+    An HTTP/1.1 server on localhost, counting the connections and the
+    requests and 304 responses by path.
+    """
+
+    def __init__(self, connect_latency: float = 0, page: bytes = b"<p>page</p>"):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server.lock:
+                    server.connections += 1
+                time.sleep(server.connect_latency)
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests[self.path] = server.requests.get(self.path, 0) + 1
+                headers = PAGE_HEADERS.get(self.path)
+                if headers is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if "ETag" in headers and self.headers.get("If-None-Match") == headers["ETag"]:
+                    with server.lock:
+                        server.not_modified[self.path] = server.not_modified.get(self.path, 0) + 1
+                    self.send_response(304)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(server.page)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(server.page)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.connect_latency = connect_latency
+        self.page = page
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = {}
+        self.not_modified = {}
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
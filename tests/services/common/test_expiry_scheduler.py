@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+
+from solace_agent_mesh.services.common import SingletonMeta
+from solace_agent_mesh.services.common.expiry_scheduler import ExpiryJob, ExpiryScheduler
+
+
+class TestExpiryScheduler(unittest.TestCase):
+    def test_jobs_run_on_one_thread(self):
+        scheduler = ExpiryScheduler()
+        runs = {"fast": [], "slow": []}
+
+        def fast():
+            runs["fast"].append(threading.current_thread().name)
+
+        def slow():
+            runs["slow"].append(threading.current_thread().name)
+            raise ValueError("sweep failed")
+
+        fast_job = scheduler.add_job("fast", fast, 0.05)
+        scheduler.add_job("slow", slow, 10)
+        time.sleep(0.3)
+        scheduler.remove_job(fast_job)
+        fast_runs = len(runs["fast"])
+        time.sleep(0.1)
+
+        self.assertGreaterEqual(fast_runs, 3)
+        self.assertEqual(len(runs["fast"]), fast_runs)
+        self.assertEqual(len(runs["slow"]), 1)
+        self.assertEqual(set(runs["fast"] + runs["slow"]), {"expiry-scheduler"})
+        metrics = scheduler.get_metrics()
+        self.assertEqual(list(metrics), ["slow"])
+        self.assertEqual((metrics["slow"]["runs"], metrics["slow"]["failures"]), (1, 1))
+
+    def test_jitter_only_shortens_the_interval(self):
+        job = ExpiryJob("job", None, 10, 0.1)
+        delays = [job.get_delay() for _ in range(1000)]
+        self.assertGreaterEqual(min(delays), 9)
+        self.assertLessEqual(max(delays), 10)
+
+    def test_singleton_is_created_once(self):
+        created = []
+
+        class Service(metaclass=SingletonMeta):
+            def __init__(self, identifier=None):
+                time.sleep(0.05)
+                created.append(identifier)
+
+        threads = [
+            threading.Thread(target=Service, kwargs={"identifier": f"service{i % 2}"})
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(created), ["service0", "service1"])
+        self.assertIs(Service(identifier="service0"), Service(identifier="service0"))
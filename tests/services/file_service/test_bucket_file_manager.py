@@ -0,0 +1,237 @@
+import time
+import unittest
+
+import boto3
+from moto import mock_aws
+
+from solace_agent_mesh.services.file_service.file_manager.bucket_file_manager import (
+    BucketFileManager,
+    LIFECYCLE_RULE_ID,
+    LIFECYCLE_TAG_KEY,
+)
+
+BUCKET_NAME = "test-bucket"
+BOTO3_CONFIG = {
+    "region_name": "us-east-1",
+    "aws_access_key_id": "testing",
+    "aws_secret_access_key": "testing",
+}
+
+
+class TestBucketFileManager(unittest.TestCase):
+    def setUp(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        self.client = boto3.client("s3", **BOTO3_CONFIG)
+        self.client.create_bucket(Bucket=BUCKET_NAME)
+        self.manager = self.create_manager()
+
+    def create_manager(self, **config):
+        return BucketFileManager(
+            {"bucket_name": BUCKET_NAME, "boto3_config": BOTO3_CONFIG, **config}, 3600
+        )
+
+    def upload(self, name, session_id, manager=None):
+        manager = manager or self.manager
+        meta = manager.upload_from_buffer(b"data", name, session_id=session_id)
+        return meta["url"].split("://")[1]
+
+    def get_names(self, metadata_list):
+        return sorted(metadata["name"] for metadata in metadata_list)
+
+    def get_keys(self):
+        response = self.client.list_objects_v2(Bucket=BUCKET_NAME)
+        return [obj["Key"] for obj in response.get("Contents", [])]
+
+    def test_list_by_session(self):
+        self.upload("a.txt", "session1")
+        self.upload("b.txt", "session1")
+        self.upload("c.txt", "session/2")
+
+        self.assertEqual(self.get_names(self.manager.list_metadata_by_session("session1")), ["a.txt", "b.txt"])
+        self.assertEqual(self.get_names(self.manager.list_metadata_by_session("session/2")), ["c.txt"])
+        self.assertEqual(self.get_names(self.manager.list_all_metadata()), ["a.txt", "b.txt", "c.txt"])
+
+    def test_list_expired(self):
+        name = self.upload("a.txt", "session1")
+        self.upload("b.txt", "session1")
+        self.assertEqual(self.manager.list_expired_metadata(time.time()), [])
+
+        self.manager.update_file_expiration(name, time.time() - 10)
+        self.assertEqual(self.get_names(self.manager.list_expired_metadata(time.time())), ["a.txt"])
+        self.assertEqual(self.manager.get_metadata(name)["name"], "a.txt")
+
+    def test_list_expirations_from_markers(self):
+        name = self.upload("a.txt", "session1")
+        expiration = self.manager.get_metadata(name)["expiration_timestamp"]
+
+        self.manager.metadata_index.fetch_metadata = None
+        self.assertEqual(self.manager.list_expirations(), [(int(expiration), name)])
+        self.assertEqual(
+            self.create_manager(metadata_index=False).list_expirations(), [(expiration, name)]
+        )
+
+    def test_delete_removes_markers(self):
+        name = self.upload("a.txt", "session1")
+        self.manager.delete_by_name(name)
+
+        self.assertEqual(self.get_keys(), [])
+        self.assertEqual(self.manager.list_metadata_by_session("session1"), [])
+
+    def test_delete_by_names(self):
+        manager = self.create_manager(deduplicate=True)
+        names = [
+            manager.upload_from_buffer(b"same content", name, session_id="session1")["url"].split("://")[1]
+            for name in ("a.txt", "b.txt", "c.txt")
+        ]
+        self.assertEqual(manager.delete_by_names(names[:2] + ["missing"]), {})
+        self.assertEqual(self.get_names(manager.list_all_metadata()), ["c.txt"])
+        self.assertEqual(manager.download_to_buffer(names[2]), b"same content")
+
+        self.assertEqual(manager.delete_by_names(names[2:]), {})
+        self.assertEqual(self.get_keys(), [])
+
+    def test_stale_markers_are_removed(self):
+        name = self.upload("a.txt", "session1")
+        self.client.delete_objects(
+            Bucket=BUCKET_NAME,
+            Delete={"Objects": [{"Key": name}, {"Key": f"{name}.metadata"}]},
+        )
+
+        self.assertEqual(self.manager.list_metadata_by_session("session1"), [])
+        self.assertFalse(any("session" in key for key in self.get_keys()))
+
+    def test_index_is_built_for_existing_files(self):
+        self.manager = self.create_manager(metadata_index=False)
+        self.upload("a.txt", "session1")
+
+        manager = self.create_manager()
+        self.assertEqual(self.get_names(manager.list_metadata_by_session("session1")), ["a.txt"])
+
+        self.upload("b.txt", "session1", self.manager)
+        self.assertEqual(manager.rebuild_metadata_index(), 2)
+        self.assertEqual(self.get_names(manager.list_metadata_by_session("session1")), ["a.txt", "b.txt"])
+
+    def test_lifecycle_rule(self):
+        self.client.put_bucket_lifecycle_configuration(
+            Bucket=BUCKET_NAME,
+            LifecycleConfiguration={
+                "Rules": [
+                    {"ID": "other", "Filter": {"Prefix": "logs/"}, "Status": "Enabled", "Expiration": {"Days": 30}}
+                ]
+            },
+        )
+        self.create_manager(lifecycle_expiration_days=2)
+        manager = self.create_manager(lifecycle_expiration_days=3, deduplicate=False)
+
+        rules = self.client.get_bucket_lifecycle_configuration(Bucket=BUCKET_NAME)["Rules"]
+        self.assertEqual(sorted(rule["ID"] for rule in rules), sorted(["other", LIFECYCLE_RULE_ID]))
+        rule = next(rule for rule in rules if rule["ID"] == LIFECYCLE_RULE_ID)
+        self.assertEqual(rule["Expiration"]["Days"], 3)
+        self.assertEqual(rule["Filter"]["Tag"]["Key"], LIFECYCLE_TAG_KEY)
+
+        # Only the objects of the files are tagged for the rule
+        self.client.put_object(Bucket=BUCKET_NAME, Key="logs/other", Body=b"")
+        self.upload("a.txt", "session1", manager)
+        self.upload("b.txt", "session1", self.create_manager(lifecycle_expiration_days=3))
+        tagged = {
+            key
+            for key in self.get_keys()
+            if self.client.get_object_tagging(Bucket=BUCKET_NAME, Key=key)["TagSet"]
+        }
+        self.assertEqual(len(tagged), 8)  # The file, metadata and markers of a.txt and b.txt
+        self.assertFalse(any(key.startswith("logs/") for key in tagged))
+        # The lifecycle rule turns deduplication off, it would leak the blobs of the files it expires
+        self.assertFalse(any(key.startswith(".amfs_blobs/") for key in self.get_keys()))
+
+    def test_lifecycle_rule_reads_deduplicated_files(self):
+        name = self.upload("a.txt", "session1")
+        manager = self.create_manager(lifecycle_expiration_days=3)
+        self.assertIsNone(manager.get_dedup_stats())
+
+        self.assertEqual(manager.download_to_buffer(name), b"data")
+        manager.delete_by_name(name)
+        self.assertFalse(any(key.startswith(".amfs_blobs/") for key in self.get_keys()))
+
+    def test_delete_errors(self):
+        name = self.upload("a.txt", "session1")
+        self.manager.bucket.delete_objects = lambda **kwargs: {
+            "Errors": [{"Key": name, "Code": "AccessDenied", "Message": "Access Denied"}]
+        }
+        with self.assertLogs(level="ERROR"):
+            self.assertIn("Access Denied", str(self.manager.delete_by_names([name])[name]))
+        with self.assertRaises(RuntimeError):
+            self.manager.delete_by_name(name)
+
+    def test_multipart_open_write(self):
+        self.manager = self.create_manager(deduplicate=False)
+        part = b"x" * (5 * 1024 * 1024)
+        with self.manager.open_write("big.bin", session_id="session1") as writer:
+            writer.write(part)
+            writer.write(part)
+            writer.write(b"tail")
+        name = writer.metadata["url"].split("://")[1]
+
+        self.assertEqual(writer.metadata["file_size"], len(part) * 2 + 4)
+        head = self.client.head_object(Bucket=BUCKET_NAME, Key=name)
+        self.assertEqual(head["ContentLength"], len(part) * 2 + 4)
+        self.assertIn("-", head["ETag"])  # multipart ETags carry the part count
+
+        size = sum(len(chunk) for chunk in self.manager.iter_chunks(name))
+        self.assertEqual(size, len(part) * 2 + 4)
+        self.assertEqual(self.get_names(self.manager.list_metadata_by_session("session1")), ["big.bin"])
+
+    def test_small_open_write_and_abort(self):
+        with self.manager.open_write("small.csv") as writer:
+            writer.write(b"a,b\n1,2\n")
+        name = writer.metadata["url"].split("://")[1]
+        self.assertEqual(writer.metadata["shape"], "1 rows x 2 columns")
+        self.assertEqual(self.manager.open_read(name).read(), b"a,b\n1,2\n")
+
+        with self.assertRaises(RuntimeError):
+            with self.manager.open_write("aborted.bin") as writer:
+                writer.write(b"x" * (6 * 1024 * 1024))
+                raise RuntimeError("failed")
+        self.assertEqual(self.client.list_multipart_uploads(Bucket=BUCKET_NAME).get("Uploads", []), [])
+
+    def test_deduplicated_uploads(self):
+        manager = self.create_manager(deduplicate=True)
+        first = manager.upload_from_buffer(b"same content", "a.txt", session_id="session1")
+        with manager.open_write("b.txt", session_id="session1") as writer:
+            writer.write(b"same content")
+        second = writer.metadata
+        content_hash = manager.get_metadata(first["url"].split("://")[1])["content_hash"]
+        blob_key = ".amfs_blobs/" + content_hash
+
+        self.assertEqual(manager.get_metadata(second["url"].split("://")[1])["content_hash"], content_hash)
+        self.assertEqual([key for key in self.get_keys() if key.startswith(".amfs_blobs/") and "/refs/" not in key], [blob_key])
+        for meta in (first, second):
+            name = meta["url"].split("://")[1]
+            self.assertNotIn(name, self.get_keys())
+            self.assertEqual(manager.download_to_buffer(name), b"same content")
+        self.assertEqual(manager.get_dedup_stats()["deduplicated_uploads"], 1)
+
+        manager.delete_by_name(first["url"].split("://")[1])
+        self.assertIn(blob_key, self.get_keys())
+        manager.delete_by_name(second["url"].split("://")[1])
+        self.assertEqual(self.get_keys(), [])
+
+    def test_blob_referenced_while_released(self):
+        first = self.upload("a.txt", "session1")
+        other_manager = self.create_manager()
+        has_blob_references = self.manager._has_blob_references
+        uploads = []
+
+        def upload_during_release(content_hash):
+            found = has_blob_references(content_hash)
+            if not uploads:
+                # Another process uploads the same content right after the check
+                uploads.append(self.upload("b.txt", "session1", other_manager))
+            return found
+
+        self.manager._has_blob_references = upload_during_release
+        self.manager.delete_by_name(first)
+        self.assertEqual(other_manager.get_dedup_stats()["deduplicated_uploads"], 1)
+        self.assertEqual(self.manager.download_to_buffer(uploads[0]), b"data")
+        self.assertFalse(any("/released/" in key for key in self.get_keys()))
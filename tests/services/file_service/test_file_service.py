@@ -1,3 +1,4 @@
+import base64
 import unittest
 from time import sleep
 import json
@@ -8,8 +9,11 @@ from solace_agent_mesh.services.file_service import (
     FS_PROTOCOL,
     Types,
     FileServicePermissionError,
+    FileResolutionError,
 )
 from solace_agent_mesh.services.file_service import file_utils
+from solace_agent_mesh.services.file_service.resolved_url_cache import ResolvedUrlCache
+from solace_agent_mesh.services.file_service.expiry_schedule import ExpirySchedule
 
 file_manager_config = {
     "type": "memory",
@@ -194,6 +198,212 @@ class TestFileService(unittest.TestCase):
             file_service.download_to_buffer(meta["url"], session_id)
 
 
+    def test_expiry_schedule(self):
+        schedule = ExpirySchedule()
+        schedule.add("a", 10)
+        schedule.add("b", 20)
+        schedule.add("a", 30)  # Rescheduled
+        schedule.seed([(5, "b"), (15, "c")])
+        self.assertEqual(schedule.next_expiration(), 15)
+        self.assertEqual(schedule.pop_due(25), ["c", "b"])
+        schedule.remove("a")
+        self.assertEqual(schedule.pop_due(100), [])
+        self.assertIsNone(schedule.next_expiration())
+
+    def test_expired_files_are_deleted_from_schedule(self):
+        file_service = FileService(file_manager_config, identifier="fs-schedule")
+        file_service._delete_expired_items()  # Seeds the schedule
+        kept = file_service.upload_from_buffer(b"kept", "kept.txt", "session")
+        expired = file_service.upload_from_buffer(b"expired", "expired.txt", "session")
+        with file_service.open_write("streamed.txt", "session") as writer:
+            writer.write(b"streamed")
+        file_service.update_file_expiration(expired["url"], time.time() - 1)
+        file_service.update_file_expiration(writer.metadata["url"], time.time() - 1)
+
+        file_service._delete_expired_items()
+        self.assertEqual(file_service.download_to_buffer(kept["url"], "session"), b"kept")
+        for meta in (expired, writer.metadata):
+            with self.assertRaises(FileNotFoundError):
+                file_service.get_metadata(meta["url"])
+
+    def test_expiry_changes_made_by_other_processes(self):
+        config = dict(file_manager_config, expiration_reseed_interval=2)
+        file_service = FileService(config, identifier="fs-reseed")
+        while not file_service._expiry_job.runs:  # Seeds the schedule
+            sleep(0.01)
+        file_service.stop_auto_expiry()
+        extended = file_service.upload_from_buffer(b"extended", "extended.txt", "session")
+        file_service.update_file_expiration(extended["url"], time.time() - 1)
+        # Stored by another process, through the same storage
+        other = file_service.file_manager.upload_from_buffer(b"other", "other.txt", session_id="session")
+        other_name = file_service.get_parsed_url(other["url"])[0]
+        file_service.file_manager.update_file_expiration(other_name, time.time() - 1)
+        extended_name = file_service.get_parsed_url(extended["url"])[0]
+        new_expiry = time.time() + 10000
+        file_service.file_manager.update_file_expiration(extended_name, new_expiry)
+
+        file_service._delete_expired_items()
+        self.assertEqual(file_service.download_to_buffer(extended["url"], "session"), b"extended")
+        self.assertEqual(file_service._expiry_schedule.get(extended_name), new_expiry)
+        self.assertEqual(file_service.get_metadata(other["url"])["url"], other["url"])  # Not seen yet
+
+        file_service._delete_expired_items()  # Lists the files again
+        with self.assertRaises(FileNotFoundError):
+            file_service.get_metadata(other["url"])
+        self.assertEqual(file_service.download_to_buffer(extended["url"], "session"), b"extended")
+
+    def test_streaming_upload_and_download(self):
+        file_service = FileService(file_manager_config)
+        session_id = "test_session_id"
+        with file_service.open_write("test_streaming.txt", session_id) as writer:
+            writer.write(b"Hello, ")
+            writer.write(b"world!")
+        url = writer.metadata["url"]
+
+        chunks = [bytes(chunk) for chunk in file_service.iter_chunks(url, session_id, 5)]
+        self.assertEqual(chunks, [b"Hello", b", wor", b"ld!"])
+        with file_service.open_read(url, session_id) as file:
+            self.assertEqual(file.read(), b"Hello, world!")
+        with self.assertRaises(FileServicePermissionError):
+            file_service.iter_chunks(url, "invalid_session_id")
+
+
+    def test_deduplicated_uploads(self):
+        file_service = FileService(file_manager_config)
+        stats_before = file_service.get_dedup_stats()
+        content = b"test_deduplicated_uploads content"
+        first = file_service.upload_from_buffer(content, "first.txt", "session_one")
+        second = file_service.upload_from_buffer(content, "second.txt", "session_two")
+
+        self.assertNotEqual(first["url"], second["url"])
+        self.assertEqual(file_service.download_to_buffer(second["url"], "session_two"), content)
+        with self.assertRaises(FileServicePermissionError):
+            file_service.download_to_buffer(second["url"], "session_one")
+        self.assertNotIn("content_hash", first)
+        self.assertNotIn("content_hash", file_service.get_file_block_by_url(first["url"]))
+
+        stats = file_service.get_dedup_stats()
+        self.assertEqual(stats["deduplicated_uploads"] - stats_before["deduplicated_uploads"], 1)
+        self.assertEqual(stats["saved_bytes"] - stats_before["saved_bytes"], len(content))
+
+
+    def test_resolved_url_cache(self):
+        file_service = FileService(file_manager_config)
+        session_id = "test_session_id"
+        meta = file_service.upload_from_buffer(b"a,b\n1,2\n", "test_resolved_url_cache.csv", session_id)
+        calls = []
+        download_to_buffer = file_service.file_manager.download_to_buffer
+        file_service.file_manager.download_to_buffer = lambda name: calls.append(name) or download_to_buffer(name)
+        self.addCleanup(delattr, file_service.file_manager, "download_to_buffer")
+
+        url = meta["url"] + "?encoding=base64&resolve=true"
+        same_url = meta["url"] + "?resolve=true&encoding=base64"
+        text = f"first {url} second {same_url}"
+        first = file_service.resolve_all_resolvable_urls(text, session_id)
+        self.assertEqual(first, file_service.resolve_all_resolvable_urls(text, session_id))
+        self.assertEqual(file_service.resolve_url(same_url, session_id), base64.b64encode(b"a,b\n1,2\n").decode())
+        self.assertEqual(len(calls), 1)
+
+        with self.assertRaises(FileServicePermissionError):
+            file_service.resolve_url(url, "invalid_session_id")
+
+        file_service.delete_by_url(meta["url"])
+        with self.assertRaises(FileNotFoundError):
+            file_service.resolve_url(url, session_id)
+
+    def test_resolve_all_resolvable_urls(self):
+        file_service = FileService(file_manager_config)
+        session_id = "test_session_id"
+        first = file_service.upload_from_buffer(b"first", "test_resolve_first.txt", session_id)["url"]
+        second = file_service.upload_from_buffer(b"second", "test_resolve_second.txt", session_id)["url"]
+
+        self.assertEqual(file_service.resolve_all_resolvable_urls("no urls here", session_id), "no urls here")
+        text = (
+            f"a {first}?resolve=true\n"
+            f"b \"{second}?resolve=true\", '{first}?resolve=true',\n"
+            f"c <url>{second}</url> {first}?resolve=true"
+        )
+        self.assertEqual(
+            file_service.resolve_all_resolvable_urls(text, session_id),
+            f"a first\nb \"second\", 'first',\nc <url>{second}</url> first",
+        )
+        self.assertEqual(
+            file_service.resolve_all_resolvable_urls(f"<url>{second}</url>", session_id, True), "second"
+        )
+
+        missing = f"{FS_PROTOCOL}://missing_file.txt?resolve=true"
+        with self.assertRaises(FileNotFoundError):
+            file_service.resolve_all_resolvable_urls(f"{first}?resolve=true\n{missing}", session_id)
+        with self.assertRaises(FileServicePermissionError):
+            file_service.resolve_all_resolvable_urls(f"{first}?resolve=true\n{missing}", "invalid_session_id")
+        with self.assertRaises(ValueError):
+            file_service.resolve_all_resolvable_urls("text", None)
+
+    def test_resolve_nested_urls(self):
+        file_service = FileService(file_manager_config)
+        session_id = "test_session_id"
+        names = {}
+        contents = {}
+        for name in ("report", "intro", "chart", "loop"):
+            url = file_service.upload_from_buffer(b"", f"test_nested_{name}.html", session_id)["url"]
+            names[name] = url.split("://")[1]
+        url = lambda name: f"{FS_PROTOCOL}://{names[name]}?resolve=true"
+        contents[names["chart"]] = b"<img/>"
+        contents[names["intro"]] = f"<p>intro {url('chart')}\n</p>".encode()
+        contents[names["report"]] = f"<h1>{url('intro')}\n{url('chart')}\n</h1>".encode()
+        contents[names["loop"]] = f"<p>{url('loop')}\n</p>".encode()
+        calls = []
+        file_service.file_manager.download_to_buffer = lambda name: calls.append(name) or contents[name]
+        self.addCleanup(delattr, file_service.file_manager, "download_to_buffer")
+
+        expected = "<body><h1><p>intro <img/>\n</p>\n<img/>\n</h1>\n</body>"
+        text = f"<body>{url('report')}\n</body>"
+        self.assertEqual(file_service.resolve_all_resolvable_urls(text, session_id), expected)
+        self.assertEqual(sorted(calls), sorted([names["report"], names["intro"], names["chart"]]))
+        self.assertEqual("".join(file_service.iter_resolved_text(text, session_id)), expected)
+
+        with self.assertRaises(FileResolutionError):
+            file_service.resolve_all_resolvable_urls(f"{url('loop')}\n", session_id)
+        file_service.max_resolved_size = 20
+        with self.assertRaises(FileResolutionError):
+            file_service.resolve_all_resolvable_urls(text, session_id)
+        file_service.max_resolved_size = 64 * 1024 * 1024
+
+    def test_resolved_url_cache_budget(self):
+        cache = ResolvedUrlCache(max_bytes=40)
+        cache.put("a", {"encoding": "base64"}, b"x" * 10)
+        cache.put("b", {}, b"y" * 10)
+        cache.put("c", {}, b"z" * 100)  # Larger than a quarter of the budget
+        self.assertIsNone(cache.get("c", {}))
+        self.assertEqual(cache.get("a", {"encoding": "base64"}), b"x" * 10)
+        cache.put("d", {}, "w" * 10)
+        cache.put("e", {}, "v" * 10)
+        cache.put("g", {}, "u" * 10)
+        self.assertIsNone(cache.get("b", {}))  # Least recently used
+        self.assertEqual(cache.current_bytes, 40)
+        cache.put("f", {}, {"mutable": True})
+        self.assertIsNone(cache.get("f", {}))
+
+        cache.invalidate("a")
+        self.assertIsNone(cache.get("a", {"encoding": "base64"}))
+        self.assertEqual(cache.current_bytes, 30)
+
+    def test_map_concurrently(self):
+        file_service = FileService(file_manager_config, identifier="test")
+
+        def upload(name):
+            if name == "bad.txt":
+                raise ValueError("Invalid file")
+            time.sleep(0.05 if name == "a.txt" else 0)
+            return file_service.upload_from_buffer(name.encode(), name, "session")["name"]
+
+        results = file_service.map_concurrently(upload, ["a.txt", "bad.txt", "c.txt"])
+        self.assertEqual(results[0], "a.txt")
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], "c.txt")
+        self.assertEqual(file_service.map_concurrently(upload, []), [])
+
+
 class TestFileServiceRegex(unittest.TestCase):
 
     def test_simple_url(self):
@@ -305,6 +515,20 @@ class TestFileServiceRegex(unittest.TestCase):
 
 class TestFileUtils(unittest.TestCase):
 
+    def test_base64_streaming(self):
+        content = bytes(range(256)) * 40
+        encoded = base64.b64encode(content).decode()
+        chunks = list(file_utils.iter_base64_decoded(encoded, 1000))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"".join(chunks), content)
+        self.assertEqual(
+            file_utils.encode_base64_chunks(memoryview(content)[i : i + 1000] for i in range(0, len(content), 1000)),
+            encoded,
+        )
+        # Line wrapped base64 is decoded at once
+        wrapped = "\n".join(encoded[i : i + 76] for i in range(0, len(encoded), 76))
+        self.assertEqual(b"".join(file_utils.iter_base64_decoded(wrapped, 1000)), content)
+
     def test_csv_schema_and_shape(self):
         csv = b"integers,floats,strings\n1,1.1,one\n2,2.2,two\n3,3.3,three\n4,4.4,four"
         schema, shape = file_utils.extract_csv_schema_and_shape(csv)
@@ -323,6 +547,32 @@ class TestFileUtils(unittest.TestCase):
         self.assertEqual(schema, expected_schema)
         self.assertEqual(shape, expected_shape)
 
+    def test_csv_schema_and_shape_from_chunks(self):
+        csv = 'id,text,score\r\n1,"multi\nline",1.5\r\n\r\n2,plain,\r\n3,"é",2\r\n'.encode("utf-8")
+        chunks = [csv[i : i + 3] for i in range(0, len(csv), 3)]
+        schema, shape, truncated = file_utils.extract_csv_schema_and_shape_from_chunks(chunks)
+        self.assertEqual(shape, (3, 3))
+        self.assertFalse(truncated)
+        self.assertEqual(schema["id"], {"type": Types.INT})
+        self.assertEqual(schema["text"], {"type": Types.STR})
+        # Mixed empty and float values
+        self.assertEqual(schema["score"], {"type": Types.STR})
+
+        large = b"id\n" + b"".join(b"%d\n" % i for i in range(10000))
+        schema, shape, truncated = file_utils.extract_csv_schema_and_shape_from_chunks(
+            file_utils.iter_buffer_chunks(large, 1000), max_bytes=5000
+        )
+        self.assertTrue(truncated)
+        self.assertLess(shape[0], 10000)
+        self.assertEqual(schema["id"], {"type": Types.INT})
+        self.assertEqual(file_utils.get_csv_schema_and_shape(schema, shape, truncated)[1], f"at least {shape[0]} rows x 1 columns")
+
+    def test_json_schema_max_bytes(self):
+        json_bytes = json.dumps([{"a": 1}] * 100).encode()
+        self.assertEqual(file_utils.get_json_schema_and_shape(json_bytes, max_bytes=100), (None, None))
+        schema, shape = file_utils.get_json_schema_and_shape(file_utils.iter_buffer_chunks(json_bytes, 64))
+        self.assertEqual(shape, "top level: 100 elements")
+
     def test_csv_str_schema_and_shape(self):
         csv = b"integers,floats,strings\n1,1.1,one\n2,2.2,two\n3,3.3,three\n4,4.4,four"
         schema, shape = file_utils.extract_csv_schema_and_shape(csv)
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from solace_agent_mesh.services.file_service.file_manager.memory_file_manager import (
+    MemoryFileManager,
+)
+from solace_agent_mesh.services.file_service.file_manager.memory_content_store import (
+    MemoryContentStore,
+)
+
+
+class TestMemoryFileManager(unittest.TestCase):
+    def setUp(self):
+        # The content store is shared by the memory file managers, each test gets its own
+        original_contents = MemoryFileManager.contents
+        MemoryFileManager.contents = MemoryContentStore()
+        self.addCleanup(setattr, MemoryFileManager, "contents", original_contents)
+
+    def upload(self, manager, content, name="a.txt"):
+        meta = manager.upload_from_buffer(content, name, session_id="session1")
+        return meta["url"].split("://")[1]
+
+    def test_evicts_least_recently_used(self):
+        manager = MemoryFileManager({"max_bytes": 10, "deduplicate": False}, 3600)
+        first = self.upload(manager, b"aaaa")
+        second = self.upload(manager, b"bbbb")
+        manager.download_to_buffer(first)
+        third = self.upload(manager, b"cccc")
+
+        self.assertEqual(manager.download_to_buffer(first), b"aaaa")
+        self.assertEqual(manager.download_to_buffer(third), b"cccc")
+        with self.assertRaises(FileNotFoundError):
+            manager.get_metadata(second)
+        with self.assertRaises(ValueError):
+            self.upload(manager, b"x" * 11)
+
+        stats = manager.get_memory_stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["resident_bytes"], 8)
+        self.assertEqual(stats["hits"], 3)
+
+    def test_unbounded_by_default(self):
+        manager = MemoryFileManager({"deduplicate": False}, 3600)
+        names = [self.upload(manager, bytes([i]) * 1024 * 1024) for i in range(4)]
+        self.assertIsNone(manager.contents.max_bytes)
+        self.assertEqual([len(manager.download_to_buffer(name)) for name in names], [1024 * 1024] * 4)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        MemoryFileManager({"spill_directory": directory}, 3600)
+        self.assertEqual(manager.contents.max_bytes, 512 * 1024 * 1024)
+
+    def test_spills_to_volume(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        manager = MemoryFileManager({"max_bytes": 10, "spill_directory": directory}, 3600)
+        first = self.upload(manager, b"aaaa")
+        second = self.upload(manager, b"bbbb")
+        third = self.upload(manager, b"cccc")
+        large = self.upload(manager, b"x" * 20)
+
+        stats = manager.get_memory_stats()
+        self.assertEqual((stats["spills"], stats["resident_bytes"], stats["spilled_bytes"]), (2, 8, 24))
+        self.assertEqual(manager.download_to_buffer(first), b"aaaa")
+        self.assertEqual(manager.download_to_buffer(large), b"x" * 20)
+        self.assertEqual(manager.get_memory_stats()["misses"], 2)
+
+        # Loading the first content back spilled the second one
+        manager.delete_by_name(first)
+        manager.delete_by_name(large)
+        self.assertEqual(manager.get_memory_stats()["spilled_bytes"], 4)
+        self.assertEqual(manager.download_to_buffer(second), b"bbbb")
+        self.assertEqual(manager.download_to_buffer(third), b"cccc")
+        manager.delete_by_name(second)
+        self.assertEqual([name for name in os.listdir(directory) if not name.startswith(".")], [])
+
+    def test_deduplicated_contents_are_counted_once(self):
+        manager = MemoryFileManager({"max_bytes": 10}, 3600)
+        first = self.upload(manager, b"same")
+        second = self.upload(manager, b"same", "b.txt")
+        self.assertEqual(manager.get_memory_stats()["resident_bytes"], 4)
+
+        manager.delete_by_name(first)
+        self.assertEqual(manager.download_to_buffer(second), b"same")
+        manager.delete_by_name(second)
+        self.assertEqual(manager.get_memory_stats()["resident_bytes"], 0)
+
+    def test_files_dropped_when_loading_back_are_deleted(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        spilling = MemoryFileManager({"max_bytes": 10, "spill_directory": directory, "deduplicate": False}, 3600)
+        first = self.upload(spilling, b"aaaa")
+        second = self.upload(spilling, b"bbbb")
+        self.upload(spilling, b"cccc")
+
+        # Without a spill manager, loading the spilled first file back drops the second one
+        manager = MemoryFileManager({"max_bytes": 10, "deduplicate": False}, 3600)
+        self.assertEqual(manager.download_to_buffer(first), b"aaaa")
+        with self.assertRaises(FileNotFoundError):
+            manager.get_metadata(second)
+        self.assertNotIn(second, MemoryFileManager.references)
+
+    def test_spills_without_holding_the_lock(self):
+        store = MemoryFileManager.contents
+        locked = []
+
+        class SpillManager:
+            def upload_from_buffer(self, content, name):
+                acquired = store._lock.acquire(timeout=1)
+                locked.append(not acquired)
+                if acquired:
+                    store._lock.release()
+                    # Served from memory while it is written
+                    self.content = store.get("a")[0]
+                return {"url": f"amfs://{name}"}
+
+        spill_manager = SpillManager()
+        store.configure(4, spill_manager)
+        store.put("a", b"aaaa")
+        store.put("b", b"bbbb")
+        self.assertEqual((locked, spill_manager.content), ([False], b"aaaa"))
+        self.assertEqual(store.as_dict()["spills"], 1)
@@ -0,0 +1,86 @@
+import json
+import unittest
+
+from solace_agent_mesh.services.file_service import FileService
+from solace_agent_mesh.services.file_service.file_transformations import apply_file_transformations
+from solace_agent_mesh.services.file_service.transformers.jsonpath import select, JsonPathError
+
+CSV_FILE = b"id,region,amount\n1,north,50\n2,south,150\n3,north,200\n4,north,120\n"
+CSV_METADATA = {"mime_type": "text/csv", "name": "orders.csv"}
+JSON_FILE = json.dumps(
+    {"users": [{"name": "ann", "age": 34, "admin": True}, {"name": "bob", "age": 17, "admin": False}]}
+).encode()
+JSON_METADATA = {"mime_type": "application/json", "name": "users.json"}
+
+
+class TestQueryTransformers(unittest.TestCase):
+    def transform_csv(self, **queries):
+        return apply_file_transformations(CSV_FILE, CSV_METADATA, queries)
+
+    def transform_json(self, **queries):
+        return apply_file_transformations(JSON_FILE, JSON_METADATA, queries)
+
+    def test_csv_rows(self):
+        self.assertEqual(self.transform_csv(head="2"), "id,region,amount\n1,north,50\n2,south,150\n")
+        self.assertEqual(self.transform_csv(tail="1"), "id,region,amount\n4,north,120\n")
+        self.assertEqual(self.transform_csv(rows="1:3"), "id,region,amount\n2,south,150\n3,north,200\n")
+        self.assertEqual(self.transform_csv(rows="-1"), "id,region,amount\n4,north,120\n")
+
+    def test_csv_columns_and_filter(self):
+        self.assertEqual(
+            self.transform_csv(filter="region==north;amount>100", columns="amount,id"),
+            "amount,id\n200,3\n120,4\n",
+        )
+        self.assertEqual(self.transform_csv(filter="region~=SOU", columns="id"), "id\n2\n")
+        with self.assertRaises(ValueError):
+            self.transform_csv(columns="missing")
+        with self.assertRaises(ValueError):
+            self.transform_csv(filter="amount")
+
+    def test_max_bytes(self):
+        self.assertEqual(self.transform_csv(max_bytes="40"), "id,region,amount\n1,north,50\n2,south,150\n")
+        self.assertEqual(self.transform_json(jsonpath="$.users[*].name", max_bytes="8"), '["ann"]')
+        text = apply_file_transformations(b"one\ntwo\nthree\n", {"mime_type": "text/plain"}, {"max_bytes": "9"})
+        self.assertEqual(text, "one\ntwo\n")
+
+    def test_json(self):
+        self.assertEqual(self.transform_json(jsonpath="$.users[*].name"), '["ann", "bob"]')
+        self.assertEqual(self.transform_json(jsonpath="$.users[0].name"), "ann")
+        self.assertEqual(
+            json.loads(self.transform_json(jsonpath="users", filter="admin==true", columns="name")),
+            [{"name": "ann"}],
+        )
+        self.assertEqual(json.loads(self.transform_json(jsonpath="$.users", tail="1"))[0]["name"], "bob")
+        with self.assertRaises(ValueError):
+            self.transform_csv(jsonpath="$.id")
+
+    def test_unrelated_queries_keep_the_file(self):
+        self.assertEqual(self.transform_csv(resolve="true"), CSV_FILE.decode())
+        self.assertEqual(self.transform_json(resolve="true"), JSON_FILE.decode())
+
+    def test_resolve_url_with_queries(self):
+        file_service = FileService(
+            {"type": "memory", "config": {"memory": {}}}, identifier="query-transformers"
+        )
+        meta = file_service.upload_from_buffer(CSV_FILE, "orders.csv", "session")
+        text = f"Top orders: {meta['url']}?filter=amount%3E%3D150&columns=id&resolve=true"
+        self.assertEqual(file_service.resolve_all_resolvable_urls(text, "session"), "Top orders: id\n2\n3\n")
+
+
+class TestJsonPath(unittest.TestCase):
+    data = {"store": {"book": [{"title": "a", "price": 1}, {"title": "b", "price": 2}], "bike": {"price": 9}}}
+
+    def test_select(self):
+        self.assertEqual(select(self.data, "$.store.book[1].title"), "b")
+        self.assertEqual(select(self.data, "$.store.book[*].title"), ["a", "b"])
+        self.assertEqual(select(self.data, "$['store']['bike']"), {"price": 9})
+        self.assertEqual(select(self.data, "$..price"), [1, 2, 9])
+        self.assertEqual(select(self.data, "$.store.book[-1:]"), [{"title": "b", "price": 2}])
+        self.assertEqual(select(self.data, "$.store.book[0,1].price"), [1, 2])
+        self.assertIsNone(select(self.data, "$.missing"))
+
+    def test_invalid_path(self):
+        with self.assertRaises(JsonPathError):
+            select(self.data, "$.store[")
+        with self.assertRaises(JsonPathError):
+            select(self.data, "$.store..")
@@ -0,0 +1,227 @@
+import gc
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from solace_agent_mesh.services.file_service.file_manager.volume_file_manager import (
+    VolumeFileManager,
+)
+from solace_agent_mesh.services.file_service.file_manager.volume_metadata_index import (
+    DEFAULT_INDEX_NAME,
+    main as rebuild_index_main,
+)
+
+
+class TestVolumeFileManager(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.manager = VolumeFileManager({"directory": self.directory}, 3600)
+
+    def upload(self, name, session_id):
+        return self.manager.upload_from_buffer(b"data", name, session_id=session_id)
+
+    def get_names(self, metadata_list):
+        return sorted(metadata["name"] for metadata in metadata_list)
+
+    def test_index_follows_upload_and_delete(self):
+        meta = self.upload("a.txt", "session1")
+        self.upload("b.txt", "session2")
+
+        self.assertEqual(self.get_names(self.manager.list_all_metadata()), ["a.txt", "b.txt"])
+        self.assertEqual(self.get_names(self.manager.list_metadata_by_session("session1")), ["a.txt"])
+
+        self.manager.delete_by_name(meta["url"].split("://")[1])
+        self.assertEqual(self.get_names(self.manager.list_all_metadata()), ["b.txt"])
+
+    def test_index_follows_expiration_update(self):
+        meta = self.upload("a.txt", "session1")
+        self.upload("b.txt", "session1")
+        self.assertEqual(self.manager.list_expired_metadata(time.time()), [])
+
+        self.manager.update_file_expiration(meta["url"].split("://")[1], time.time() - 1)
+        self.assertEqual(self.get_names(self.manager.list_expired_metadata(time.time())), ["a.txt"])
+
+    def test_list_expirations(self):
+        meta = self.upload("a.txt", "session1")
+        expected = [(meta["expiration_timestamp"], meta["url"].split("://")[1])]
+
+        self.assertEqual(self.manager.list_expirations(), expected)
+        unindexed = VolumeFileManager({"directory": self.directory, "metadata_index": False}, 3600)
+        self.assertEqual(unindexed.list_expirations(), expected)
+
+    def test_index_matches_metadata_files(self):
+        self.upload("a.txt", "session1")
+        unindexed = VolumeFileManager({"directory": self.directory, "metadata_index": False}, 3600)
+
+        self.assertEqual(self.manager.list_all_metadata(), unindexed.list_all_metadata())
+
+    def test_rebuild_from_directory(self):
+        self.upload("a.txt", "session1")
+        unindexed = VolumeFileManager({"directory": self.directory, "metadata_index": False}, 3600)
+        unindexed.upload_from_buffer(b"data", "b.txt", session_id="session1")
+        self.assertEqual(self.get_names(self.manager.list_all_metadata()), ["a.txt"])
+
+        self.assertEqual(self.manager.rebuild_metadata_index(), 2)
+        self.assertEqual(self.get_names(self.manager.list_all_metadata()), ["a.txt", "b.txt"])
+
+    def test_new_index_is_built_from_existing_files(self):
+        self.upload("a.txt", "session1")
+        index_path = os.path.join(self.directory, "other_index.sqlite")
+        manager = VolumeFileManager(
+            {"directory": self.directory, "metadata_index_path": index_path}, 3600
+        )
+        self.assertEqual(self.get_names(manager.list_all_metadata()), ["a.txt"])
+
+    def test_rebuild_command(self):
+        self.upload("a.txt", "session1")
+        self.manager.metadata_index.close()
+        for suffix in ("", "-wal", "-shm"):
+            index_path = os.path.join(self.directory, DEFAULT_INDEX_NAME + suffix)
+            if os.path.exists(index_path):
+                os.remove(index_path)
+
+        rebuild_index_main([self.directory])
+        manager = VolumeFileManager({"directory": self.directory}, 3600)
+        self.assertEqual(self.get_names(manager.list_all_metadata()), ["a.txt"])
+
+
+class TestVolumeFileManagerStreaming(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.manager = VolumeFileManager({"directory": self.directory}, 3600)
+
+    def test_open_write_and_iter_chunks(self):
+        with self.manager.open_write("data.bin", session_id="session1") as writer:
+            for i in range(10):
+                writer.write(bytes([i]) * 1000)
+        name = writer.metadata["url"].split("://")[1]
+
+        self.assertEqual(writer.metadata["file_size"], 10000)
+        self.assertEqual(self.manager.get_metadata(name)["session_id"], "session1")
+        chunks = [bytes(chunk) for chunk in self.manager.iter_chunks(name, 4096)]
+        self.assertEqual([len(chunk) for chunk in chunks], [4096, 4096, 1808])
+        self.assertEqual(b"".join(chunks), self.manager.download_to_buffer(name))
+
+    def test_open_write_csv_metadata(self):
+        with self.manager.open_write("data.csv") as writer:
+            writer.write(b"a,b\n1,2\n")
+            writer.write(b"3,4\n")
+        self.assertEqual(writer.metadata["shape"], "2 rows x 2 columns")
+
+    def test_open_write_abort(self):
+        with self.assertRaises(RuntimeError):
+            with self.manager.open_write("data.bin") as writer:
+                writer.write(b"partial")
+                raise RuntimeError("failed")
+        self.assertIsNone(writer.metadata)
+        self.assertEqual(self.manager.list_all_metadata(), [])
+        self.assertEqual([f for f in os.listdir(self.directory) if not f.startswith(".")], [])
+
+    def test_unclosed_writer_is_aborted(self):
+        writer = self.manager.open_write("data.bin")
+        writer.write(b"partial")
+        del writer
+        gc.collect()
+        self.assertEqual(self.manager.list_all_metadata(), [])
+        self.assertEqual([f for f in os.listdir(self.directory) if not f.startswith(".")], [])
+
+    def test_open_read_and_download_to_file(self):
+        meta = self.manager.upload_from_buffer(b"hello world", "a.txt")
+        name = meta["url"].split("://")[1]
+        with self.manager.open_read(name) as file:
+            self.assertEqual(file.read(5), b"hello")
+            self.assertEqual(file[6:], b"world")
+
+        destination = os.path.join(self.directory, "copy.txt")
+        self.manager.download_to_file(name, destination)
+        with open(destination, "rb") as file:
+            self.assertEqual(file.read(), b"hello world")
+
+    def test_empty_file(self):
+        meta = self.manager.upload_from_buffer(b"", "empty.txt")
+        name = meta["url"].split("://")[1]
+        self.assertEqual(list(self.manager.iter_chunks(name)), [])
+        self.assertEqual(self.manager.open_read(name).read(), b"")
+
+    def test_upload_from_file(self):
+        source = os.path.join(self.directory, "source.txt")
+        with open(source, "wb") as file:
+            file.write(b"content")
+        meta = self.manager.upload_from_file(source, session_id="session1")
+        self.assertEqual(meta["name"], "source.txt")
+        self.assertEqual(self.manager.download_to_buffer(meta["url"].split("://")[1]), b"content")
+
+    def test_deferred_schema_inference(self):
+        manager = VolumeFileManager({"directory": self.directory, "defer_schema_inference": True}, 3600)
+        meta = manager.upload_from_buffer(b"a,b\n1,x\n2,y\n", "data.csv", session_id="session1")
+        name = meta["url"].split("://")[1]
+        self.assertNotIn("shape", meta)
+
+        deadline = time.time() + 5
+        while "shape" not in manager.get_metadata(name) and time.time() < deadline:
+            time.sleep(0.01)
+        stored = manager.get_metadata(name)
+        self.assertEqual(stored["shape"], "2 rows x 2 columns")
+        self.assertIn("b:\n", stored["schema-yaml"])
+        self.assertEqual(manager.list_metadata_by_session("session1")[0]["shape"], "2 rows x 2 columns")
+
+    def test_schema_max_bytes(self):
+        manager = VolumeFileManager({"directory": self.directory, "schema_max_bytes": 100}, 3600)
+        content = b"id,value\n" + b"".join(b"%d,%d\n" % (i, i) for i in range(1000))
+        with manager.open_write("large.csv", session_id="session1") as writer:
+            writer.write(content)
+        self.assertTrue(writer.metadata["shape"].startswith("at least "))
+        self.assertEqual(writer.metadata["file_size"], len(content))
+
+
+class TestVolumeFileManagerDedup(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.manager = VolumeFileManager({"directory": self.directory}, 3600)
+
+    def get_blobs(self):
+        return [f for f in os.listdir(self.manager.blob_directory) if not f.startswith(".")]
+
+    def test_same_content_is_stored_once(self):
+        first = self.manager.upload_from_buffer(b"same content", "a.txt", session_id="session1")
+        with self.manager.open_write("b.txt", session_id="session2") as writer:
+            writer.write(b"same ")
+            writer.write(b"content")
+        second = writer.metadata
+        self.assertNotIn("content_hash", first)
+        content_hash = self.manager.get_metadata(first["url"].split("://")[1])["content_hash"]
+
+        self.assertEqual(self.manager.get_metadata(second["url"].split("://")[1])["content_hash"], content_hash)
+        self.assertEqual(self.get_blobs(), [content_hash])
+        blob_path = os.path.join(self.manager.blob_directory, content_hash)
+        self.assertEqual(os.stat(blob_path).st_nlink, 3)
+        self.assertEqual(self.manager.download_to_buffer(second["url"].split("://")[1]), b"same content")
+
+        stats = self.manager.get_dedup_stats()
+        self.assertEqual(stats["uploads"], 2)
+        self.assertEqual(stats["deduplicated_uploads"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertEqual(stats["saved_bytes"], len(b"same content"))
+
+    def test_blob_is_deleted_with_last_reference(self):
+        first = self.manager.upload_from_buffer(b"same content", "a.txt")
+        second = self.manager.upload_from_buffer(b"same content", "b.txt")
+
+        self.manager.delete_by_name(first["url"].split("://")[1])
+        self.assertEqual(len(self.get_blobs()), 1)
+        self.assertEqual(self.manager.download_to_buffer(second["url"].split("://")[1]), b"same content")
+
+        self.manager.delete_by_name(second["url"].split("://")[1])
+        self.assertEqual(self.get_blobs(), [])
+
+    def test_deduplicate_disabled(self):
+        manager = VolumeFileManager({"directory": self.directory, "deduplicate": False}, 3600)
+        meta = manager.upload_from_buffer(b"content", "a.txt")
+        self.assertNotIn("content_hash", meta)
+        self.assertIsNone(manager.get_dedup_stats())
+        self.assertEqual(self.get_blobs(), [])
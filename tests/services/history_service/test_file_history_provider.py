@@ -0,0 +1,125 @@
+import unittest
+import tempfile
+import os
+import time
+import shutil
+
+from solace_agent_mesh.services.history_service.history_providers.file_history_provider import (
+    FileHistoryProvider,
+)
+
+
+class TestSegmentedFileHistoryProvider(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def get_provider(self, compaction_threshold=64):
+        return FileHistoryProvider(
+            {
+                "path": self.path,
+                "storage_mode": "segmented",
+                "compaction_threshold": compaction_threshold,
+            }
+        )
+
+    def get_session_data(self, messages):
+        return {
+            "history": [{"role": "user", "content": m} for m in messages],
+            "files": [],
+            "summary": "",
+            "last_active_time": time.time(),
+            "num_characters": sum(len(m) for m in messages),
+            "num_turns": len(messages),
+        }
+
+    def test_store_and_get_session(self):
+        provider = self.get_provider()
+        data = self.get_session_data(["Hello"])
+        provider.store_session("session1", data)
+
+        self.assertEqual(provider.get_session("session1"), data)
+        self.assertEqual(provider.get_session("missing"), {})
+
+    def test_appends_only_changes(self):
+        provider = self.get_provider()
+        messages = []
+        for i in range(5):
+            messages.append("message " + str(i))
+            provider.store_session("session1", self.get_session_data(messages))
+
+        segment = os.path.join(self.path, "sessions_session1_history.jsonl")
+        with open(segment, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+        self.assertEqual(len(lines), 5)
+        self.assertNotIn("message 0", lines[-1])
+        self.assertEqual(provider.get_session("session1")["history"][-1]["content"], "message 4")
+
+    def test_compaction(self):
+        provider = self.get_provider(compaction_threshold=3)
+        messages = []
+        for i in range(10):
+            messages.append("message " + str(i))
+            provider.store_session("session1", self.get_session_data(messages))
+
+        segment = os.path.join(self.path, "sessions_session1_history.jsonl")
+        with open(segment, "r", encoding="utf-8") as f:
+            self.assertLessEqual(len(f.read().splitlines()), 3)
+
+        # A fresh provider (e.g. another process) sees the same state
+        session = self.get_provider().get_session("session1")
+        self.assertEqual(len(session["history"]), 10)
+
+    def test_shared_between_providers(self):
+        provider1 = self.get_provider()
+        provider2 = self.get_provider()
+
+        provider1.store_session("session1", self.get_session_data(["a"]))
+        provider2.store_session("session1", self.get_session_data(["a", "b"]))
+        provider1.store_session("session1", self.get_session_data(["a", "b", "c"]))
+
+        self.assertEqual(len(provider2.get_session("session1")["history"]), 3)
+
+    def test_torn_write_is_ignored(self):
+        provider = self.get_provider()
+        provider.store_session("session1", self.get_session_data(["a"]))
+
+        segment = os.path.join(self.path, "sessions_session1_history.jsonl")
+        with open(segment, "a", encoding="utf-8") as f:
+            f.write('{"op": "patch", "set": {"summ')
+
+        provider = self.get_provider()
+        self.assertEqual(len(provider.get_session("session1")["history"]), 1)
+        provider.store_session("session1", self.get_session_data(["a", "b"]))
+        self.assertEqual(len(self.get_provider().get_session("session1")["history"]), 2)
+
+    def test_index_and_delete(self):
+        provider = self.get_provider()
+        provider.store_session("session1", self.get_session_data(["a"]))
+        provider.store_session("session2", self.get_session_data(["b"]))
+
+        self.assertEqual(sorted(provider.get_all_sessions()), ["session1", "session2"])
+        self.assertIn("session1", provider.get_last_active_times())
+
+        provider.delete_session("session1")
+        self.assertEqual(provider.get_all_sessions(), ["session2"])
+        self.assertEqual(provider.get_session("session1"), {})
+
+
+class TestJsonFileHistoryProvider(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def test_store_and_list(self):
+        provider = FileHistoryProvider({"path": self.path})
+        provider.store_session("session1", {"history": [], "last_active_time": 1})
+
+        self.assertEqual(provider.get_all_sessions(), ["session1"])
+        self.assertEqual(provider.get_last_active_times(), {"session1": 1})
+        self.assertEqual(os.listdir(self.path), ["sessions_session1_history.json"])
@@ -227,3 +227,13 @@ class TestHistoryService(unittest.TestCase):
 
         self.assertEqual(len(history), 1)
         self.assertEqual(history[0]["content"], content2)
+
+    def test_delete_history(self):
+        service = self.get_memory_history_service()
+        session_id = "session1"
+
+        service.store_history(session_id, "user", "Hello, world!")
+        service.delete_history(session_id)
+
+        self.assertEqual(service.get_history(session_id), [])
+        self.assertNotIn(session_id, service.history_provider.get_all_sessions())
@@ -0,0 +1,60 @@
+import unittest
+import tempfile
+import shutil
+
+from solace_agent_mesh.services.history_service.history_providers.memory_history_provider import (
+    MemoryHistoryProvider,
+    approximate_size,
+)
+
+
+def get_session_data(content, last_active_time=1):
+    return {"history": [{"role": "user", "content": content}], "last_active_time": last_active_time}
+
+
+class TestMemoryHistoryProvider(unittest.TestCase):
+    def test_unbounded_by_default(self):
+        provider = MemoryHistoryProvider()
+        for i in range(100):
+            provider.store_session(f"session{i}", get_session_data("x" * 1000))
+
+        self.assertEqual(len(provider.get_all_sessions()), 100)
+
+    def test_lru_eviction(self):
+        session_size = approximate_size(get_session_data("x" * 1000))
+        provider = MemoryHistoryProvider({"max_memory_bytes": session_size * 3})
+        for i in range(3):
+            provider.store_session(f"session{i}", get_session_data("x" * 1000))
+
+        # Access session0 so session1 is the least recently used
+        provider.get_session("session0")
+        provider.store_session("session3", get_session_data("x" * 1000))
+
+        self.assertEqual(sorted(provider.get_all_sessions()), ["session0", "session2", "session3"])
+        self.assertEqual(provider.get_session("session1"), {})
+        self.assertLessEqual(provider.resident_bytes, session_size * 3)
+
+        provider.delete_session("session0")
+        self.assertEqual(provider.resident_bytes, session_size * 2)
+
+    def test_spill_to_disk(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, True)
+        session_size = approximate_size(get_session_data("x" * 1000))
+        provider = MemoryHistoryProvider(
+            {"max_memory_bytes": session_size * 2, "spill_path": path}
+        )
+        for i in range(4):
+            provider.store_session(f"session{i}", get_session_data("x" * 1000, i))
+
+        self.assertEqual(list(provider.history.keys()), ["session2", "session3"])
+        self.assertEqual(sorted(provider.get_all_sessions()), ["session0", "session1", "session2", "session3"])
+        self.assertEqual(provider.get_last_active_times()["session0"], 0)
+
+        # Loading a spilled session brings it back into memory
+        self.assertEqual(provider.get_session("session0"), get_session_data("x" * 1000, 0))
+        self.assertIn("session0", provider.history)
+        self.assertEqual(len(provider.history), 2)
+
+        provider.delete_session("session1")
+        self.assertNotIn("session1", provider.get_all_sessions())
@@ -0,0 +1,143 @@
+import unittest
+from unittest.mock import patch
+import time
+from datetime import timezone
+
+import mongomock
+
+from solace_agent_mesh.services.history_service import HistoryService
+from solace_agent_mesh.services.history_service.history_providers.mongodb_history_provider import (
+    MongoDBHistoryProvider,
+)
+
+
+class TestMongoDBHistoryProvider(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("pymongo.MongoClient", mongomock.MongoClient)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.provider = MongoDBHistoryProvider({"mongodb_uri": "mongodb://localhost"})
+
+    def get_session_data(self, messages, num_turns=None):
+        return {
+            "history": [{"role": "user", "content": m} for m in messages],
+            "last_active_time": time.time(),
+            "num_characters": sum(len(m) for m in messages),
+            "num_turns": len(messages) if num_turns is None else num_turns,
+        }
+
+    def test_store_and_get_session(self):
+        data = self.get_session_data(["Hello"])
+        self.provider.store_session("session1", data)
+
+        self.assertEqual(self.provider.get_session("session1"), data)
+        self.assertEqual(self.provider.get_session("missing"), {})
+        self.assertEqual(self.provider.get_all_sessions(), ["session1"])
+
+    def test_partial_update(self):
+        self.provider.store_session("session1", self.get_session_data(["a"]))
+        data = self.get_session_data(["a", "b"])
+
+        _, update = self.provider._get_partial_update("session1", data)
+        self.assertEqual(update["$push"], {"data.history": {"$each": [data["history"][1]]}})
+        self.assertEqual(update["$inc"], {"data.num_characters": 1, "data.num_turns": 1})
+        self.assertIn("last_active_time", update["$set"])
+
+        self.provider.store_session("session1", data)
+        self.assertEqual(self.provider.get_session("session1"), data)
+
+    def test_partial_update_with_truncation(self):
+        self.provider.store_session("session1", self.get_session_data(["a", "b", "c"]))
+        data = self.get_session_data(["c", "d"])
+
+        _, update = self.provider._get_partial_update("session1", data)
+        self.assertEqual(update["$push"]["data.history"]["$slice"], -2)
+
+        self.provider.store_session("session1", data)
+        self.assertEqual(self.provider.get_session("session1"), data)
+
+    def test_partial_update_last_message_edit(self):
+        self.provider.store_session("session1", self.get_session_data(["a", "b"]))
+        data = self.get_session_data(["a", "b c"], num_turns=2)
+
+        _, update = self.provider._get_partial_update("session1", data)
+        self.assertNotIn("$push", update)
+        self.assertEqual(update["$set"]["data.history.1"], data["history"][1])
+
+        self.provider.store_session("session1", data)
+        self.assertEqual(self.provider.get_session("session1"), data)
+
+    def test_appends_compressed_past_threshold(self):
+        provider = MongoDBHistoryProvider(
+            {"mongodb_uri": "mongodb://localhost", "compression": "zlib", "compression_threshold": 1000}
+        )
+        messages = []
+        for i in range(20):
+            messages.append(f"{i} " + "x" * 200)
+            provider.store_session("session1", self.get_session_data(messages))
+
+        document = provider.collection.find_one({"_id": "session1"})
+        self.assertTrue(provider.codec.is_encoded(document["data"]))
+        self.assertEqual(len(provider.get_session("session1")["history"]), 20)
+
+    def test_concurrent_change_falls_back_to_replace(self):
+        other = MongoDBHistoryProvider({"mongodb_uri": "mongodb://localhost"})
+        other.collection = self.provider.collection
+
+        self.provider.store_session("session1", self.get_session_data(["a"]))
+        other.get_session("session1")
+        self.provider.store_session("session1", self.get_session_data(["a", "b"]))
+        other.store_session("session1", self.get_session_data(["a", "x"]))
+
+        self.assertEqual(
+            [m["content"] for m in self.provider.get_session("session1")["history"]],
+            ["a", "x"],
+        )
+
+    def test_last_active_times_and_delete(self):
+        data = self.get_session_data(["a"])
+        self.provider.store_session("session1", data)
+
+        self.assertEqual(
+            self.provider.get_last_active_times(), {"session1": data["last_active_time"]}
+        )
+        self.provider.delete_session("session1")
+        self.assertEqual(self.provider.get_all_sessions(), [])
+
+    def test_ttl_index(self):
+        self.assertTrue(self.provider.enable_native_expiry(60))
+        indexes = self.provider.collection.index_information()
+        self.assertEqual(indexes["last_active_time_1"]["expireAfterSeconds"], 60)
+
+        service = HistoryService(
+            config={
+                "type": "mongodb",
+                "time_to_live": 60,
+                "history_policy": {"mongodb_uri": "mongodb://localhost"},
+            },
+            identifier="test_mongodb_" + str(time.time()),
+        )
+        self.assertIsNone(service._expiry_job)
+
+    def test_ttl_field_is_backfilled(self):
+        last_active_time = time.time() - 30
+        self.provider.collection.insert_many(
+            [
+                {"_id": "legacy", "data": self.get_session_data(["a"]) | {"last_active_time": last_active_time}},
+                {"_id": "expired", "data": self.get_session_data(["a"]) | {"last_active_time": time.time() - 100}},
+                {"_id": "compressed", "data": b"compressed"},
+            ]
+        )
+        self.provider.store_session("current", self.get_session_data(["b"]))
+        current = self.provider.collection.find_one({"_id": "current"})["last_active_time"]
+
+        self.assertTrue(self.provider.enable_native_expiry(60))
+        documents = {doc["_id"]: doc for doc in self.provider.collection.find()}
+        self.assertEqual(sorted(documents), ["compressed", "current", "legacy"])
+        last_active_dates = {
+            session_id: doc["last_active_time"].replace(tzinfo=timezone.utc).timestamp()
+            for session_id, doc in documents.items()
+        }
+        self.assertAlmostEqual(last_active_dates["legacy"], last_active_time, delta=0.01)
+        self.assertAlmostEqual(last_active_dates["compressed"], time.time(), delta=5)
+        self.assertEqual(documents["current"]["last_active_time"], current)
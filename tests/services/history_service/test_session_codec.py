@@ -0,0 +1,67 @@
+import unittest
+import tempfile
+import shutil
+import json
+import os
+
+from solace_agent_mesh.services.history_service.history_providers.session_codec import (
+    SessionCodec,
+)
+from solace_agent_mesh.services.history_service.history_providers.file_history_provider import (
+    FileHistoryProvider,
+)
+
+LARGE_SESSION = {
+    "history": [{"role": "assistant", "content": "[Returned file data.csv]\n" + "a,b,c\n" * 2000}],
+    "last_active_time": 100,
+}
+SMALL_SESSION = {"history": [{"role": "user", "content": "Hello"}], "last_active_time": 100}
+
+
+class TestSessionCodec(unittest.TestCase):
+    def test_bytes_round_trip(self):
+        codec = SessionCodec({"compression": "zlib"})
+        payload = codec.encode_bytes(LARGE_SESSION)
+
+        self.assertTrue(payload.startswith(b"SAMC"))
+        self.assertLess(len(payload), len(json.dumps(LARGE_SESSION)))
+        self.assertEqual(codec.decode_bytes(payload), LARGE_SESSION)
+
+    def test_below_threshold_is_plain_json(self):
+        codec = SessionCodec({"compression": "zlib"})
+        payload = codec.encode_bytes(SMALL_SESSION)
+
+        self.assertEqual(json.loads(payload), SMALL_SESSION)
+        self.assertIs(codec.encode_document(SMALL_SESSION), SMALL_SESSION)
+
+    def test_document_round_trip(self):
+        codec = SessionCodec({"compression": "zlib"})
+        document = codec.encode_document(LARGE_SESSION)
+
+        self.assertTrue(codec.is_encoded(document))
+        self.assertEqual(document["last_active_time"], 100)
+        self.assertEqual(codec.decode_document(document), LARGE_SESSION)
+        self.assertEqual(codec.decode_document(json.loads(codec.encode_json(LARGE_SESSION))), LARGE_SESSION)
+
+    def test_decodes_regardless_of_configuration(self):
+        payload = SessionCodec({"compression": "zlib"}).encode_bytes(LARGE_SESSION)
+        self.assertEqual(SessionCodec().decode_bytes(payload), LARGE_SESSION)
+
+    def test_unsupported_compression(self):
+        with self.assertRaises(ValueError):
+            SessionCodec({"compression": "lz4"})
+
+    def test_file_provider_loads_uncompressed_sessions(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, True)
+        FileHistoryProvider({"path": path}).store_session("session1", LARGE_SESSION)
+
+        provider = FileHistoryProvider({"path": path, "compression": "zlib"})
+        self.assertEqual(provider.get_session("session1"), LARGE_SESSION)
+
+        provider.store_session("session1", LARGE_SESSION)
+        self.assertLess(
+            os.path.getsize(os.path.join(path, "sessions_session1_history.json")),
+            len(json.dumps(LARGE_SESSION)),
+        )
+        self.assertEqual(provider.get_session("session1"), LARGE_SESSION)
@@ -0,0 +1,149 @@
+import unittest
+import tempfile
+import os
+import shutil
+import threading
+
+from solace_agent_mesh.services.history_service.history_providers.sql_history_provider import (
+    SQLHistoryProvider,
+)
+
+
+class TestSQLHistoryProvider(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def get_provider(self, **config):
+        return SQLHistoryProvider(
+            {
+                "db_type": "sqlite",
+                "sql_database": os.path.join(self.path, "history.db"),
+                **config,
+            }
+        )
+
+    def test_store_and_get_session(self):
+        provider = self.get_provider()
+        data = {"history": [{"role": "user", "content": "Hello"}], "last_active_time": 10}
+        provider.store_session("session1", data)
+
+        self.assertEqual(provider.get_session("session1"), data)
+        self.assertEqual(provider.get_session("missing"), {})
+
+        data["history"].append({"role": "assistant", "content": "Hi"})
+        provider.store_session("session1", data)
+        self.assertEqual(len(provider.get_session("session1")["history"]), 2)
+
+    def test_list_and_delete(self):
+        provider = self.get_provider()
+        provider.store_session("session1", {"history": [], "last_active_time": 1})
+        provider.store_session("session2", {"history": [], "last_active_time": 2})
+
+        self.assertEqual(sorted(provider.get_all_sessions()), ["session1", "session2"])
+        self.assertEqual(provider.get_last_active_times(), {"session1": 1.0, "session2": 2.0})
+
+        provider.delete_session("session1")
+        self.assertEqual(provider.get_all_sessions(), ["session2"])
+
+    def test_store_sessions_batch(self):
+        provider = self.get_provider()
+        sessions = {
+            f"session{i}": {"history": [], "last_active_time": i} for i in range(10)
+        }
+        provider.store_sessions(sessions)
+
+        self.assertEqual(len(provider.get_all_sessions()), 10)
+        self.assertEqual(provider.get_session("session3"), sessions["session3"])
+
+    def test_pool_shared_and_concurrent(self):
+        provider1 = self.get_provider(pool_size=2)
+        provider2 = self.get_provider(pool_size=2)
+        self.assertIs(provider1.pool, provider2.pool)
+
+        errors = []
+
+        def worker(index):
+            try:
+                for i in range(20):
+                    provider1.store_session(
+                        f"session{index}", {"history": [i], "last_active_time": i}
+                    )
+                    provider2.get_session(f"session{index}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(provider1.get_all_sessions()), 6)
+
+    def test_partial_update_statements(self):
+        provider = self.get_provider()
+        provider.partial_updates = True
+        previous = {"history": [{"content": "a"}], "num_turns": 1}
+        provider._remember("session1", previous)
+
+        statement, params = provider._get_partial_update(
+            "session1", {"history": [{"content": "a"}, {"content": "b"}], "num_turns": 2}
+        )
+        self.assertEqual(statement, "append_history")
+        self.assertEqual(params, ('{"num_turns": 2}', '[{"content": "b"}]', "session1", 1))
+
+        statement, params = provider._get_partial_update(
+            "session1", {"history": [{"content": "a b"}], "num_turns": 1}
+        )
+        self.assertEqual(statement, "replace_last_history")
+        self.assertEqual(params[1], '[{"content": "a b"}]')
+
+        self.assertIsNone(
+            provider._get_partial_update("session1", {"history": [], "num_turns": 0})
+        )
+
+    def test_partial_update_past_compression_threshold(self):
+        provider = self.get_provider(compression="zlib", compression_threshold=100)
+        provider.partial_updates = True
+        provider._remember("session1", {"history": [{"content": "a"}], "num_turns": 1})
+
+        self.assertIsNone(
+            provider._get_partial_update(
+                "session1", {"history": [{"content": "a"}, {"content": "b" * 200}], "num_turns": 2}
+            )
+        )
+
+    def test_tables_sharing_a_pool(self):
+        history = self.get_provider(pool_size=1)
+        memory = self.get_provider(pool_size=1, table_name="long_term_memory")
+        self.assertIs(history.pool, memory.pool)
+
+        history.store_session("session1", {"history": [1], "last_active_time": 1})
+        memory.store_session("session1", {"history": [2], "last_active_time": 2})
+        self.assertEqual(history.get_session("session1")["history"], [1])
+        self.assertEqual(memory.get_session("session1")["history"], [2])
+
+        # On Postgres, each table prepares its own statements on the shared connection
+        class Cursor:
+            def __init__(self, executed):
+                self.executed = executed
+
+            def execute(self, query, params=()):
+                self.executed.append(query)
+
+        class Connection:
+            connection = object()
+            executed = []
+
+        db = Connection()
+        for provider in (history, memory, history, memory):
+            provider.db_type = "postgres"
+            provider._prepare(db, Cursor(db.executed), "select", 1)
+        self.assertEqual(
+            [query.split(" AS ")[0] for query in db.executed],
+            ["PREPARE sam_session_history_select", "PREPARE sam_long_term_memory_select"],
+        )
@@ -0,0 +1,85 @@
+import io
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from solace_agent_mesh.services.http_service import HttpService, ResponseTooLargeError
+from tests.http_server import LocalHttpServer
+
+
+class TestHttpService(unittest.TestCase):
+    def setUp(self):
+        cache_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_directory)
+        self.http_service = HttpService({"cache": {"directory": cache_directory}}, identifier=cache_directory)
+        self.server = LocalHttpServer(page=b"<p>page</p>")
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__)
+
+    def fetch(self, path, count=3, **kwargs):
+        return [self.http_service.get(self.server.url(path), **kwargs) for _ in range(count)]
+
+    def test_connections_are_reused(self):
+        responses = self.fetch("/plain")
+        self.assertEqual([response.text for response in responses], ["<p>page</p>"] * 3)
+        self.assertFalse(any(response.from_cache for response in responses))
+        self.assertEqual(self.server.requests["/plain"], 3)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_fresh_response_is_cached(self):
+        responses = self.fetch("/max-age")
+        self.assertEqual([response.from_cache for response in responses], [False, True, True])
+        self.assertEqual(responses[2].content, b"<p>page</p>")
+        self.assertEqual(self.server.requests["/max-age"], 1)
+
+    def test_stale_response_is_revalidated(self):
+        responses = self.fetch("/etag")
+        self.assertEqual([response.from_cache for response in responses], [False, True, True])
+        self.assertEqual(responses[2].status_code, 200)
+        self.assertEqual(self.server.requests["/etag"], 3)
+        self.assertEqual(self.server.not_modified["/etag"], 2)
+
+    def test_private_responses_are_not_cached(self):
+        self.fetch("/private")
+        self.fetch("/max-age", headers={"Authorization": "Bearer token"})
+        self.assertEqual(self.server.requests["/private"], 3)
+        self.assertEqual(self.server.requests["/max-age"], 3)
+
+    def test_max_bytes(self):
+        with self.assertRaises(ResponseTooLargeError):
+            self.http_service.get(self.server.url("/plain"), max_bytes=4)
+        self.assertEqual(self.http_service.get(self.server.url("/missing")).status_code, 404)
+
+    def test_download(self):
+        destination = io.BytesIO()
+        response = self.http_service.download(self.server.url("/max-age"), destination)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(destination.getvalue(), b"<p>page</p>")
+        # Downloads are not cached
+        self.http_service.download(self.server.url("/max-age"), io.BytesIO())
+        self.assertEqual(self.server.requests["/max-age"], 2)
+
+        with self.assertRaises(ResponseTooLargeError):
+            self.http_service.download(self.server.url("/plain"), io.BytesIO(), max_bytes=4)
+        with self.assertRaises(requests.HTTPError):
+            self.http_service.download(self.server.url("/missing"), destination)
+        self.assertEqual(destination.getvalue(), b"<p>page</p>")
+
+    def test_default_cache_directory_is_private(self):
+        temporary_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temporary_directory)
+        with patch("tempfile.gettempdir", return_value=temporary_directory):
+            http_service = HttpService({}, identifier="private-cache")
+            directory = http_service.cache.directory
+            self.assertEqual(os.path.dirname(directory), temporary_directory)
+            self.assertTrue(directory.endswith(f"_{os.getuid()}"))
+            self.assertEqual(stat.S_IMODE(os.stat(directory).st_mode), 0o700)
+
+            # A directory owned by another user is not used, the cache is disabled
+            with patch("os.getuid", return_value=os.getuid() + 1):
+                self.assertIsNone(HttpService({}, identifier="other-user-cache").cache)
@@ -0,0 +1,115 @@
+# tests to verify that the action executor runs actions concurrently within their concurrency limits
+import threading
+import time
+import unittest
+
+from src.agents.base_agent_component import BaseAgentComponent
+from src.common.action_executor import ActionExecutor
+
+
+class TestActionExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = ActionExecutor(4)
+        self.addCleanup(self.executor.shutdown, True)
+        self.lock = threading.Lock()
+        self.running = {"slow": 0, "fast": 0}
+        self.max_running = {"slow": 0, "fast": 0}
+        self.done = []
+
+    def run_action(self, action_name, duration):
+        with self.lock:
+            self.running[action_name] += 1
+            self.max_running[action_name] = max(self.max_running[action_name], self.running[action_name])
+        time.sleep(duration)
+        with self.lock:
+            self.running[action_name] -= 1
+            self.done.append(action_name)
+
+    def wait_for(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.done) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Let the last invocations record their metrics
+        self.executor.shutdown(wait=True)
+
+    def test_concurrency_limit(self):
+        for _ in range(4):
+            self.executor.submit("slow", 1, self.run_action, "slow", 0.1)
+        for _ in range(3):
+            self.executor.submit("fast", None, self.run_action, "fast", 0.01)
+        self.wait_for(7)
+
+        # The queued slow actions do not hold threads, so the fast ones finish first
+        self.assertEqual(self.done[:3], ["fast"] * 3)
+        self.assertEqual(self.max_running["slow"], 1)
+        metrics = self.executor.get_metrics()
+        self.assertEqual(metrics["slow"]["invocations"], 4)
+        self.assertEqual((metrics["slow"]["running"], metrics["slow"]["queued"]), (0, 0))
+        self.assertGreaterEqual(metrics["slow"]["max_queue_wait"], 0.25)
+        self.assertGreaterEqual(metrics["slow"]["max_execution_time"], 0.1)
+
+    def test_failure_is_counted(self):
+        def fail():
+            raise ValueError("failed")
+
+        self.executor.submit("failing", 1, fail)
+        self.executor.submit("failing", 1, self.run_action, "fast", 0)
+        self.wait_for(1)
+
+        self.assertEqual(self.done, ["fast"])
+        metrics = self.executor.get_metrics()["failing"]
+        self.assertEqual((metrics["invocations"], metrics["failures"]), (2, 1))
+
+    def test_queued_invocations_are_discarded_on_shutdown(self):
+        discarded = []
+        executor = ActionExecutor(1, on_discard=lambda *args: discarded.append(args))
+        started = threading.Event()
+        release = threading.Event()
+
+        def block(message):
+            started.set()
+            release.wait(5)
+            self.done.append(message)
+
+        executor.submit("slow", 1, block, "first")
+        executor.submit("slow", 1, block, "queued")
+        executor.submit("other", None, block, "submitted")
+        started.wait(5)
+        executor.shutdown()
+        executor.submit("other", None, block, "late")
+        release.set()
+        executor.shutdown(wait=True)
+
+        self.assertEqual(self.done, ["first"])
+        self.assertEqual(sorted(discarded), [("late",), ("queued",), ("submitted",)])
+        self.assertEqual(executor.get_metrics()["slow"]["queued"], 0)
+
+    def test_agent_request_context_is_per_thread(self):
+        agent = BaseAgentComponent.__new__(BaseAgentComponent)
+        agent.current_message = "component message"
+        seen = []
+        agent._process_action_request = lambda message, data: seen.append(
+            (agent.current_message, agent.current_request_data)
+        )
+        agent.process_post_invoke = lambda result, message: None
+
+        self.executor.submit("action", None, agent._run_action_request, "action message", {"action_idx": 0})
+        self.executor.shutdown(wait=True)
+
+        self.assertEqual(seen, [("action message", {"action_idx": 0})])
+        self.assertEqual(agent.current_message, "component message")
+
+    def test_agent_request_context_is_cleared_on_failure(self):
+        agent = BaseAgentComponent.__new__(BaseAgentComponent)
+        nacks = []
+
+        def fail(message, data):
+            raise ValueError("failed")
+
+        agent._process_action_request = fail
+        agent.handle_negative_acknowledgements = lambda message, e: nacks.append(message)
+
+        with self.assertRaises(ValueError):
+            agent._run_action_request("action message", {"action_idx": 0})
+        self.assertEqual(nacks, ["action message"])
+        self.assertEqual((agent.current_message, agent.current_request_data), (None, None))
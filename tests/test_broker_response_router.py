@@ -0,0 +1,100 @@
+# tests to verify that concurrent actions of an agent wait for their own broker responses
+import queue
+import threading
+import time
+import unittest
+
+from solace_ai_connector.common.event import Event, EventType
+from solace_ai_connector.common.message import Message
+
+from src.agents.base_agent_component import BaseAgentComponent
+from src.common.action_executor import ActionExecutor
+from src.common.broker_response_router import BrokerResponseRouter
+
+
+class FakeController:
+    """Answers each request after the delay in its payload, copying its user properties."""
+
+    def __init__(self):
+        self.request_expiry_s = 5
+        self.response_queue = queue.Queue()
+        self.max_outstanding = 0
+        self._outstanding = 0
+        self._lock = threading.Lock()
+
+    def enqueue_response(self, event):
+        self.response_queue.put(event)
+
+    def send_message(self, message, stream=False, streaming_complete_expression=None):
+        with self._lock:
+            self._outstanding += 1
+            self.max_outstanding = max(self.max_outstanding, self._outstanding)
+        threading.Thread(target=self._respond, args=(message, stream)).start()
+
+    def _respond(self, message, stream):
+        payload = message.get_payload()
+        time.sleep(payload["delay"])
+        with self._lock:
+            self._outstanding -= 1
+        chunks = 2 if stream else 1
+        for index in range(chunks):
+            response = Message(
+                payload={"text": payload["text"], "last_chunk": index == chunks - 1},
+                user_properties=dict(message.get_user_properties()),
+            )
+            self.enqueue_response(Event(EventType.MESSAGE, response))
+
+
+class FakeApp:
+    def __init__(self, controller):
+        self.request_response_controller = controller
+
+
+class TestBrokerResponseRouter(unittest.TestCase):
+    def setUp(self):
+        self.controller = FakeController()
+        self.agent = BaseAgentComponent.__new__(BaseAgentComponent)
+        self.agent.action_executor = ActionExecutor(4)
+        self.addCleanup(self.agent.action_executor.shutdown)
+        self.agent.get_app = lambda: FakeApp(self.controller)
+
+    def request(self, text, delay, stream=False):
+        message = Message(payload={"text": text, "delay": delay})
+        if stream:
+            return [
+                response.get_payload()["text"]
+                for response, _ in self.agent.do_broker_request_response(
+                    message, stream=True, streaming_complete_expression="input.payload:last_chunk"
+                )
+            ]
+        return self.agent.do_broker_request_response(message).get_payload()["text"]
+
+    def test_concurrent_requests(self):
+        results = {}
+
+        def run(text, delay):
+            results[text] = self.request(text, delay)
+
+        threads = [
+            threading.Thread(target=run, args=(text, delay))
+            for text, delay in (("slow", 0.3), ("medium", 0.2), ("fast", 0.1))
+        ]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {"slow": "slow", "medium": "medium", "fast": "fast"})
+        self.assertEqual(self.controller.max_outstanding, 3)
+        self.assertLess(time.monotonic() - start, 0.55)
+
+    def test_streaming_request(self):
+        self.assertEqual(self.request("streamed", 0, stream=True), ["streamed", "streamed"])
+
+    def test_responses_without_request_id(self):
+        router = BrokerResponseRouter.for_controller(self.controller)
+        self.assertIs(BrokerResponseRouter.for_controller(self.controller), router)
+
+        router.put(Event(EventType.MESSAGE, Message(payload="unrouted")))
+        self.assertEqual(router.get(timeout=1).data.get_payload(), "unrouted")
@@ -0,0 +1,66 @@
+# tests to verify that the do_web_requests action fetches several pages and summarizes them in one LLM request
+import unittest
+
+from src.agents.web_request.actions.do_web_requests import DoWebRequests, parse_urls
+from src.agents.web_request.html_content import allocate_token_budget, deduplicate_pages
+from tests.http_server import LocalHttpServer
+
+PARAGRAPH = "The content of the page, long enough to be compared with the other pages. "
+PAGE = f"<html><body><main><h1>Page</h1><p>{PARAGRAPH * 3}</p></main></body></html>".encode()
+
+
+class FakeAgent:
+    def __init__(self):
+        self.requests = []
+
+    def do_llm_service_request(self, messages):
+        self.requests.append(messages)
+        return {"content": "Summary"}
+
+
+class TestDoWebRequests(unittest.TestCase):
+    def setUp(self):
+        self.server = LocalHttpServer(page=PAGE)
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__)
+        self.agent = FakeAgent()
+        self.config = {"web_requests_max_urls": 3}
+        self.action = DoWebRequests(
+            agent=self.agent, config_fn=lambda key, default=None: self.config.get(key, default)
+        )
+
+    def test_one_llm_request(self):
+        urls = [self.server.url(path) for path in ("/plain", "/private", "/missing", "/etag")]
+        response = self.action.invoke({"urls": urls + [urls[0] + "#top"], "llm_prompt": "Summarize"})
+
+        self.assertEqual(len(self.agent.requests), 1)
+        user_prompt = self.agent.requests[0][1]["content"]
+        self.assertIn(f'<page url="{urls[0]}">\n# Page\n\n{PARAGRAPH * 2}', user_prompt)
+        self.assertIn(f'<page url="{urls[1]}">\n# Page\n</page>', user_prompt)
+        self.assertNotIn("/missing", user_prompt)
+        self.assertTrue(response.message.startswith("Summary\n\n"))
+        self.assertIn(f"Failed to fetch content from {urls[2]}: 404", response.message)
+        self.assertIn(f"skipped: {urls[3]}", response.message)
+        self.assertEqual(sum(self.server.requests.values()), 3)
+
+    def test_without_prompt(self):
+        response = self.action.invoke({"urls": f'["{self.server.url("/plain")}"]'})
+        self.assertTrue(response.message.startswith(f"# {self.server.url('/plain')}\n\n# Page\n\n"))
+        self.assertEqual(self.agent.requests, [])
+
+    def test_without_max_concurrency(self):
+        self.config["web_requests_max_concurrency"] = 0
+        response = self.action.invoke({"urls": [self.server.url("/plain")]})
+        self.assertTrue(response.message.startswith(f"# {self.server.url('/plain')}"))
+
+    def test_helpers(self):
+        self.assertEqual(parse_urls("https://a.com/x, https://b.com\nhttps://a.com/x#y"), ["https://a.com/x", "https://b.com"])
+        self.assertEqual(
+            parse_urls("['https://example.com/a', 'https://example.com/b']"),
+            ["https://example.com/a", "https://example.com/b"],
+        )
+        self.assertEqual(parse_urls("https://a.com/x?a=1,2 https://b.com"), ["https://a.com/x?a=1,2", "https://b.com"])
+        self.assertEqual(parse_urls('["https://a.com/x?a=1,2"]'), ["https://a.com/x?a=1,2"])
+        self.assertEqual(allocate_token_budget([10, 1000, 500], 900), [10, 445, 445])
+        block = "b" * 100
+        self.assertEqual(deduplicate_pages([f"# A\n\n{block}", f"# A\n\n{block}\n\nnew"]), [f"# A\n\n{block}", "# A\n\nnew"])
@@ -0,0 +1,51 @@
+# tests to verify that the web_request agent extracts the main content of pages as markdown within a token budget
+import unittest
+
+from src.agents.web_request.html_content import (
+    estimate_tokens,
+    extract_content,
+    html_to_markdown,
+    truncate_to_token_budget,
+)
+
+ARTICLE = "The body of the article, long enough to be trusted as the main content. " * 4
+
+
+class TestHtmlContent(unittest.TestCase):
+    def test_main_content(self):
+        html = (
+            "<html><head><title>Title</title><script>var a;</script></head><body>"
+            '<header><nav><a href="/">Home</a></nav></header>'
+            '<aside class="sidebar">Related</aside>'
+            f"<main><article><header><h1>The <em>title</em></h1></header><p>{ARTICLE}"
+            "<a href='/next'>next &amp; more</a></p><ul><li>one</li><li>two</li></ul></article>"
+            "</main><footer>Copyright</footer></body></html>"
+        )
+        self.assertEqual(
+            html_to_markdown(html, base_url="https://example.com/page"),
+            f"# The _title_\n\n{ARTICLE}[next & more](https://example.com/next)\n\n  * one\n  * two",
+        )
+
+    def test_page_without_main_content(self):
+        html = f'<body><nav>Menu</nav><p>Hello <b>world</b> {ARTICLE}</p><main><p>Short</p></main></body>'
+        self.assertEqual(html_to_markdown(html), f"Hello **world** {ARTICLE}\n\nShort")
+
+    def test_forms_and_wrappers_are_kept(self):
+        html = (
+            f'<body><form id="aspnetForm" method="post"><div class="container has-sidebar">'
+            f"<p>{ARTICLE}</p></div></form></body>"
+        )
+        self.assertEqual(html_to_markdown(html), ARTICLE.strip())
+
+    def test_charset(self):
+        self.assertEqual(extract_content("<p>é</p>".encode("latin-1"), "text/html; charset=ISO-8859-1"), "é")
+        self.assertEqual(extract_content('<meta charset="latin-1"><p>é</p>'.encode("latin-1"), "text/html"), "é")
+        self.assertEqual(extract_content("é".encode("utf-8"), "text/plain"), "é")
+
+    def test_truncate_to_token_budget(self):
+        markdown = "\n\n".join(["a" * 40] * 10)
+        truncated = truncate_to_token_budget(markdown, 25)
+        self.assertTrue(truncated.startswith("a" * 40 + "\n\n" + "a" * 40 + "\n\n"))
+        self.assertTrue(truncated.endswith("[The page was truncated to about 25 tokens]"))
+        self.assertLessEqual(estimate_tokens(truncated.split("\n\n[")[0]), 25)
+        self.assertEqual(truncate_to_token_budget(markdown, 1000), markdown)
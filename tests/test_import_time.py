@@ -0,0 +1,37 @@
+# tests to verify that the services and components do not import the optional heavy dependencies
+import os
+import unittest
+
+from tests.benchmarks.import_time_benchmark import (
+    ENTRY_MODULES,
+    get_heavy_modules,
+    get_import_times,
+)
+from src.common.lazy_registry import LazyRegistry
+
+# The modules of the working tree, not of the installed package
+REPO_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_MODULES = ["src." + module.split(".", 1)[1] for module in ENTRY_MODULES]
+
+
+class TestImportTime(unittest.TestCase):
+    def test_heavy_modules_are_not_imported(self):
+        for module in SRC_MODULES:
+            with self.subTest(module=module):
+                times = get_import_times(module, cwd=REPO_DIRECTORY)
+                self.assertTrue(any(name.startswith("src.") for name in times))
+                self.assertFalse(any(name.startswith("solace_agent_mesh") for name in times))
+                self.assertEqual(get_heavy_modules(times), [])
+
+    def test_lazy_registry(self):
+        registry = LazyRegistry({"queue": "queue:Queue", "missing": "not_a_module:Missing"})
+        self.assertIn("queue", registry)
+        self.assertFalse(registry.is_loaded("queue"))
+        import queue
+
+        self.assertIs(registry["queue"], queue.Queue)
+        self.assertTrue(registry.is_loaded("queue"))
+        with self.assertRaises(KeyError):
+            registry["other"]
+        with self.assertRaises(ImportError):
+            registry["missing"]
@@ -0,0 +1,83 @@
+# tests to verify that agents send heartbeats between full registrations, that the orchestrator keeps unchanged entries and requests unknown ones
+import unittest
+
+from solace_ai_connector.common.message import Message
+
+from src.agents.base_agent_component import BaseAgentComponent
+from src.orchestrator.components.orchestrator_register_component import OrchestratorRegister
+from src.orchestrator.orchestrator_main import OrchestratorState
+
+
+class TestOrchestratorRegister(unittest.TestCase):
+    def setUp(self):
+        OrchestratorState.set_config({"agent_ttl_ms": 60000})
+        self.state = OrchestratorState()
+        self.state.delete_agent("agent")
+        self.addCleanup(self.state.delete_agent, "agent")
+
+    def create_agent(self, summary):
+        agent = BaseAgentComponent.__new__(BaseAgentComponent)
+        agent.full_registration_interval = 3
+        agent.registration_count = 0
+        agent.registration_digest = None
+        agent.get_agent_summary = lambda: dict(summary)
+        return agent
+
+    def test_agent_sends_heartbeats(self):
+        summary = {"agent_name": "agent", "description": "An agent", "actions": []}
+        agent = self.create_agent(summary)
+        messages = [agent.get_registration_message() for _ in range(4)]
+
+        self.assertEqual([("actions" in message) for message in messages], [True, False, False, True])
+        self.assertEqual(messages[1], {"agent_name": "agent", "digest": messages[0]["digest"]})
+
+        summary["description"] = "A changed agent"
+        message = agent.get_registration_message()
+        self.assertIn("actions", message)
+        self.assertNotEqual(message["digest"], messages[0]["digest"])
+
+    def test_register_only_on_change(self):
+        agent = self.create_agent({"agent_name": "agent", "description": "An agent", "actions": []})
+        registration = agent.get_registration_message()
+        heartbeat = agent.get_registration_message()
+
+        # A heartbeat from an unknown agent is ignored
+        self.assertFalse(self.state.register_agent(dict(heartbeat)))
+        self.assertNotIn("agent", self.state.get_registered_agents())
+
+        self.assertTrue(self.state.register_agent(dict(registration)))
+        entry = self.state.get_registered_agents()["agent"]
+        expire_time = entry["expire_time"]
+        entry["state"] = "open"
+
+        self.assertFalse(self.state.register_agent(dict(heartbeat)))
+        self.assertFalse(self.state.register_agent(dict(registration)))
+        self.assertIs(self.state.get_registered_agents()["agent"], entry)
+        self.assertEqual(entry["state"], "open")
+        self.assertGreaterEqual(entry["expire_time"], expire_time)
+
+        self.assertFalse(self.state.register_agent({"agent_name": "agent", "digest": "other"}))
+        self.assertTrue(self.state.register_agent({**registration, "description": "Changed", "digest": "other"}))
+        self.assertEqual(self.state.get_registered_agents()["agent"]["description"], "Changed")
+
+    def test_unknown_heartbeat_requests_full_registration(self):
+        register = OrchestratorRegister.__new__(OrchestratorRegister)
+        register.orchestrator_state = self.state
+        register.discard_current_message = lambda: None
+        agent = self.create_agent({"agent_name": "agent", "description": "An agent", "actions": []})
+        agent.info = {"agent_name": "agent"}
+        agent.get_registration_message()
+        heartbeat = agent.get_registration_message()
+
+        # The orchestrator restarted and does not know the agent
+        request = register.invoke(None, dict(heartbeat))
+        self.assertTrue(request["topic"].endswith("solace-agent-mesh/v1/register/request/agent/agent"))
+
+        message = Message(topic=request["topic"], payload=request["payload"])
+        self.assertTrue(agent.is_registration_request(message))
+        registration = agent.invoke(message, request["payload"])
+        self.assertTrue(registration["topic"].endswith("solace-agent-mesh/v1/register/agent/agent"))
+        self.assertIsNone(register.invoke(None, dict(registration["payload"])))
+
+        self.assertIn("agent", self.state.get_registered_agents())
+        self.assertIsNone(register.invoke(None, dict(heartbeat)))
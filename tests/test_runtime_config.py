@@ -0,0 +1,50 @@
+# tests to verify that the runtime config is cached and reloaded when the file changes
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.tools.config.runtime_config import (
+    get_runtime_config,
+    get_service_config,
+    load_runtime_config,
+)
+
+
+class TestRuntimeConfig(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.config_path = os.path.join(directory, "config.yaml")
+        self.write("services:\n  file_service:\n    type: memory\n")
+
+    def write(self, content):
+        with open(self.config_path, "w", encoding="utf-8") as config_file:
+            config_file.write(content)
+        # Make the change visible even within the mtime resolution
+        stat = os.stat(self.config_path)
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    def test_config_is_parsed_once(self):
+        runtime_config = get_runtime_config(self.config_path)
+        self.assertEqual(get_service_config("file_service", self.config_path), {"type": "memory"})
+        get_service_config("file_service", self.config_path)["type"] = "changed"
+        self.assertEqual(load_runtime_config(self.config_path)["services"]["file_service"]["type"], "memory")
+        self.assertEqual(runtime_config.loads, 1)
+
+        self.write("services:\n  file_service:\n    type: volume\n")
+        self.assertEqual(get_service_config("file_service", self.config_path), {"type": "volume"})
+        self.assertEqual(runtime_config.loads, 2)
+
+    def test_subscribe(self):
+        runtime_config = get_runtime_config(self.config_path)
+        changes = []
+        runtime_config.subscribe(changes.append, "file_service", poll_interval=60)
+        runtime_config.refresh()
+
+        self.write("services:\n  file_service:\n    type: memory\n  history_service:\n    type: redis\n")
+        runtime_config.refresh()
+        self.assertEqual(changes, [])
+        self.write("services:\n  file_service:\n    type: volume\n")
+        runtime_config.refresh()
+        self.assertEqual(changes, [{"type": "volume"}])